@@ -1,28 +1,50 @@
+import mimetypes
 import os
-from flask import Flask, request, jsonify, send_from_directory
+import threading
+import click
+from functools import wraps
+from flask import Flask, Response, abort, g, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from flask_bcrypt import Bcrypt
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, verify_jwt_in_request
 from flask_cors import CORS
-from datetime import timedelta
-from werkzeug.utils import secure_filename
-from sqlalchemy import or_
-import json
-from urllib.parse import quote_plus # Import quote_plus for URL encoding
+from datetime import datetime, timedelta
+from sqlalchemy import DDL, create_engine, delete, event, exists, func, insert, inspect, literal, or_, select, union, union_all, update
+from sqlalchemy.orm import joinedload, undefer
+from urllib.parse import quote, quote_plus # Import quote_plus for URL encoding
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+from pagination import PaginationError, get_page_args, paginate, paginate_merged, paginate_ranked, paginated_response
+from search import apply_post_search, create_post_search_index, drop_post_search_index, parse_search_query
+from suggest import PrefixIndex
+from pubsub import create_broker
+from cache import ResponseCache, create_backend
+from db_pool import engine_options, pool_stats
+from replicas import ReplicaSet, RoutingSession
+from request_timing import RequestTimer, TimedJSONProvider
+from json_provider import OrjsonProvider, stream_json_array
+from metrics import PrometheusMetrics
+from db_writes import insert_or_ignore, insert_select_or_ignore, insert_unique
+import follows
+from static_assets import StaticManifest
+from passwords import HasherBusy, PasswordHasher, benchmark as benchmark_hashing, default_workers
+from media import InvalidImageError, ResizeCache, schedule_variants, store_image, variant_source, variant_urls
 
 # Import specific JWT exceptions for explicit handling
-from flask_jwt_extended.exceptions import NoAuthorizationError, InvalidHeaderError, RevokedTokenError
+from flask_jwt_extended.exceptions import JWTExtendedException, NoAuthorizationError, InvalidHeaderError, RevokedTokenError
 from jwt.exceptions import PyJWTError, DecodeError, ExpiredSignatureError
 
 # Import and load dotenv at the very beginning
 from dotenv import load_dotenv
 load_dotenv() # This loads the environment variables from .env file
 
-app = Flask(__name__, static_folder="../frontend/build", static_url_path="/")
+# The frontend build is served by serve() below (see FRONTEND_BUILD_DIR), not Flask's static route,
+# which would shadow the single-page-app fallback for client-side routes.
+app = Flask(__name__, static_folder=None)
 
 # --- Configuration ---
-CORS(app, resources={r"/api/*": {"origins": ["https://agri-super-app-frontend.onrender.com", os.environ.get("FRONTEND_URL", "*")]}})
+CORS(app, resources={r"/api/*": {"origins": ["https://agri-super-app-frontend.onrender.com", os.environ.get("FRONTEND_URL", "*")]}},
+     expose_headers=["X-Next-Cursor", "Server-Timing"])
 # Database URI configuration for deployment
 # It uses the DATABASE_URL environment variable, falling back to SQLite for local development if not set.
 db_url = os.environ.get("DATABASE_URL", "sqlite:///agri_app.db")
@@ -53,10 +75,51 @@ print(f"DEBUG: Flask app is using DATABASE_URL: {app.config['SQLALCHEMY_DATABASE
 
 
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# Connection pool. Each worker process holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections, so
+# size these against the database's connection limit divided by the number of workers. Connections
+# are pinged before use and recycled after DB_POOL_RECYCLE seconds, before Render Postgres drops
+# them as idle. Behind PgBouncer in transaction mode set DB_PGBOUNCER=true (PgBouncer then does the
+# pooling) and point CHAT_BROKER_URL at Postgres directly, since LISTEN needs a session.
+app.config["DB_POOL_SIZE"] = int(os.environ.get("DB_POOL_SIZE", 5))
+app.config["DB_MAX_OVERFLOW"] = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+app.config["DB_POOL_TIMEOUT"] = int(os.environ.get("DB_POOL_TIMEOUT", 30))
+app.config["DB_POOL_RECYCLE"] = int(os.environ.get("DB_POOL_RECYCLE", 300))
+app.config["DB_POOL_PRE_PING"] = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+app.config["DB_STATEMENT_CACHE_SIZE"] = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", 500))
+app.config["DB_PGBOUNCER"] = os.environ.get("DB_PGBOUNCER", "false").lower() == "true"
+
+def database_engine_options(url):
+    return engine_options(
+        url, pool_size=app.config["DB_POOL_SIZE"], max_overflow=app.config["DB_MAX_OVERFLOW"],
+        pool_timeout=app.config["DB_POOL_TIMEOUT"], pool_recycle=app.config["DB_POOL_RECYCLE"],
+        pool_pre_ping=app.config["DB_POOL_PRE_PING"], query_cache_size=app.config["DB_STATEMENT_CACHE_SIZE"],
+        pgbouncer=app.config["DB_PGBOUNCER"]
+    )
+
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = database_engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
+
+# Read replicas (comma-separated URLs) for routes marked @read_replica; empty means everything reads
+# from the primary. A user who has just written reads from the primary for DATABASE_PRIMARY_STICKY_SECONDS
+# so they see their own writes. Everyone else keeps reading replicas; for as long as a user is pinned,
+# responses read from a replica do not fill the response cache entries that write invalidated, so a
+# lagging replica cannot put the old data back. Pins must be seen by every worker, so with replicas
+# DATABASE_STICKY_URL has to be a shared store (sqlite:///path, shared by the workers on one host).
+app.config["DATABASE_REPLICA_URLS"] = [url.strip().replace("postgres://", "postgresql://", 1)
+                                       for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+app.config["DATABASE_PRIMARY_STICKY_SECONDS"] = int(os.environ.get("DATABASE_PRIMARY_STICKY_SECONDS", 10))
+app.config["DATABASE_STICKY_URL"] = os.environ.get("DATABASE_STICKY_URL", "memory://")
+app.config["DATABASE_REPLICA_CHECK_INTERVAL"] = int(os.environ.get("DATABASE_REPLICA_CHECK_INTERVAL", 10))
+app.config["DATABASE_REPLICA_RETRY_AFTER"] = int(os.environ.get("DATABASE_REPLICA_RETRY_AFTER", 30))
+if app.config["DATABASE_REPLICA_URLS"] and app.config["DATABASE_STICKY_URL"] == "memory://":
+    raise RuntimeError("DATABASE_REPLICA_URLS needs a shared DATABASE_STICKY_URL (e.g. sqlite:////tmp/primary-pins.db); "
+                       "memory:// pins are only seen by the worker that set them")
 # Ensure these keys are loaded from environment variables (e.g., from .env)
 app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "your_super_secret_key_change_me_in_production")
 app.config["JWT_SECRET_KEY"] = os.environ.get("JWT_SECRET_KEY", "your_jwt_secret_key_change_me_too_in_production")
 app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(days=7)
+# Tokens are read from the Authorization header only. The chat stream alone also accepts ?jwt=, because
+# browsers cannot set headers on EventSource connections (see stream_messages).
+app.config["JWT_TOKEN_LOCATION"] = ["headers"]
 
 # File Upload Setup
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -65,14 +128,109 @@ UPLOAD_FOLDER = os.path.join(basedir, "uploads")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+app.config["FRONTEND_BUILD_DIR"] = os.environ.get("FRONTEND_BUILD_DIR", os.path.join(basedir, "..", "frontend", "build"))
 app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
+# Worker processes generating resized image variants; 0 generates them on the request thread.
+app.config["IMAGE_WORKERS"] = int(os.environ.get("IMAGE_WORKERS", 2))
+# On-demand resizing (/uploads/<filename>?w=&fmt=). Requested widths are rounded up to one of
+# IMAGE_RESIZE_WIDTHS so clients cannot fill the cache with arbitrary sizes.
+app.config["IMAGE_RESIZE_WIDTHS"] = [int(w) for w in os.environ.get("IMAGE_RESIZE_WIDTHS", "80,160,320,480,640,960,1280,1920").split(",")]
+app.config["IMAGE_RESIZE_CACHE_DIR"] = os.environ.get("IMAGE_RESIZE_CACHE_DIR", os.path.join(basedir, "image_cache"))
+app.config["IMAGE_RESIZE_CACHE_MAX_BYTES"] = int(os.environ.get("IMAGE_RESIZE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# Who transfers /uploads files: "" streams them from Python; "x-accel-redirect" hands them to nginx,
+# which needs internal locations MEDIA_ACCEL_PREFIX + "uploads/" and + "image_cache/" aliased to
+# UPLOAD_FOLDER and IMAGE_RESIZE_CACHE_DIR; "x-sendfile" gives Apache/lighttpd the absolute path.
+app.config["MEDIA_SENDFILE"] = os.environ.get("MEDIA_SENDFILE", "").lower()
+app.config["MEDIA_ACCEL_PREFIX"] = os.environ.get("MEDIA_ACCEL_PREFIX", "/_media/")
+
+# Keyset pagination for list endpoints (?limit=&cursor=)
+app.config["PAGINATION_DEFAULT_LIMIT"] = int(os.environ.get("PAGINATION_DEFAULT_LIMIT", 50))
+app.config["PAGINATION_MAX_LIMIT"] = int(os.environ.get("PAGINATION_MAX_LIMIT", 100))
+
+# Typeahead suggestions (/api/search/suggest)
+app.config["SUGGEST_INDEX_TTL"] = int(os.environ.get("SUGGEST_INDEX_TTL", 60))
+app.config["SUGGEST_MAX_LIMIT"] = int(os.environ.get("SUGGEST_MAX_LIMIT", 20))
+
+# Real-time chat delivery (/api/messages/stream). memory:// only reaches clients on the same worker;
+# use a redis:// or postgresql:// URL to fan out across gunicorn workers, and always when the
+# Procfile's `stream` process serves the streams, since messages are posted to the `web` process.
+app.config["CHAT_BROKER_URL"] = os.environ.get("CHAT_BROKER_URL", "memory://")
+app.config["CHAT_STREAM_HEARTBEAT"] = int(os.environ.get("CHAT_STREAM_HEARTBEAT", 15))
+# Open streams per worker process; further connections get 503. An open stream holds its request
+# thread, so under gthread keep this well below --threads. The Procfile's `stream` process serves the
+# streams on gevent workers, where a stream is a greenlet, and raises the limit there.
+app.config["CHAT_MAX_STREAMS"] = int(os.environ.get("CHAT_MAX_STREAMS", 4))
+
+# Home feed (/api/feed). Posts are copied into followers' and members' timelines when written,
+# except for authors/communities with at least FEED_FANOUT_THRESHOLD followers/members, whose
+# posts are merged in when the feed is read. A follow or join copies in at most FEED_REBUILD_LIMIT
+# of that author's or community's posts; FEED_REBUILD_LIMIT also caps a timeline rebuilt by
+# `flask rebuild-feeds`.
+app.config["FEED_FANOUT_THRESHOLD"] = int(os.environ.get("FEED_FANOUT_THRESHOLD", 1000))
+app.config["FEED_REBUILD_LIMIT"] = int(os.environ.get("FEED_REBUILD_LIMIT", 500))
+
+# Most user + community ids POST /api/relationships answers in one request
+app.config["RELATIONSHIPS_MAX_IDS"] = int(os.environ.get("RELATIONSHIPS_MAX_IDS", 200))
+
+# Response cache for anonymous public reads. memory:// is per worker; sqlite:////path/cache.db is
+# shared by every worker on the host.
+app.config["RESPONSE_CACHE_ENABLED"] = os.environ.get("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+app.config["RESPONSE_CACHE_URL"] = os.environ.get("RESPONSE_CACHE_URL", "memory://")
+app.config["RESPONSE_CACHE_TTL"] = int(os.environ.get("RESPONSE_CACHE_TTL", 60))
+app.config["RESPONSE_CACHE_MAX_ENTRIES"] = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 1024))
+
+# Password hashing runs on its own bounded thread pool; once PASSWORD_HASH_MAX_PENDING calls are
+# waiting, logins get 503 instead of occupying more request threads, so keep it below the request
+# threads per worker (--threads 8 in the Procfile). Every gunicorn worker (WEB_CONCURRENCY) has its own
+# pool, so by default the cores are shared out between them. Stored hashes made with a different
+# BCRYPT_LOG_ROUNDS are rehashed at the user's next successful login.
+app.config["BCRYPT_LOG_ROUNDS"] = int(os.environ.get("BCRYPT_LOG_ROUNDS", 12))
+app.config["PASSWORD_HASH_WORKERS"] = int(os.environ.get("PASSWORD_HASH_WORKERS", default_workers()))
+app.config["PASSWORD_HASH_MAX_PENDING"] = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 4))
+
+# Per-request Server-Timing header and timing log record for a sample of requests; requests slower
+# than REQUEST_TIMING_SLOW_MS also log their slowest statements with parameters.
+app.config["REQUEST_TIMING_SAMPLE_RATE"] = float(os.environ.get("REQUEST_TIMING_SAMPLE_RATE", 0.1))
+app.config["REQUEST_TIMING_SLOW_MS"] = int(os.environ.get("REQUEST_TIMING_SLOW_MS", 500))
+app.config["REQUEST_TIMING_SLOW_STATEMENTS"] = int(os.environ.get("REQUEST_TIMING_SLOW_STATEMENTS", 5))
+
+# Prometheus metrics at /metrics. Pool and password-hasher gauges are re-read every
+# METRICS_REFRESH_SECONDS; a non-empty METRICS_TOKEN must be sent as a bearer token to scrape, and
+# to read the internal /api/.../stats endpoints. Set it in production.
+app.config["METRICS_REFRESH_SECONDS"] = int(os.environ.get("METRICS_REFRESH_SECONDS", 5))
+app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN", "")
+
+# Unbounded lists (followers, joined communities) are streamed: rows are read JSON_STREAM_BATCH_SIZE
+# at a time with yield_per and written out as they are encoded.
+app.config["JSON_STREAM_BATCH_SIZE"] = int(os.environ.get("JSON_STREAM_BATCH_SIZE", 500))
+
+class AppJSONProvider(TimedJSONProvider, OrjsonProvider):
+    """orjson encoding, with the time it takes counted in the request's Server-Timing."""
 
 # Initialize Extensions
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={"class_": RoutingSession})
 migrate = Migrate(app, db)
-bcrypt = Bcrypt(app)
+password_hasher = PasswordHasher(app.config["BCRYPT_LOG_ROUNDS"], app.config["PASSWORD_HASH_WORKERS"],
+                                  app.config["PASSWORD_HASH_MAX_PENDING"])
 jwt = JWTManager(app)
+app.json = AppJSONProvider(app)
+request_timer = RequestTimer(app)
+metrics = PrometheusMetrics(app)
+chat_broker = create_broker(app.config["CHAT_BROKER_URL"])
+chat_stream_slots = threading.BoundedSemaphore(app.config["CHAT_MAX_STREAMS"])
+frontend_assets = StaticManifest(app.config["FRONTEND_BUILD_DIR"])
+resize_cache = ResizeCache(app.config["IMAGE_RESIZE_CACHE_DIR"], app.config["IMAGE_RESIZE_CACHE_MAX_BYTES"])
+response_cache = ResponseCache(
+    create_backend(app.config["RESPONSE_CACHE_URL"], app.config["RESPONSE_CACHE_MAX_ENTRIES"]),
+    default_ttl=app.config["RESPONSE_CACHE_TTL"],
+    write_hold_seconds=app.config["DATABASE_PRIMARY_STICKY_SECONDS"] if app.config["DATABASE_REPLICA_URLS"] else 0
+)
+replica_set = ReplicaSet(
+    [create_engine(url, **database_engine_options(url)) for url in app.config["DATABASE_REPLICA_URLS"]],
+    check_interval=app.config["DATABASE_REPLICA_CHECK_INTERVAL"], retry_after=app.config["DATABASE_REPLICA_RETRY_AFTER"]
+)
+primary_pins = create_backend(app.config["DATABASE_STICKY_URL"], 10000)
 
 # --- Flask-JWT-Extended Error Handlers ---
 @jwt.unauthorized_loader
@@ -113,10 +271,24 @@ def handle_jwt_error(e):
     else:
         return jsonify({"message": f"JWT Error: {str(e)}"}), 401
 
+@app.errorhandler(PaginationError)
+def handle_pagination_error(e):
+    return jsonify({"message": str(e)}), 400
+
+@app.errorhandler(HasherBusy)
+def handle_hasher_busy(e):
+    return jsonify({"message": "Too many sign-ins at the moment, please try again shortly"}), 503, {"Retry-After": "1"}
+
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def save_uploaded_image(file):
+    """Store an uploaded image under its content hash, queue its resized variants and return its URL."""
+    filename = store_image(file.stream, app.config["UPLOAD_FOLDER"])
+    schedule_variants(app.config["UPLOAD_FOLDER"], filename, app.config["IMAGE_WORKERS"])
+    return f"/uploads/{filename}"
+
 # --- Models ---
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -125,6 +297,11 @@ class User(db.Model):
     password_hash = db.Column(db.String(128), nullable=False)
     bio = db.Column(db.Text, nullable=True, default="")
     profile_picture_url = db.Column(db.String(255), nullable=True)
+    # Maintained by adjust_follow_counts() in the same transaction as each follow/unfollow;
+    # `flask reconcile-follow-counts` repairs any drift.
+    followers_count = db.Column(db.Integer, nullable=False, default=0)
+    following_users_count = db.Column(db.Integer, nullable=False, default=0)
+    following_communities_count = db.Column(db.Integer, nullable=False, default=0)
 
     posts = db.relationship("Post", backref="author", lazy=True, cascade="all, delete-orphan")
     comments = db.relationship("Comment", backref="comment_author", lazy=True, cascade="all, delete-orphan")
@@ -143,14 +320,15 @@ class User(db.Model):
     received_messages = db.relationship("Message", foreign_keys="Message.receiver_id", backref="receiver", lazy=True)
 
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode("utf-8")
+        self.password_hash = password_hasher.hash(password)
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.verify(password, self.password_hash)
 
     def to_dict(self):
         return {
             "id": self.id, "username": self.username, "email": self.email, "bio": self.bio,
-            "profile_picture_url": self.profile_picture_url
+            "profile_picture_url": self.profile_picture_url,
+            "profile_picture_variants": variant_urls(self.profile_picture_url)
         }
 
 class Post(db.Model):
@@ -158,21 +336,30 @@ class Post(db.Model):
     title = db.Column(db.String(255), nullable=False)
     content = db.Column(db.Text, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
     image_url = db.Column(db.String(255), nullable=True)
     community_id = db.Column(db.Integer, db.ForeignKey("community.id"), nullable=True)
 
+    # Newest-first listings: all posts, a user's posts, a community's posts (keyset on created_at, id).
+    __table_args__ = (
+        db.Index("ix_post_created_at_id", "created_at", "id"),
+        db.Index("ix_post_user_created", "user_id", "created_at", "id"),
+        db.Index("ix_post_community_created", "community_id", "created_at", "id"),
+    )
+
     comments = db.relationship("Comment", backref="post", lazy=True, cascade="all, delete-orphan")
     community = db.relationship("Community", backref="posts")
-    likes = db.Column(db.Text, default="[]")
+    likes_count = db.Column(db.Integer, nullable=False, default=0)
+    like_records = db.relationship("PostLike", backref="post", lazy="dynamic", cascade="all, delete-orphan")
 
-    def to_dict(self):
+    def to_dict(self, liked_by_me=False):
         return {
             "id": self.id, "title": self.title, "content": self.content, "user_id": self.user_id,
             "author_username": self.author.username if self.author else None,
             "created_at": self.created_at.isoformat(),
-            "likes": json.loads(self.likes),
-            "image_url": self.image_url, "community_id": self.community_id
+            "likes_count": self.likes_count, "liked_by_me": liked_by_me,
+            "image_url": self.image_url, "image_variants": variant_urls(self.image_url),
+            "community_id": self.community_id
         }
 
 class Comment(db.Model):
@@ -180,21 +367,41 @@ class Comment(db.Model):
     post_id = db.Column(db.Integer, db.ForeignKey("post.id"), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     text = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
     parent_comment_id = db.Column(db.Integer, db.ForeignKey("comment.id"), nullable=True)
 
+    # Top-level comments of a post, and replies to a comment, both oldest first.
+    __table_args__ = (
+        db.Index("ix_comment_post_parent_created", "post_id", "parent_comment_id", "created_at"),
+        db.Index("ix_comment_parent_created", "parent_comment_id", "created_at"),
+    )
+
     replies = db.relationship("Comment", backref=db.backref("parent", remote_side=[id]), lazy="dynamic", cascade="all, delete-orphan")
-    likes = db.Column(db.Text, default="[]")
+    likes_count = db.Column(db.Integer, nullable=False, default=0)
+    like_records = db.relationship("CommentLike", backref="comment", lazy="dynamic", cascade="all, delete-orphan")
 
-    def to_dict(self):
+    def to_dict(self, liked_by_me=False):
         return {
             "id": self.id, "post_id": self.post_id, "user_id": self.user_id,
             "author_username": self.comment_author.username if self.comment_author else None,
             "text": self.text, "parent_comment_id": self.parent_comment_id,
             "created_at": self.created_at.isoformat(),
-            "likes": json.loads(self.likes)
+            "likes_count": self.likes_count, "liked_by_me": liked_by_me
         }
 
+# One row per (user, target) like; the unique key makes like/unlike idempotent under concurrent clicks.
+class PostLike(db.Model):
+    __tablename__ = "post_likes"
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey("post.id"), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class CommentLike(db.Model):
+    __tablename__ = "comment_likes"
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    comment_id = db.Column(db.Integer, db.ForeignKey("comment.id"), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class MarketplaceItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
@@ -208,43 +415,67 @@ class MarketplaceItem(db.Model):
         return {
             "id": self.id, "name": self.name, "description": self.description, "price": self.price,
             "user_id": self.user_id, "seller_username": self.seller.username if self.seller else None,
-            "contact_info": self.contact_info, "image_url": self.image_url
+            "contact_info": self.contact_info, "image_url": self.image_url,
+            "image_variants": variant_urls(self.image_url)
         }
 
 class Community(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
     description = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
     owner_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
 
+    __table_args__ = (db.Index("ix_community_created_at_id", "created_at", "id"),)
+
     members = db.relationship("CommunityMembership", back_populates="community", lazy=True, cascade="all, delete-orphan")
     messages = db.relationship("Message", foreign_keys="Message.community_id", backref="community_chat", lazy=True)
 
     def to_dict(self):
-        community_posts = [post.to_dict() for post in self.posts]
-        community_posts.sort(key=lambda x: x["created_at"], reverse=True)
         return {
             "id": self.id, "name": self.name, "description": self.description,
             "created_at": self.created_at.isoformat(), "owner_id": self.owner_id,
             "owner_username": self.community_owner.username if self.community_owner else None,
-            "member_count": len(self.members),
+            "member_count": self.member_count, "post_count": self.post_count,
         }
 
 class CommunityMembership(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
     community_id = db.Column(db.Integer, db.ForeignKey("community.id"), primary_key=True)
-    joined_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    joined_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # The primary key starts with user_id; member counts and popular-community checks go by community.
+    __table_args__ = (db.Index("ix_community_membership_community", "community_id", "user_id"),)
 
     user = db.relationship("User", back_populates="community_memberships")
     community = db.relationship("Community", back_populates="members")
 
+# Full-text index on post title/content (tsvector + GIN on PostgreSQL, FTS5 on SQLite), see search.py
+event.listen(Post.__table__, "after_create", create_post_search_index)
+event.listen(Post.__table__, "before_drop", drop_post_search_index)
+
+# Counts are correlated subqueries evaluated by the database; undefer them (see community_load_options)
+# to fetch them in the same statement as the communities instead of loading every member and post.
+Community.member_count = db.column_property(
+    select(func.count()).where(CommunityMembership.community_id == Community.id)
+    .correlate_except(CommunityMembership).scalar_subquery(),
+    deferred=True
+)
+Community.post_count = db.column_property(
+    select(func.count()).where(Post.community_id == Community.id)
+    .correlate_except(Post).scalar_subquery(),
+    deferred=True
+)
+
 class Follow(db.Model):
     __tablename__ = "follows"
     follower_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
     followed_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
     followed_type = db.Column(db.String(20), nullable=False, default="user")
-    timestamp = db.Column(db.DateTime, default=db.func.current_timestamp())
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # The primary key serves lookups by follower; this one serves "who follows X" and followed-by checks.
+    __table_args__ = (db.Index("ix_follows_followed_follower", "followed_id", "follower_id"),)
 
     def to_dict(self):
         return {
@@ -252,15 +483,31 @@ class Follow(db.Model):
             "followed_type": self.followed_type, "timestamp": self.timestamp.isoformat()
         }
 
+# Fan-out-on-write home feed: one row per (reader, post); see fan_out_post(), add_to_timeline() and remove_from_timeline().
+class TimelineEntry(db.Model):
+    __tablename__ = "timeline_entries"
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey("post.id", ondelete="CASCADE"), primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False)  # copy of post.created_at, the feed's sort key
+
+    __table_args__ = (db.Index("ix_timeline_entries_user_created", "user_id", "created_at", "post_id"),)
+
 class Message(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     sender_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     receiver_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
     community_id = db.Column(db.Integer, db.ForeignKey("community.id"), nullable=True)
     text = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.DateTime, default=db.func.current_timestamp())
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     is_read = db.Column(db.Boolean, default=False)
 
+    # Community chat history (keyset on timestamp, id) and a sender's messages to one receiver.
+    # Direct-message history by user pair uses the expression index ix_message_direct_pair below.
+    __table_args__ = (
+        db.Index("ix_message_community_timestamp", "community_id", "timestamp", "id"),
+        db.Index("ix_message_sender_receiver", "sender_id", "receiver_id"),
+    )
+
     def to_dict(self):
         sender_username = self.sender.username if self.sender else None
         receiver_username = self.receiver.username if self.receiver else None
@@ -273,6 +520,302 @@ class Message(db.Model):
             "text": self.text, "timestamp": self.timestamp.isoformat(), "is_read": self.is_read
         }
 
+# Direct-message history is looked up by the unordered user pair, newest first; see direct_pair().
+event.listen(Message.__table__, "after_create", DDL(
+    "CREATE INDEX IF NOT EXISTS ix_message_direct_pair ON message "
+    "(LEAST(sender_id, receiver_id), GREATEST(sender_id, receiver_id), timestamp)"
+).execute_if(dialect="postgresql"))
+event.listen(Message.__table__, "after_create", DDL(
+    "CREATE INDEX IF NOT EXISTS ix_message_direct_pair ON message "
+    "(min(sender_id, receiver_id), max(sender_id, receiver_id), timestamp)"
+).execute_if(dialect="sqlite"))
+
+# Cached responses describe the old tables once the schema is (re)created.
+@event.listens_for(db.metadata, "after_create")
+def clear_response_cache(target, connection, **kw):
+    response_cache.clear()
+
+# --- Typeahead Indexes ---
+# In-memory prefix indexes for /api/search/suggest. Rows a commit in this process adds, renames
+# or deletes are patched in after the commit; the whole index is reloaded every SUGGEST_INDEX_TTL
+# seconds to pick up other processes' writes. Other column changes (counters, password rehashes)
+# leave the indexes alone.
+user_suggestions = PrefixIndex(
+    lambda: db.session.query(User.id, User.username, User.profile_picture_url).all(),
+    ttl=app.config["SUGGEST_INDEX_TTL"]
+)
+community_suggestions = PrefixIndex(
+    lambda: [(community_id, name, None) for community_id, name in db.session.query(Community.id, Community.name)],
+    ttl=app.config["SUGGEST_INDEX_TTL"]
+)
+
+# model -> (index, columns it holds as (id, name, avatar)); None when the model has no avatar.
+SUGGESTION_COLUMNS = {
+    User: (user_suggestions, ("username", "profile_picture_url")),
+    Community: (community_suggestions, ("name", None)),
+}
+
+@event.listens_for(db.session, "after_flush")
+def track_suggestion_writes(session, flush_context):
+    # Attribute history still describes this flush here; the changes are applied after commit.
+    changes = session.info.setdefault("suggestion_changes", [])
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if type(obj) not in SUGGESTION_COLUMNS:
+            continue
+        index, columns = SUGGESTION_COLUMNS[type(obj)]
+        if obj in session.deleted:
+            changes.append((index, obj.id, None))
+        elif obj in session.new or any(
+            column and inspect(obj).attrs[column].history.has_changes() for column in columns
+        ):
+            changes.append((index, obj.id, tuple(column and getattr(obj, column) for column in columns)))
+
+@event.listens_for(db.session, "do_orm_execute")
+def track_statement_suggestion_writes(state):
+    # Rows created with statement-level INSERTs (see db_writes.py) never pass through the flush.
+    # insert_suggestion_row() records its single row itself; for any other INSERT the ids are
+    # unknown here, so the index is reloaded instead.
+    if (state.is_insert and state.bind_mapper is not None and state.bind_mapper.class_ in SUGGESTION_COLUMNS
+            and not state.execution_options.get("suggestion_recorded")):
+        index, _ = SUGGESTION_COLUMNS[state.bind_mapper.class_]
+        state.session.info.setdefault("suggestion_changes", []).append((index, None, None))
+
+def insert_suggestion_row(model, **values):
+    """insert_unique() for a User or Community; the new row is added to its suggestion index after commit."""
+    row_id = insert_unique(db.session, model, execution_options={"suggestion_recorded": True}, **values)
+    if row_id is not None:
+        index, columns = SUGGESTION_COLUMNS[model]
+        db.session.info.setdefault("suggestion_changes", []).append(
+            (index, row_id, tuple(column and values.get(column) for column in columns)))
+    return row_id
+
+@event.listens_for(db.session, "after_commit")
+def refresh_suggestions_after_commit(session):
+    for index, row_id, values in session.info.pop("suggestion_changes", ()):
+        if row_id is None:
+            index.invalidate()
+        elif values is None:
+            index.remove(row_id)
+        else:
+            index.upsert(row_id, *values)
+
+@event.listens_for(db.session, "after_rollback")
+def discard_suggestion_writes(session):
+    session.info.pop("suggestion_changes", None)
+
+# --- Serialization Helpers ---
+def current_user_id_or_none():
+    identity = get_jwt_identity()
+    return int(identity) if identity else None
+
+def request_user_id():
+    """The current request's user id, or None; unlike get_jwt_identity() this works on any route and never raises."""
+    try:
+        verify_jwt_in_request(optional=True)
+    except (JWTExtendedException, PyJWTError):
+        return None
+    return current_user_id_or_none()
+
+# --- Read Replica Routing ---
+def primary_pin_key(user_id):
+    return f"primary-pin:user:{user_id}"
+
+def read_replica(view):
+    """Run a read-only view's queries on a replica, unless the caller is pinned to the primary (see DATABASE_PRIMARY_STICKY_SECONDS)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_id = request_user_id()
+        if replica_set and (not user_id or primary_pins.get(primary_pin_key(user_id)) is None):
+            g.read_replica = replica_set.choose()
+            # Outlives g.read_replica, so the response cache knows what it is about to store came from a replica.
+            g.read_from_replica = g.read_replica is not None
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g.pop("read_replica", None)
+    return wrapper
+
+@app.after_request
+def pin_writers_to_primary(response):
+    if replica_set and request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        user_id = request_user_id()
+        if user_id:
+            primary_pins.set(primary_pin_key(user_id), "1", app.config["DATABASE_PRIMARY_STICKY_SECONDS"])
+    return response
+
+def liked_target_ids(target_column, user_id, target_ids):
+    # One query for the whole page instead of one per row.
+    if not user_id or not target_ids:
+        return set()
+    like_model = target_column.class_
+    rows = db.session.query(target_column).filter(like_model.user_id == user_id, target_column.in_(target_ids))
+    return {row[0] for row in rows}
+
+# Loader options for the relationships each to_dict() reads, so list routes issue a fixed
+# number of statements instead of one lazy load per row.
+def community_load_options():
+    return [joinedload(Community.community_owner), undefer(Community.member_count), undefer(Community.post_count)]
+
+def message_load_options():
+    return [joinedload(Message.sender), joinedload(Message.receiver), joinedload(Message.community_chat)]
+
+def direct_pair(first_column, second_column):
+    # LEAST/GREATEST on PostgreSQL; SQLite's multi-argument min()/max() are the scalar equivalents.
+    # Must match the ix_message_direct_pair expressions for the index to be used.
+    if db.engine.dialect.name == "sqlite":
+        return func.min(first_column, second_column), func.max(first_column, second_column)
+    return func.least(first_column, second_column), func.greatest(first_column, second_column)
+
+def chat_topic(receiver_id=None, community_id=None, sender_id=None):
+    if community_id:
+        return f"community:{community_id}"
+    return f"direct:{min(sender_id, receiver_id)}:{max(sender_id, receiver_id)}"
+
+def posts_to_dicts(posts):
+    liked = liked_target_ids(PostLike.post_id, request_user_id(), [p.id for p in posts])
+    return [post.to_dict(liked_by_me=post.id in liked) for post in posts]
+
+def comments_to_dicts(comments):
+    liked = liked_target_ids(CommentLike.comment_id, request_user_id(), [c.id for c in comments])
+    return [comment.to_dict(liked_by_me=comment.id in liked) for comment in comments]
+
+def apply_like_toggle(like_model, target_model, target_column, target_id, user_id, liking):
+    """Insert or delete a like row and move the target's counter in the same transaction.
+
+    Returns the new likes_count, or None when the like/unlike was a no-op.
+    """
+    if liking:
+        changed = insert_or_ignore(db.session, like_model, user_id=user_id, **{target_column: target_id})
+    else:
+        changed = like_model.query.filter_by(user_id=user_id, **{target_column: target_id}).delete() == 1
+    if not changed:
+        db.session.rollback()
+        return None
+    delta = 1 if liking else -1
+    likes_count = db.session.execute(
+        update(target_model).where(target_model.id == target_id)
+        .values(likes_count=target_model.likes_count + delta)
+        .returning(target_model.likes_count)
+    ).scalar()
+    db.session.commit()
+    return likes_count
+
+# --- Follow Counters ---
+def adjust_follow_counts(follower_id, followed_id, followed_type, delta):
+    follows.adjust_follow_counts(db.session, User, follower_id, followed_id, followed_type, delta)
+
+def follow_count_subquery(user_column, followed_type):
+    return (select(func.count()).select_from(Follow)
+            .where(user_column == User.id, Follow.followed_type == followed_type)
+            .correlate(User).scalar_subquery())
+
+@app.cli.command("reconcile-follow-counts")
+def reconcile_follow_counts_command():
+    """Recompute the denormalized follower/following counters from the follows table."""
+    actual = {
+        User.followers_count: follow_count_subquery(Follow.followed_id, "user"),
+        User.following_users_count: follow_count_subquery(Follow.follower_id, "user"),
+        User.following_communities_count: follow_count_subquery(Follow.follower_id, "community"),
+    }
+    drifted = or_(*[column != count for column, count in actual.items()])
+    repaired = db.session.execute(update(User).where(drifted).values(actual)).rowcount
+    db.session.commit()
+    click.echo(f"Repaired follow counts for {repaired} user(s)")
+
+def relationship_map(viewer_id, user_ids=(), community_ids=()):
+    """Follow and membership status of `viewer_id` towards many users and communities, in one query.
+
+    Returns {"users": {id: {"following", "followed_by"}}, "communities": {id: {"member", "following"}}}.
+    """
+    return follows.relationship_map(db.session, Follow, viewer_id, user_ids, community_ids, CommunityMembership)
+
+# --- Home Feed ---
+def popular_user_ids():
+    # Users whose posts are too widely followed to copy into every follower's timeline.
+    return select(User.id).where(User.followers_count >= app.config["FEED_FANOUT_THRESHOLD"])
+
+def popular_community_ids(among):
+    # Only counts the members of `among` (ids or a subquery), never the whole membership table.
+    return (select(CommunityMembership.community_id).where(CommunityMembership.community_id.in_(among))
+            .group_by(CommunityMembership.community_id).having(func.count() >= app.config["FEED_FANOUT_THRESHOLD"]))
+
+def fan_out_post(post):
+    """Copy a new (flushed) post into the timelines of its author, the author's followers and
+    the community's members, in the caller's transaction."""
+    recipients = [select(literal(post.user_id).label("user_id"))]
+    if post.user_id not in db.session.scalars(popular_user_ids().where(User.id == post.user_id)).all():
+        recipients.append(select(Follow.follower_id).where(Follow.followed_id == post.user_id, Follow.followed_type == "user"))
+    if post.community_id and not db.session.scalars(popular_community_ids([post.community_id])).first():
+        recipients.append(select(CommunityMembership.user_id).where(CommunityMembership.community_id == post.community_id))
+    recipient_ids = (union(*recipients) if len(recipients) > 1 else recipients[0]).subquery()
+    db.session.execute(insert(TimelineEntry).from_select(
+        ["user_id", "post_id", "created_at"],
+        select(recipient_ids.c.user_id, literal(post.id), literal(post.created_at))
+    ))
+
+def followed_user_ids(user_id):
+    return select(Follow.followed_id).where(Follow.follower_id == user_id, Follow.followed_type == "user")
+
+def joined_community_ids(user_id):
+    return select(CommunityMembership.community_id).where(CommunityMembership.user_id == user_id)
+
+def add_to_timeline(user_id, author_id=None, community_id=None):
+    """After a follow or join, copy the newest FEED_REBUILD_LIMIT posts of that author or community
+    into the reader's timeline, in the caller's transaction. Popular ones are merged on read instead."""
+    if author_id is not None:
+        if db.session.scalars(popular_user_ids().where(User.id == author_id)).first():
+            return
+        source = Post.user_id == author_id
+    else:
+        if db.session.scalars(popular_community_ids([community_id])).first():
+            return
+        source = Post.community_id == community_id
+    posts = (select(literal(user_id), Post.id, Post.created_at).where(source)
+             .order_by(Post.created_at.desc(), Post.id.desc()).limit(app.config["FEED_REBUILD_LIMIT"]))
+    insert_select_or_ignore(db.session, TimelineEntry, ["user_id", "post_id", "created_at"], posts)
+
+def remove_from_timeline(user_id, author_id=None, community_id=None):
+    """After an unfollow or leave, drop that author's or community's posts from the reader's timeline,
+    keeping those the reader still gets another way (own posts, other follows and memberships)."""
+    if author_id is not None:
+        dropped = select(Post.id).where(Post.user_id == author_id, or_(
+            Post.community_id.is_(None), Post.community_id.not_in(joined_community_ids(user_id))))
+    else:
+        dropped = select(Post.id).where(Post.community_id == community_id, Post.user_id != user_id,
+                                        Post.user_id.not_in(followed_user_ids(user_id)))
+    db.session.execute(delete(TimelineEntry).where(TimelineEntry.user_id == user_id, TimelineEntry.post_id.in_(dropped)))
+
+def rebuild_timeline(user_id):
+    """Recompute one reader's timeline from their current follows and memberships, in the caller's transaction."""
+    TimelineEntry.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    followed = followed_user_ids(user_id).where(Follow.followed_id.not_in(popular_user_ids()))
+    joined = joined_community_ids(user_id).where(
+        CommunityMembership.community_id.not_in(popular_community_ids(joined_community_ids(user_id)))
+    )
+    posts = (select(literal(user_id), Post.id, Post.created_at)
+             .where(or_(Post.user_id == user_id, Post.user_id.in_(followed), Post.community_id.in_(joined)))
+             .order_by(Post.created_at.desc(), Post.id.desc()).limit(app.config["FEED_REBUILD_LIMIT"]))
+    db.session.execute(insert(TimelineEntry).from_select(["user_id", "post_id", "created_at"], posts))
+
+@app.cli.command("rebuild-feeds")
+@click.option("--user-id", type=int, default=None, help="Only rebuild this user's timeline.")
+def rebuild_feeds_command(user_id):
+    """Rebuild home-feed timelines from current follows and community memberships."""
+    user_ids = [user_id] if user_id else db.session.scalars(select(User.id)).all()
+    for uid in user_ids:
+        rebuild_timeline(uid)
+        db.session.commit()
+    click.echo(f"Rebuilt {len(user_ids)} timeline(s)")
+
+@app.cli.command("benchmark-password-hashing")
+@click.option("--seconds", type=float, default=5.0, help="How long to hash for.")
+@click.option("--rounds", type=int, default=None, help="bcrypt cost factor (defaults to BCRYPT_LOG_ROUNDS).")
+def benchmark_password_hashing_command(seconds, rounds):
+    """Measure bcrypt throughput on this machine, to size BCRYPT_LOG_ROUNDS and PASSWORD_HASH_WORKERS."""
+    rounds = rounds or app.config["BCRYPT_LOG_ROUNDS"]
+    rate, per_core = benchmark_hashing(rounds, seconds)
+    click.echo(f"bcrypt cost {rounds}: {rate:.1f} hashes/s on {os.cpu_count() or 1} core(s), {per_core:.1f} hashes/s per core")
+
 # --- Authentication Routes ---
 @app.route("/api/register", methods=["POST"])
 def register():
@@ -280,11 +823,13 @@ def register():
     username, email, password = data.get("username"), data.get("email"), data.get("password")
     if not all([username, email, password]):
         return jsonify({"message": "Missing username, email, or password"}), 400
-    if User.query.filter_by(username=username).first() or User.query.filter_by(email=email).first():
+    # Turn away known duplicates before spending a bcrypt hash on them.
+    if db.session.scalar(select(exists().where(or_(User.username == username, User.email == email)))):
+        return jsonify({"message": "Username or email already exists"}), 409
+    # The unique constraints still decide duplicates, so two simultaneous sign-ups cannot both succeed.
+    if insert_suggestion_row(User, username=username, email=email, password_hash=password_hasher.hash(password)) is None:
+        db.session.rollback()
         return jsonify({"message": "Username or email already exists"}), 409
-    new_user = User(username=username, email=email)
-    new_user.set_password(password)
-    db.session.add(new_user)
     db.session.commit()
     return jsonify({"message": "User registered successfully!"}), 201
 
@@ -294,6 +839,9 @@ def login():
     username, password = data.get("username"), data.get("password")
     user = User.query.filter_by(username=username).first()
     if user and user.check_password(password):
+        if password_hasher.needs_rehash(user.password_hash):
+            user.set_password(password)
+            db.session.commit()
         access_token = create_access_token(identity=str(user.id))
         return jsonify({"message": "Logged in successfully!", "access_token": access_token, "user": user.to_dict()}), 200
     return jsonify({"message": "Invalid credentials"}), 401
@@ -345,14 +893,13 @@ def update_user_profile():
     if "profile_picture" in request.files:
         file = request.files["profile_picture"]
         if file.filename != "" and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
             try:
-                file.save(filepath)
-                new_profile_picture_url = f"/uploads/{filename}"
+                new_profile_picture_url = save_uploaded_image(file)
                 if new_profile_picture_url != user.profile_picture_url:
                     user.profile_picture_url = new_profile_picture_url
                     updated = True
+            except InvalidImageError:
+                return jsonify({"message": "Invalid profile picture file type"}), 400
             except Exception as e:
                 app.logger.error(f"Failed to save profile picture: {e}")
                 return jsonify({"message": "Failed to save profile picture"}), 500
@@ -363,11 +910,12 @@ def update_user_profile():
             user.profile_picture_url = new_profile_picture_url
             updated = True
 
+    username_changed = False
     if new_username is not None and new_username != user.username:
         if User.query.filter_by(username=new_username).first():
             return jsonify({"message": "Username already taken"}), 409
         user.username = new_username
-        updated = True
+        updated = username_changed = True
     if new_email is not None and new_email != user.email:
         if User.query.filter_by(email=new_email).first():
             return jsonify({"message": "Email already taken"}), 409
@@ -382,70 +930,78 @@ def update_user_profile():
 
     if updated:
         db.session.commit()
+        if username_changed:
+            # Usernames are embedded in every cached listing (authors, sellers, owners).
+            response_cache.invalidate("profiles")
         return jsonify({"message": "Profile updated successfully!", "user": user.to_dict()}), 200
     return jsonify({"message": "No changes provided or nothing to update", "user": user.to_dict()}), 200
 
 @app.route("/api/users/<int:user_id>", methods=["GET"])
 @jwt_required(optional=True)
+@read_replica
 def get_user_by_id(user_id):
     user = db.session.get(User, user_id)
     if not user:
         return jsonify({"message": "User not found"}), 404
     user_data = user.to_dict()
-    user_data["followers_count"] = user.followers.count()
-    user_data["following_users_count"] = user.following.filter_by(followed_type="user").count()
-    user_data["following_communities_count"] = user.following.filter_by(followed_type="community").count()
-    current_viewer_id = get_jwt_identity()
+    user_data["followers_count"] = user.followers_count
+    user_data["following_users_count"] = user.following_users_count
+    user_data["following_communities_count"] = user.following_communities_count
+    current_viewer_id = current_user_id_or_none()
     user_data["is_followed_by_current_user"] = False
-    if current_viewer_id and int(current_viewer_id) != user_id:
-        user_data["is_followed_by_current_user"] = db.session.query(Follow).filter_by(
-            follower_id=int(current_viewer_id), followed_id=user_id, followed_type="user"
-        ).first() is not None
+    if current_viewer_id and current_viewer_id != user_id:
+        relationships = relationship_map(current_viewer_id, user_ids=[user_id])
+        user_data["is_followed_by_current_user"] = relationships["users"][user_id]["following"]
     return jsonify(user_data), 200
 
 @app.route("/api/users", methods=["GET"])
+@read_replica
 def get_all_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users]), 200
+    limit, cursor = get_page_args()
+    users, next_cursor = paginate(User.query, [User.id], limit, cursor, descending=False)
+    return paginated_response([user.to_dict() for user in users], next_cursor), 200
 
 @app.route("/api/users/<int:user_id>/posts", methods=["GET"])
+@read_replica
 def get_posts_by_user(user_id):
     user = db.session.get(User, user_id)
     if not user:
         return jsonify({"message": "User not found"}), 404
-    posts = Post.query.filter_by(user_id=user_id).order_by(Post.created_at.desc()).all()
-    posts_data = [post.to_dict() for post in posts]
-    return jsonify(posts_data), 200
+    limit, cursor = get_page_args()
+    posts, next_cursor = paginate(Post.query.options(joinedload(Post.author)).filter_by(user_id=user_id), [Post.created_at, Post.id], limit, cursor)
+    return paginated_response(posts_to_dicts(posts), next_cursor), 200
 
 @app.route("/api/users/<int:user_id>/joined_communities", methods=["GET"])
+@read_replica
 def get_communities_user_joined(user_id):
     user = db.session.get(User, user_id)
     if not user:
         return jsonify({"message": "User not found"}), 404
-    joined_memberships = CommunityMembership.query.filter_by(user_id=user_id).all()
-    joined_communities_data = []
-    for membership in joined_memberships:
-        community = membership.community
-        if community:
-            joined_communities_data.append({
-                "id": community.id, "name": community.name, "description": community.description, "owner_id": community.owner_id
-            })
-    return jsonify(joined_communities_data), 200
+    rows = db.session.execute(
+        select(Community.id, Community.name, Community.description, Community.owner_id)
+        .join(CommunityMembership, CommunityMembership.community_id == Community.id)
+        .where(CommunityMembership.user_id == user_id)
+        .execution_options(yield_per=app.config["JSON_STREAM_BATCH_SIZE"])
+    )
+    return stream_json_array((row._asdict() for row in rows), app.config["JSON_STREAM_BATCH_SIZE"]), 200
 
 # --- Post Routes ---
 @app.route("/api/posts", methods=["GET"])
+@response_cache.cached(lambda: ["posts", "profiles"])
+@read_replica
 def get_all_posts():
-    posts = Post.query.all()
-    posts_data = [post.to_dict() for post in posts]
-    posts_data.sort(key=lambda x: x["created_at"], reverse=True)
-    return jsonify(posts_data), 200
+    limit, cursor = get_page_args()
+    posts, next_cursor = paginate(Post.query.options(joinedload(Post.author)), [Post.created_at, Post.id], limit, cursor)
+    return paginated_response(posts_to_dicts(posts), next_cursor), 200
 
 @app.route("/api/posts/<int:post_id>", methods=["GET"])
+@response_cache.cached(lambda post_id: [f"post:{post_id}", "profiles"])
+@read_replica
 def get_post_detail(post_id):
-    post = db.session.get(Post, post_id)
+    post = db.session.get(Post, post_id, options=[joinedload(Post.author)])
     if not post:
         return jsonify({"message": "Post not found"}), 404
-    return jsonify(post.to_dict()), 200
+    return jsonify(posts_to_dicts([post])[0]), 200
 
 @app.route("/api/posts", methods=["POST"])
 @jwt_required()
@@ -467,11 +1023,10 @@ def create_post():
     if "image" in request.files:
         file = request.files["image"]
         if file.filename != "" and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
             try:
-                file.save(filepath)
-                image_url = f"/uploads/{filename}"
+                image_url = save_uploaded_image(file)
+            except InvalidImageError:
+                return jsonify({"message": "Invalid image file type"}), 400
             except Exception as e:
                 app.logger.error(f"Failed to save post image: {e}")
                 return jsonify({"message": "Failed to save image"}), 500
@@ -479,9 +1034,39 @@ def create_post():
             return jsonify({"message": "Invalid image file type"}), 400
     new_post = Post(title=title, content=content, user_id=int(user_id), image_url=image_url, community_id=community_id)
     db.session.add(new_post)
+    db.session.flush()
+    fan_out_post(new_post)
     db.session.commit()
+    response_cache.invalidate("posts", *(["communities", f"community:{community_id}"] if community_id else []))
     return jsonify(new_post.to_dict()), 201
 
+@app.route("/api/feed", methods=["GET"])
+@jwt_required()
+def get_feed():
+    user_id = int(get_jwt_identity())
+    limit, cursor = get_page_args()
+    sources = [(
+        Post.query.options(joinedload(Post.author)).join(TimelineEntry, TimelineEntry.post_id == Post.id)
+        .filter(TimelineEntry.user_id == user_id),
+        [TimelineEntry.created_at, TimelineEntry.post_id]
+    )]
+    # Popular authors and communities are not fanned out on write; read their recent posts directly.
+    popular_followed = db.session.scalars(popular_user_ids().where(User.id.in_(
+        select(Follow.followed_id).where(Follow.follower_id == user_id, Follow.followed_type == "user")
+    ))).all()
+    popular_joined = db.session.scalars(popular_community_ids(
+        select(CommunityMembership.community_id).where(CommunityMembership.user_id == user_id)
+    )).all()
+    if popular_followed or popular_joined:
+        sources.append((
+            Post.query.options(joinedload(Post.author)).filter(
+                or_(Post.user_id.in_(popular_followed), Post.community_id.in_(popular_joined))
+            ),
+            [Post.created_at, Post.id]
+        ))
+    posts, next_cursor = paginate_merged(sources, lambda post: (post.created_at, post.id), limit, cursor)
+    return paginated_response(posts_to_dicts(posts), next_cursor), 200
+
 @app.route("/api/posts/<int:post_id>/like", methods=["POST", "DELETE"])
 @jwt_required()
 def handle_post_like(post_id):
@@ -489,38 +1074,39 @@ def handle_post_like(post_id):
     if not post:
         return jsonify({"message": "Post not found"}), 404
     user_id = int(get_jwt_identity())
-    likes = json.loads(post.likes)
     if request.method == "POST":
-        if user_id not in likes:
-            likes.append(user_id)
-            post.likes = json.dumps(likes)
-            db.session.commit()
-            return jsonify({"message": "Post liked successfully", "likes_count": len(likes)}), 200
+        likes_count = apply_like_toggle(PostLike, Post, "post_id", post_id, user_id, liking=True)
+        if likes_count is not None:
+            response_cache.invalidate("posts", f"post:{post_id}")
+            return jsonify({"message": "Post liked successfully", "likes_count": likes_count}), 200
         return jsonify({"message": "Post already liked"}), 409
     elif request.method == "DELETE":
-        if user_id in likes:
-            likes.remove(user_id)
-            post.likes = json.dumps(likes)
-            db.session.commit()
-            return jsonify({"message": "Post unliked successfully", "likes_count": len(likes)}), 200
+        likes_count = apply_like_toggle(PostLike, Post, "post_id", post_id, user_id, liking=False)
+        if likes_count is not None:
+            response_cache.invalidate("posts", f"post:{post_id}")
+            return jsonify({"message": "Post unliked successfully", "likes_count": likes_count}), 200
         return jsonify({"message": "Post not liked by user"}), 409
 
 # --- Comment Routes ---
 @app.route("/api/posts/<int:post_id>/comments", methods=["GET"])
+@read_replica
 def get_comments_for_post(post_id):
     post = db.session.get(Post, post_id)
     if not post:
         return jsonify({"message": "Post not found"}), 404
-    comments = Comment.query.filter_by(post_id=post_id, parent_comment_id=None).order_by(Comment.created_at.asc()).all()
-    return jsonify([comment.to_dict() for comment in comments]), 200
+    comments = Comment.query.options(joinedload(Comment.comment_author)).filter_by(
+        post_id=post_id, parent_comment_id=None
+    ).order_by(Comment.created_at.asc()).all()
+    return jsonify(comments_to_dicts(comments)), 200
 
 @app.route("/api/comments/<int:comment_id>/replies", methods=["GET"])
+@read_replica
 def get_replies_for_comment(comment_id):
     parent_comment = db.session.get(Comment, comment_id)
     if not parent_comment:
         return jsonify({"message": "Parent comment not found"}), 404
-    replies = parent_comment.replies.order_by(Comment.created_at.asc()).all()
-    return jsonify([reply.to_dict() for reply in replies]), 200
+    replies = parent_comment.replies.options(joinedload(Comment.comment_author)).order_by(Comment.created_at.asc()).all()
+    return jsonify(comments_to_dicts(replies)), 200
 
 @app.route("/api/posts/<int:post_id>/comments", methods=["POST"])
 @jwt_required()
@@ -545,31 +1131,31 @@ def handle_comment_like(comment_id):
     if not comment:
         return jsonify({"message": "Comment not found"}), 404
     user_id = int(get_jwt_identity())
-    likes = json.loads(comment.likes)
     if request.method == "POST":
-        if user_id not in likes:
-            likes.append(user_id)
-            comment.likes = json.dumps(likes)
-            db.session.commit()
-            return jsonify({"message": "Comment liked successfully", "likes_count": len(likes)}), 200
+        likes_count = apply_like_toggle(CommentLike, Comment, "comment_id", comment_id, user_id, liking=True)
+        if likes_count is not None:
+            return jsonify({"message": "Comment liked successfully", "likes_count": likes_count}), 200
         return jsonify({"message": "Comment already liked"}), 409
     elif request.method == "DELETE":
-        if user_id in likes:
-            likes.remove(user_id)
-            comment.likes = json.dumps(likes)
-            db.session.commit()
-            return jsonify({"message": "Comment unliked successfully", "likes_count": len(likes)}), 200
+        likes_count = apply_like_toggle(CommentLike, Comment, "comment_id", comment_id, user_id, liking=False)
+        if likes_count is not None:
+            return jsonify({"message": "Comment unliked successfully", "likes_count": likes_count}), 200
         return jsonify({"message": "Comment not liked by user"}), 409
 
 # --- Marketplace Routes ---
 @app.route("/api/marketplace/items", methods=["GET"])
+@response_cache.cached(lambda: ["marketplace", "profiles"])
+@read_replica
 def get_all_marketplace_items():
-    items = MarketplaceItem.query.all()
-    return jsonify([item.to_dict() for item in items]), 200
+    limit, cursor = get_page_args()
+    items, next_cursor = paginate(MarketplaceItem.query.options(joinedload(MarketplaceItem.seller)), [MarketplaceItem.id], limit, cursor)
+    return paginated_response([item.to_dict() for item in items], next_cursor), 200
 
 @app.route("/api/marketplace/items/<int:item_id>", methods=["GET"])
+@response_cache.cached(lambda item_id: ["marketplace", "profiles"])
+@read_replica
 def get_marketplace_item_detail(item_id):
-    item = db.session.get(MarketplaceItem, item_id)
+    item = db.session.get(MarketplaceItem, item_id, options=[joinedload(MarketplaceItem.seller)])
     if not item:
         return jsonify({"message": "Item not found"}), 404
     return jsonify(item.to_dict()), 200
@@ -594,11 +1180,10 @@ def create_marketplace_item():
     if "image" in request.files:
         file = request.files["image"]
         if file.filename != "" and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
             try:
-                file.save(filepath)
-                image_url = f"/uploads/{filename}"
+                image_url = save_uploaded_image(file)
+            except InvalidImageError:
+                return jsonify({"message": "Invalid image file type"}), 400
             except Exception as e:
                 app.logger.error(f"Failed to save marketplace item image: {e}")
                 return jsonify({"message": "Failed to save image"}), 500
@@ -608,17 +1193,23 @@ def create_marketplace_item():
                                contact_info=contact_info, image_url=image_url)
     db.session.add(new_item)
     db.session.commit()
+    response_cache.invalidate("marketplace")
     return jsonify(new_item.to_dict()), 201
 
 # --- Community Routes ---
 @app.route("/api/communities", methods=["GET"])
+@response_cache.cached(lambda: ["communities", "profiles"])
+@read_replica
 def get_all_communities():
-    communities = Community.query.all()
-    return jsonify([c.to_dict() for c in communities]), 200
+    limit, cursor = get_page_args()
+    communities, next_cursor = paginate(Community.query.options(*community_load_options()), [Community.created_at, Community.id], limit, cursor)
+    return paginated_response([c.to_dict() for c in communities], next_cursor), 200
 
 @app.route("/api/communities/<int:community_id>", methods=["GET"])
+@response_cache.cached(lambda community_id: [f"community:{community_id}", "profiles"])
+@read_replica
 def get_community_detail(community_id):
-    community = db.session.get(Community, community_id)
+    community = db.session.get(Community, community_id, options=community_load_options())
     if not community:
         return jsonify({"message": "Community not found"}), 404
     return jsonify(community.to_dict()), 200
@@ -630,29 +1221,30 @@ def create_community():
     user_id, name, description = get_jwt_identity(), data.get("name"), data.get("description")
     if not name:
         return jsonify({"message": "Community name is required"}), 400
-    if Community.query.filter_by(name=name).first():
+    community_id = insert_suggestion_row(Community, name=name, description=description, owner_id=int(user_id))
+    if community_id is None:
+        db.session.rollback()
         return jsonify({"message": "Community with this name already exists"}), 409
-    new_community = Community(name=name, description=description, owner_id=int(user_id))
-    db.session.add(new_community)
-    db.session.commit()
-    membership = CommunityMembership(user_id=int(user_id), community_id=new_community.id)
-    db.session.add(membership)
+    insert_or_ignore(db.session, CommunityMembership, user_id=int(user_id), community_id=community_id)
     db.session.commit()
-    return jsonify(new_community.to_dict()), 201
+    response_cache.invalidate("communities")
+    return jsonify(db.session.get(Community, community_id, options=community_load_options()).to_dict()), 201
 
 @app.route("/api/communities/<int:community_id>/join", methods=["POST"])
 @jwt_required()
 def join_community(community_id):
     user_id = get_jwt_identity()
-    community = db.session.get(Community, community_id)
-    if not community:
-        return jsonify({"message": "Community not found"}), 404
-    if CommunityMembership.query.filter_by(user_id=int(user_id), community_id=community_id).first():
+    if not insert_or_ignore(db.session, CommunityMembership, where=exists().where(Community.id == community_id),
+                            user_id=int(user_id), community_id=community_id):
+        db.session.rollback()
+        # Only failed joins pay for finding out why.
+        if not db.session.get(Community, community_id):
+            return jsonify({"message": "Community not found"}), 404
         return jsonify({"message": "Already a member of this community"}), 409
-    new_membership = CommunityMembership(user_id=int(user_id), community_id=community_id)
-    db.session.add(new_membership)
+    add_to_timeline(int(user_id), community_id=community_id)
     db.session.commit()
-    return jsonify({"message": "Successfully joined community", "community_id": community.id, "current_user_id": int(user_id)}), 200
+    response_cache.invalidate("communities", f"community:{community_id}")
+    return jsonify({"message": "Successfully joined community", "community_id": community_id, "current_user_id": int(user_id)}), 200
 
 @app.route("/api/communities/<int:community_id>/leave", methods=["POST"])
 @jwt_required()
@@ -661,23 +1253,26 @@ def leave_community(community_id):
     community = db.session.get(Community, community_id)
     if not community:
         return jsonify({"message": "Community not found"}), 404
-    membership = CommunityMembership.query.filter_by(user_id=int(user_id), community_id=community_id).first()
-    if not membership:
-        return jsonify({"message": "Not a member of this community"}), 409
     if community.owner_id == int(user_id):
         return jsonify({"message": "Community owner cannot leave their own community without deleting it"}), 403
-    db.session.delete(membership)
+    left = db.session.execute(delete(CommunityMembership).where(
+        CommunityMembership.user_id == int(user_id), CommunityMembership.community_id == community_id)).rowcount
+    if not left:
+        return jsonify({"message": "Not a member of this community"}), 409
+    remove_from_timeline(int(user_id), community_id=community_id)
     db.session.commit()
+    response_cache.invalidate("communities", f"community:{community_id}")
     return jsonify({"message": "Successfully left community", "community_id": community.id, "current_user_id": int(user_id)}), 200
 
 @app.route("/api/communities/<int:community_id>/posts", methods=["GET"])
+@read_replica
 def get_community_posts(community_id):
     community = db.session.get(Community, community_id)
     if not community:
         return jsonify({"message": "Community not found"}), 404
-    posts = Post.query.filter_by(community_id=community_id).order_by(Post.created_at.desc()).all()
-    posts_data = [post.to_dict() for post in posts]
-    return jsonify(posts_data), 200
+    limit, cursor = get_page_args()
+    posts, next_cursor = paginate(Post.query.options(joinedload(Post.author)).filter_by(community_id=community_id), [Post.created_at, Post.id], limit, cursor)
+    return paginated_response(posts_to_dicts(posts), next_cursor), 200
 
 # --- Follow Routes (Users) ---
 @app.route("/api/users/<int:user_id>/follow", methods=["POST"])
@@ -686,12 +1281,14 @@ def follow_user(user_id):
     current_user_id = int(get_jwt_identity())
     if current_user_id == user_id:
         return jsonify({"message": "You cannot follow yourself"}), 400
-    if not db.session.get(User, user_id):
-        return jsonify({"message": "User not found"}), 404
-    if Follow.query.filter_by(follower_id=current_user_id, followed_id=user_id, followed_type="user").first():
+    if not insert_or_ignore(db.session, Follow, where=exists().where(User.id == user_id),
+                            follower_id=current_user_id, followed_id=user_id, followed_type="user"):
+        db.session.rollback()
+        if not db.session.get(User, user_id):
+            return jsonify({"message": "User not found"}), 404
         return jsonify({"message": "Already following this user"}), 409
-    new_follow = Follow(follower_id=current_user_id, followed_id=user_id, followed_type="user")
-    db.session.add(new_follow)
+    adjust_follow_counts(current_user_id, user_id, "user", 1)
+    add_to_timeline(current_user_id, author_id=user_id)
     db.session.commit()
     followed_user = db.session.get(User, user_id)
     return jsonify({"message": f"Successfully followed {followed_user.username}", "current_user_id": current_user_id}), 200
@@ -702,31 +1299,42 @@ def unfollow_user(user_id):
     current_user_id = int(get_jwt_identity())
     if current_user_id == user_id:
         return jsonify({"message": "You cannot unfollow yourself"}), 400
-    if not db.session.get(User, user_id):
-        return jsonify({"message": "User not found"}), 404
-    follow_record = Follow.query.filter_by(follower_id=current_user_id, followed_id=user_id, followed_type="user").first()
-    if not follow_record:
+    unfollowed = db.session.execute(delete(Follow).where(
+        Follow.follower_id == current_user_id, Follow.followed_id == user_id, Follow.followed_type == "user")).rowcount
+    if not unfollowed:
+        if not db.session.get(User, user_id):
+            return jsonify({"message": "User not found"}), 404
         return jsonify({"message": "Not currently following this user"}), 409
-    db.session.delete(follow_record)
+    adjust_follow_counts(current_user_id, user_id, "user", -1)
+    remove_from_timeline(current_user_id, author_id=user_id)
     db.session.commit()
     unfollowed_user = db.session.get(User, user_id)
     return jsonify({"message": f"Successfully unfollowed {unfollowed_user.username}", "current_user_id": current_user_id}), 200
 
+def stream_follow_list(listed_user_column, condition):
+    # Executed here, while the view's replica is bound; the rows are fetched as the body is sent.
+    rows = db.session.execute(
+        select(User.id, User.username).join(Follow, listed_user_column == User.id)
+        .where(condition, Follow.followed_type == "user")
+        .execution_options(yield_per=app.config["JSON_STREAM_BATCH_SIZE"])
+    )
+    return stream_json_array((row._asdict() for row in rows), app.config["JSON_STREAM_BATCH_SIZE"]), 200
+
 @app.route("/api/users/<int:user_id>/followers", methods=["GET"])
+@read_replica
 def get_user_followers(user_id):
     user = db.session.get(User, user_id)
     if not user:
         return jsonify({"message": "User not found"}), 404
-    followers = [{"id": f.follower_user.id, "username": f.follower_user.username} for f in user.followers.filter_by(followed_type="user")]
-    return jsonify(followers), 200
+    return stream_follow_list(Follow.follower_id, Follow.followed_id == user_id)
 
 @app.route("/api/users/<int:user_id>/following", methods=["GET"])
+@read_replica
 def get_user_following(user_id):
     user = db.session.get(User, user_id)
     if not user:
         return jsonify({"message": "User not found"}), 404
-    following = [{"id": f.followed_user.id, "username": f.followed_user.username} for f in user.following.filter_by(followed_type="user")]
-    return jsonify(following), 200
+    return stream_follow_list(Follow.followed_id, Follow.follower_id == user_id)
 
 @app.route("/api/users/<int:user_id>/is_following", methods=["GET"])
 @jwt_required(optional=True)
@@ -737,36 +1345,81 @@ def is_following(user_id):
     is_following_user = Follow.query.filter_by(follower_id=current_user_id, followed_id=user_id, followed_type="user").first() is not None
     return jsonify({"is_following": is_following_user}), 200
 
+@app.route("/api/relationships", methods=["POST"])
+@jwt_required()
+def get_relationships():
+    data = request.get_json(silent=True) or {}
+    user_ids, community_ids = data.get("user_ids", []), data.get("community_ids", [])
+    for ids in (user_ids, community_ids):
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return jsonify({"message": "user_ids and community_ids must be lists of integers"}), 400
+    max_ids = app.config["RELATIONSHIPS_MAX_IDS"]
+    if len(user_ids) + len(community_ids) > max_ids:
+        return jsonify({"message": f"At most {max_ids} ids can be checked per request"}), 400
+    relationships = relationship_map(int(get_jwt_identity()), user_ids, community_ids)
+    return jsonify(relationships), 200
+
 # --- Search Routes ---
 @app.route("/api/search/users", methods=["GET"])
+@read_replica
 def search_users():
     query = request.args.get("q", "").strip()
     if not query:
         return jsonify({"message": "Please provide a search query"}), 400
-    users = User.query.filter(User.username.ilike(f"%{query}%")).all()
-    return jsonify([user.to_dict() for user in users]), 200
+    limit, cursor = get_page_args()
+    users, next_cursor = paginate(User.query.filter(User.username.ilike(f"%{query}%")), [User.id], limit, cursor, descending=False)
+    return paginated_response([user.to_dict() for user in users], next_cursor), 200
 
 @app.route("/api/search/communities", methods=["GET"])
+@read_replica
 def search_communities():
     query = request.args.get("q", "").strip()
     if not query:
         return jsonify({"message": "Please provide a search query"}), 400
-    communities = Community.query.filter(
+    limit, cursor = get_page_args()
+    communities, next_cursor = paginate(Community.query.options(*community_load_options()).filter(
         (Community.name.ilike(f"%{query}%")) | (Community.description.ilike(f"%{query}%"))
-    ).all()
-    return jsonify([community.to_dict() for c in communities]), 200
+    ), [Community.id], limit, cursor, descending=False)
+    return paginated_response([c.to_dict() for c in communities], next_cursor), 200
 
-@app.route("/api/search/posts", methods=["GET"])
-def search_posts():
+@app.route("/api/search/suggest", methods=["GET"])
+def search_suggest():
     query = request.args.get("q", "").strip()
     if not query:
         return jsonify({"message": "Please provide a search query"}), 400
-    posts = Post.query.filter(
-        (Post.title.ilike(f"%{query}%")) | (Post.content.ilike(f"%{query}%"))
-    ).all()
-    posts_data = [post.to_dict() for post in posts]
-    posts_data.sort(key=lambda x: x["created_at"], reverse=True)
-    return jsonify(posts_data), 200
+    try:
+        limit = min(int(request.args.get("limit", 8)), app.config["SUGGEST_MAX_LIMIT"])
+    except ValueError:
+        return jsonify({"message": "limit must be a positive integer"}), 400
+    if limit < 1:
+        return jsonify({"message": "limit must be a positive integer"}), 400
+    suggestion_type = request.args.get("type", "all")
+    if suggestion_type not in ("all", "users", "communities"):
+        return jsonify({"message": "type must be one of: all, users, communities"}), 400
+
+    result = {}
+    if suggestion_type in ("all", "users"):
+        result["users"] = [
+            {"id": user_id, "username": username, "profile_picture_url": avatar}
+            for user_id, username, avatar in user_suggestions.lookup(query, limit)
+        ]
+    if suggestion_type in ("all", "communities"):
+        result["communities"] = [
+            {"id": community_id, "name": name}
+            for community_id, name, _ in community_suggestions.lookup(query, limit)
+        ]
+    return jsonify(result), 200
+
+@app.route("/api/search/posts", methods=["GET"])
+@read_replica
+def search_posts():
+    terms = parse_search_query(request.args.get("q", "").strip())
+    if not terms:
+        return jsonify({"message": "Please provide a search query"}), 400
+    limit, cursor = get_page_args()
+    query = apply_post_search(Post.query.options(joinedload(Post.author)), Post, terms, db.engine.dialect.name)
+    posts, next_cursor = paginate_ranked(query, limit, cursor)
+    return paginated_response(posts_to_dicts(posts), next_cursor), 200
 
 # --- Messaging Routes ---
 @app.route("/api/messages", methods=["POST"])
@@ -799,7 +1452,13 @@ def send_message():
 
     db.session.add(new_message)
     db.session.commit()
-    return jsonify(new_message.to_dict()), 201
+    message_data = new_message.to_dict()
+    try:
+        chat_broker.publish(chat_topic(new_message.receiver_id, new_message.community_id, current_user_id), message_data)
+    except Exception as e:
+        # The message is stored; clients that miss the push will see it on their next fetch.
+        app.logger.warning(f"Failed to publish chat message {new_message.id}: {e}")
+    return jsonify(message_data), 201
 
 @app.route("/api/messages/direct/<int:other_user_id>", methods=["GET"])
 @jwt_required()
@@ -809,20 +1468,26 @@ def get_direct_messages(other_user_id):
     if not other_user:
         return jsonify({"message": "User not found"}), 404
 
-    messages = Message.query.filter(
-        or_(
-            (Message.sender_id == current_user_id and Message.receiver_id == other_user_id),
-            (Message.sender_id == other_user_id and Message.receiver_id == current_user_id)
-        )
-    ).filter(Message.community_id == None).order_by(Message.timestamp.asc()).all()
-
-    for msg in messages:
-        if msg.receiver_id == current_user_id and not msg.is_read:
-            msg.is_read = True
-            db.session.add(msg)
-    db.session.commit()
+    limit, cursor = get_page_args()
 
-    return jsonify([msg.to_dict() for msg in messages]), 200
+    # Opening the conversation marks everything the other user sent as read, in one UPDATE.
+    if not cursor:
+        Message.query.filter(
+            Message.sender_id == other_user_id, Message.receiver_id == current_user_id,
+            Message.community_id.is_(None), Message.is_read.is_(False)
+        ).update({Message.is_read: True}, synchronize_session=False)
+        db.session.commit()
+
+    low_id, high_id = direct_pair(Message.sender_id, Message.receiver_id)
+    conversation = Message.query.options(*message_load_options()).filter(
+        low_id == min(current_user_id, other_user_id),
+        high_id == max(current_user_id, other_user_id),
+        Message.community_id.is_(None)
+    )
+    # Pages walk backwards from the newest message; X-Next-Cursor loads the next older page.
+    messages, next_cursor = paginate(conversation, [Message.timestamp, Message.id], limit, cursor)
+    messages.reverse()
+    return paginated_response([msg.to_dict() for msg in messages], next_cursor), 200
 
 @app.route("/api/messages/community/<int:community_id>", methods=["GET"])
 @jwt_required()
@@ -831,21 +1496,159 @@ def get_community_messages(community_id):
     if not community:
         return jsonify({"message": "Community not found"}), 404
 
-    messages = Message.query.filter_by(community_id=community_id).order_by(Message.timestamp.asc()).all()
-    return jsonify([msg.to_dict() for msg in messages]), 200
+    limit, cursor = get_page_args()
+    messages, next_cursor = paginate(
+        Message.query.options(*message_load_options()).filter_by(community_id=community_id),
+        [Message.timestamp, Message.id], limit, cursor
+    )
+    messages.reverse()
+    return paginated_response([msg.to_dict() for msg in messages], next_cursor), 200
+
+@app.route("/api/messages/stream", methods=["GET"])
+@jwt_required(locations=["headers", "query_string"])
+def stream_messages():
+    current_user_id = int(get_jwt_identity())
+    other_user_id = request.args.get("direct", type=int)
+    community_id = request.args.get("community", type=int)
+    if bool(other_user_id) == bool(community_id):
+        return jsonify({"message": "Provide exactly one of direct or community"}), 400
+    if other_user_id and not db.session.get(User, other_user_id):
+        return jsonify({"message": "User not found"}), 404
+    if community_id and not db.session.get(Community, community_id):
+        return jsonify({"message": "Community not found"}), 404
+    db.session.remove()  # Do not hold a pooled connection for the lifetime of the stream
+    if not chat_stream_slots.acquire(blocking=False):
+        return jsonify({"message": "Too many open chat streams, try again shortly"}), 503, {"Retry-After": "5"}
+
+    try:
+        subscription = chat_broker.subscribe(chat_topic(other_user_id, community_id, current_user_id))
+    except Exception:
+        chat_stream_slots.release()  # e.g. the broker is down; the slot would otherwise be lost for good
+        raise
+    heartbeat = app.config["CHAT_STREAM_HEARTBEAT"]
+
+    def event_stream():
+        try:
+            yield ": connected\n\n"
+            while True:
+                message = subscription.get(timeout=heartbeat)
+                if message is None:
+                    yield ": keep-alive\n\n"  # Lets proxies and the client notice dead connections
+                    continue
+                yield f"id: {message['id']}\ndata: {app.json.dumps(message)}\n\n"
+        finally:
+            subscription.close()
+
+    response = Response(event_stream(), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.call_on_close(chat_stream_slots.release)  # also runs if the client leaves before the first event
+    return response
+
+# --- Cache Stats ---
+@app.route("/api/cache/stats", methods=["GET"])
+@metrics.protected
+def cache_stats():
+    return jsonify(response_cache.stats()), 200
+
+@app.route("/api/db/pool/stats", methods=["GET"])
+@metrics.protected
+def db_pool_stats():
+    stats = pool_stats(db.engine)
+    if replica_set:
+        stats["replicas"] = [{**replica, **pool_stats(engine)} for replica, engine in zip(replica_set.stats(), replica_set.engines)]
+    return jsonify(stats), 200
+
+@metrics.resources
+def metrics_resources():
+    pools = {"primary": pool_stats(db.engine)}
+    for index, engine in enumerate(replica_set.engines):
+        pools[f"replica{index}"] = pool_stats(engine)
+    return {"db_pools": pools, "password_hasher": password_hasher.stats()}
+
+@app.route("/api/auth/hasher/stats", methods=["GET"])
+@metrics.protected
+def password_hasher_stats():
+    return jsonify(password_hasher.stats()), 200
 
 # --- File Serving Routes ---
 @app.route("/uploads/<filename>")
 def uploaded_file(filename):
-    return send_from_directory(app.config["UPLOAD_FOLDER"], filename)
+    folder = app.config["UPLOAD_FOLDER"]
+    if not os.path.exists(os.path.join(folder, filename)):
+        # Variants are generated in the background; until one exists, serve its original.
+        filename = variant_source(folder, filename) or filename
+    if "w" not in request.args and "fmt" not in request.args:
+        path = safe_join(folder, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        return send_media(path, "uploads")
+    return resized_upload(folder, filename)
+
+def send_media(path, location, mimetype=None):
+    """Send an upload or resized image, or hand the transfer to the front proxy (see MEDIA_SENDFILE).
+
+    When Python sends the file it answers If-None-Match / If-Modified-Since with 304 and
+    honours Range requests; with x-accel-redirect nginx does both itself.
+    """
+    mode = app.config["MEDIA_SENDFILE"]
+    if mode == "x-accel-redirect":
+        response = app.response_class(mimetype=mimetype or mimetypes.guess_type(path)[0] or "application/octet-stream")
+        response.headers["X-Accel-Redirect"] = f"{app.config['MEDIA_ACCEL_PREFIX']}{location}/{quote(os.path.basename(path))}"
+        return response
+    return send_file(path, request.environ, mimetype=mimetype, conditional=True, etag=True,
+                     use_x_sendfile=mode == "x-sendfile", response_class=app.response_class)
+
+RESIZE_FORMATS = {"jpeg": ("JPEG", "image/jpeg"), "png": ("PNG", "image/png"), "webp": ("WEBP", "image/webp")}
+
+def resized_upload(folder, filename):
+    extension = filename.rsplit(".", 1)[-1].lower()
+    if extension not in ALLOWED_EXTENSIONS:
+        abort(404)
+    source = os.path.join(folder, filename)
+    if "/" in filename or "\\" in filename or not os.path.isfile(source):
+        abort(404)
+
+    widths = app.config["IMAGE_RESIZE_WIDTHS"]
+    try:
+        width = int(request.args.get("w", widths[-1]))
+    except ValueError:
+        width = 0
+    if width < 1:
+        return jsonify({"message": "w must be a positive integer"}), 400
+    width = next((w for w in widths if w >= width), widths[-1])
+
+    fmt = request.args.get("fmt", "auto")
+    if fmt == "auto":
+        # Only browsers that list image/webp explicitly get it; */* alone does not count.
+        accepts_webp = any(value == "image/webp" and quality > 0 for value, quality in request.accept_mimetypes)
+        fmt = "webp" if accepts_webp else ("jpeg" if extension in ("jpg", "jpeg") else "png")
+    if fmt not in RESIZE_FORMATS:
+        return jsonify({"message": "fmt must be one of auto, jpeg, png, webp"}), 400
+    image_format, mimetype = RESIZE_FORMATS[fmt]
+
+    try:
+        path = resize_cache.get(source, width, image_format)
+    except InvalidImageError:
+        abort(404)
+    response = send_media(path, "image_cache", mimetype)
+    if variant_urls(f"/uploads/{filename}"):
+        # Content-addressed uploads never change, so their resized copies can be cached for good.
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    if request.args.get("fmt", "auto") == "auto":
+        response.vary.add("Accept")
+    return response
 
 # --- Frontend Serving Routes ---
 @app.route("/", defaults={"path": ""})
 @app.route("/<path:path>")
 def serve(path):
-    if path != "" and os.path.exists(os.path.join(app.static_folder, path)):
-        return send_from_directory(app.static_folder, path)
-    return send_from_directory(app.static_folder, "index.html")
+    # Files are looked up in the manifest built from FRONTEND_BUILD_DIR at worker start, not on disk.
+    response = (path and frontend_assets.response(path)) or frontend_assets.response("index.html")
+    if response is None:
+        abort(404)
+    return response
 
 # --- Generic 500 Error Handler (Added) ---
 @app.errorhandler(500)
@@ -1,6 +1,6 @@
 from flask import request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from extensions import db, bcrypt
+from extensions import db, password_hasher
 from models import User
 from schemas import user_schema
 
@@ -20,7 +20,7 @@ def register_auth_routes(app):
         if User.query.filter_by(email=email).first():
             return jsonify({"message": "Email already registered"}), 409
 
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+        hashed_password = password_hasher.hash(password)
         new_user = User(username=username, email=email, password_hash=hashed_password)
         
         try:
@@ -39,7 +39,10 @@ def register_auth_routes(app):
 
         user = User.query.filter_by(username=username).first()
 
-        if user and bcrypt.check_password_hash(user.password_hash, password):
+        if user and password_hasher.verify(password, user.password_hash):
+            if password_hasher.needs_rehash(user.password_hash):
+                user.password_hash = password_hasher.hash(password)
+                db.session.commit()
             access_token = create_access_token(identity=user.id)
             return jsonify(access_token=access_token, user=user_schema.dump(user)), 200
         else:
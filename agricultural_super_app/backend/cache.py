@@ -0,0 +1,254 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, g, request
+
+
+class MemoryBackend:
+    """Per-process LRU cache with a TTL per entry.
+
+    A tag's version is forgotten once it has not been bumped for longer than any entry may live:
+    every entry made under an older version has expired by then, so counting from 0 again is safe.
+    """
+
+    def __init__(self, max_entries=1024):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = OrderedDict()  # tag -> (version, last bumped), least recently bumped first
+        self._longest_ttl = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._longest_ttl = max(self._longest_ttl, ttl)
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def get_versions(self, tags):
+        with self._lock:
+            return [self._versions[tag][0] if tag in self._versions else 0 for tag in tags]
+
+    def bump_versions(self, tags):
+        with self._lock:
+            now = time.monotonic()
+            while self._versions:
+                tag, (_, bumped_at) = next(iter(self._versions.items()))
+                if bumped_at + self._longest_ttl > now:
+                    break
+                del self._versions[tag]
+            for tag in tags:
+                version = self._versions.pop(tag, (0, now))[0]
+                self._versions[tag] = (version + 1, now)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """Cache shared by every worker process on one host, stored in a local SQLite file."""
+
+    PURGE_EVERY = 100
+
+    def __init__(self, path, max_entries=10000):
+        self._path = path
+        self._max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_expires_at ON cache_entries (expires_at)")
+            connection.execute("CREATE TABLE IF NOT EXISTS cache_versions (tag TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl):
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl)
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            connection.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+            # Past the size limit, drop the entries closest to expiry.
+            connection.execute(
+                "DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_entries ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self._max_entries,)
+            )
+
+    def get_versions(self, tags):
+        if not tags:
+            return []
+        placeholders = ",".join("?" * len(tags))
+        rows = self._connection().execute(
+            f"SELECT tag, version FROM cache_versions WHERE tag IN ({placeholders})", list(tags)
+        ).fetchall()
+        versions = dict(rows)
+        return [versions.get(tag, 0) for tag in tags]
+
+    def bump_versions(self, tags):
+        connection = self._connection()
+        for tag in tags:
+            connection.execute(
+                "INSERT INTO cache_versions (tag, version) VALUES (?, 1) "
+                "ON CONFLICT(tag) DO UPDATE SET version = version + 1",
+                (tag,)
+            )
+
+    def clear(self):
+        connection = self._connection()
+        connection.execute("DELETE FROM cache_entries")
+        connection.execute("DELETE FROM cache_versions")
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+
+def create_backend(url, max_entries):
+    """memory:// (default) or sqlite:///absolute/path/to/cache.db"""
+    if not url or url == "memory://":
+        return MemoryBackend(max_entries=max_entries)
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):], max_entries=max_entries)
+    raise ValueError(f"Unsupported RESPONSE_CACHE_URL: {url}")
+
+
+class ResponseCache:
+    """Caches whole JSON responses of public read routes.
+
+    Every cached entry depends on a set of tags (e.g. "posts", "community:3"). The tags' current
+    version numbers are part of the cache key, so `invalidate(tag)` makes every dependent entry
+    unreachable at once, in every process sharing the backend, without scanning keys.
+
+    With `write_hold_seconds` (set when reads go to replicas), an invalidated tag is also held for
+    that long: a response read from a replica (g.read_from_replica) that depends on a held tag is
+    served but not stored, because the replica may not have the write yet.
+    """
+
+    def __init__(self, backend, default_ttl=60, write_hold_seconds=0):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.write_hold_seconds = write_hold_seconds
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+
+    def _count(self, endpoint, outcome):
+        with self._stats_lock:
+            counters = self._stats.setdefault(endpoint, {"hits": 0, "misses": 0})
+            counters[outcome] += 1
+
+    def stats(self):
+        with self._stats_lock:
+            per_endpoint = {endpoint: dict(counters) for endpoint, counters in self._stats.items()}
+        hits = sum(c["hits"] for c in per_endpoint.values())
+        misses = sum(c["misses"] for c in per_endpoint.values())
+        return {
+            "hits": hits, "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": len(self.backend),
+            "endpoints": per_endpoint,
+        }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats.clear()
+
+    def invalidate(self, *tags):
+        if tags:
+            self.backend.bump_versions(tags)
+            if self.write_hold_seconds:
+                for tag in tags:
+                    self.backend.set(f"hold:{tag}", "1", self.write_hold_seconds)
+
+    def _held(self, tags):
+        return any(self.backend.get(f"hold:{tag}") is not None for tag in tags)
+
+    def clear(self):
+        self.backend.clear()
+
+    def _key(self, tags):
+        versions = self.backend.get_versions(tags)
+        args = sorted(request.args.items(multi=True))
+        view_args = sorted((request.view_args or {}).items())
+        return json.dumps([request.endpoint, view_args, args, list(zip(tags, versions))], separators=(",", ":"))
+
+    def cached(self, tags, ttl=None):
+        """Cache a GET view's 200 responses for anonymous callers.
+
+        `tags` is a function receiving the view's keyword arguments and returning the tags the
+        response depends on. Requests carrying credentials bypass the cache because their
+        responses may be personalized (e.g. liked_by_me).
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if (not current_app.config.get("RESPONSE_CACHE_ENABLED", True)
+                        or "Authorization" in request.headers or "jwt" in request.args):
+                    return view(*args, **kwargs)
+
+                response_tags = list(tags(**kwargs))
+                key = self._key(response_tags)
+                cached_value = self.backend.get(key)
+                if cached_value is not None:
+                    self._count(request.endpoint, "hits")
+                    entry = json.loads(cached_value)
+                    response = current_app.response_class(
+                        entry["body"], status=entry["status"], headers=entry["headers"],
+                        mimetype="application/json"
+                    )
+                    response.headers["X-Cache"] = "HIT"
+                    return response
+
+                self._count(request.endpoint, "misses")
+                response = current_app.make_response(view(*args, **kwargs))
+                fresh = not (self.write_hold_seconds and g.get("read_from_replica") and self._held(response_tags))
+                if response.status_code == 200 and not response.is_streamed and fresh:
+                    headers = {name: value for name, value in response.headers.items() if name.startswith("X-")}
+                    entry = {"body": response.get_data(as_text=True), "status": 200, "headers": headers}
+                    self.backend.set(key, json.dumps(entry), ttl or self.default_ttl)
+                response.headers["X-Cache"] = "MISS"
+                return response
+            return wrapper
+        return decorator
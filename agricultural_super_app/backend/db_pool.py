@@ -0,0 +1,73 @@
+import threading
+import time
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import NullPool, QueuePool
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that also records how long checkouts wait for a free connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            with self._metrics_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._metrics_lock:
+                self.checkouts += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+
+def engine_options(url, pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=300, pool_pre_ping=True,
+                   query_cache_size=500, pgbouncer=False):
+    """SQLALCHEMY_ENGINE_OPTIONS for `url`.
+
+    In-memory SQLite keeps Flask-SQLAlchemy's single shared connection. With `pgbouncer`
+    (PgBouncer in transaction-pooling mode) connections are not pooled in the app: a server
+    connection only belongs to us for one transaction, so PgBouncer does the pooling and
+    session state (prepared statements, SET, LISTEN) must not be relied on between transactions.
+    """
+    parsed = make_url(url)
+    options = {"query_cache_size": query_cache_size}
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return options
+    if pgbouncer:
+        options["poolclass"] = NullPool
+        if parsed.get_driver_name() == "psycopg":
+            options["connect_args"] = {"prepare_threshold": None}  # psycopg 3 prepares repeated statements
+        return options
+    options.update(poolclass=InstrumentedQueuePool, pool_size=pool_size, max_overflow=max_overflow,
+                   pool_timeout=pool_timeout, pool_recycle=pool_recycle, pool_pre_ping=pool_pre_ping)
+    return options
+
+
+def pool_stats(engine):
+    """Current pool occupancy and, for InstrumentedQueuePool, checkout wait times."""
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), checked_in=pool.checkedin(), checked_out=pool.checkedout(),
+                     overflow=max(pool.overflow(), 0), max_overflow=pool._max_overflow, timeout=pool.timeout())
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._metrics_lock:
+            stats.update(
+                checkouts=pool.checkouts, timeouts=pool.timeouts,
+                average_wait_ms=round(pool.wait_seconds * 1000 / pool.checkouts, 3) if pool.checkouts else 0.0,
+                max_wait_ms=round(pool.max_wait_seconds * 1000, 3),
+            )
+    return stats
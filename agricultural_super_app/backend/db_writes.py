@@ -0,0 +1,65 @@
+from sqlalchemy import insert, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def _insert_ignoring_conflicts(session, model, values, where):
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(model)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(model)
+    else:
+        stmt = insert(model).prefix_with("IGNORE")
+    if where is None:
+        stmt = stmt.values(**values)
+    else:
+        # INSERT ... SELECT <values> WHERE <where>; SQLite needs the WHERE to parse ON CONFLICT after a SELECT.
+        columns = model.__table__.c
+        stmt = stmt.from_select(list(values), select(*[literal(value, columns[name].type) for name, value in values.items()]).where(where))
+    if dialect in ("postgresql", "sqlite"):
+        stmt = stmt.on_conflict_do_nothing()
+    return stmt, dialect
+
+
+def insert_or_ignore(session, model, where=None, **values):
+    """INSERT a row, silently skipping it if it would violate a unique constraint.
+
+    Returns True when a row was written and False when it already existed. Uses
+    INSERT ... ON CONFLICT DO NOTHING on PostgreSQL and SQLite so the check and the
+    write happen in one statement. With `where` (e.g. an EXISTS on a referenced row)
+    the row is also skipped when that condition is false, still in the same statement.
+    """
+    stmt, _ = _insert_ignoring_conflicts(session, model, values, where)
+    return session.execute(stmt).rowcount == 1
+
+
+def insert_unique(session, model, execution_options=None, **values):
+    """Like insert_or_ignore, but returns the new row's primary key, or None if it already existed.
+
+    The key comes back through INSERT ... RETURNING, so creating a row with unique
+    columns (a username, a community name) takes one statement instead of a SELECT
+    for duplicates followed by the INSERT. `execution_options` are passed to session.execute().
+    """
+    stmt, dialect = _insert_ignoring_conflicts(session, model, values, None)
+    execution_options = execution_options or {}
+    if dialect in ("postgresql", "sqlite"):
+        return session.execute(stmt.returning(*model.__table__.primary_key.columns),
+                               execution_options=execution_options).scalar()
+    result = session.execute(stmt, execution_options=execution_options)
+    return result.lastrowid if result.rowcount == 1 else None
+
+
+def insert_select_or_ignore(session, model, names, select_stmt):
+    """INSERT ... SELECT into `model`'s columns `names`, skipping rows that already exist.
+
+    Returns the number of rows written. Like insert_or_ignore, duplicates are left to the
+    primary key / unique constraints (ON CONFLICT DO NOTHING) instead of a prior SELECT.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(model).from_select(names, select_stmt).on_conflict_do_nothing()
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(model).from_select(names, select_stmt).on_conflict_do_nothing()
+    else:
+        stmt = insert(model).from_select(names, select_stmt).prefix_with("IGNORE")
+    return session.execute(stmt).rowcount
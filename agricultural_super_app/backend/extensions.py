@@ -3,9 +3,13 @@ from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_marshmallow import Marshmallow
 from flask_bcrypt import Bcrypt
+from passwords import PasswordHasher
 
 db = SQLAlchemy()
 migrate = Migrate() 
 jwt = JWTManager() 
 ma = Marshmallow()
 bcrypt = Bcrypt() 
+# Nothing configures these from config.Config (there is no app factory), so the hasher keeps its
+# defaults: cost 12, and the cores shared out between WEB_CONCURRENCY workers.
+password_hasher = PasswordHasher()
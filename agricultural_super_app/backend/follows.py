@@ -0,0 +1,55 @@
+from sqlalchemy import literal, select, union_all, update
+
+
+def adjust_follow_counts(session, user_model, follower_id, followed_id, followed_type, delta):
+    """Move the denormalized follow counters on `user_model` by `delta` for one follow or unfollow.
+
+    Call in the same transaction as adding/deleting the follow row. The UPDATEs are relative, so
+    concurrent follows of the same user cannot lose increments.
+    """
+    if followed_type == "user":
+        following_column = user_model.following_users_count
+    else:
+        following_column = user_model.following_communities_count
+    session.execute(update(user_model).where(user_model.id == follower_id)
+                    .values({following_column: following_column + delta}))
+    if followed_type == "user":
+        session.execute(update(user_model).where(user_model.id == followed_id)
+                        .values(followers_count=user_model.followers_count + delta))
+
+
+def relationship_map(session, follow_model, viewer_id, user_ids=(), community_ids=(), membership_model=None):
+    """Follow status of `viewer_id` towards many users and communities, fetched in one query.
+
+    Returns {"users": {id: {"following", "followed_by"}}, "communities": {id: {"following"}}}.
+    With `membership_model`, each community also gets "member", read from that table.
+    """
+    user_ids, community_ids = set(user_ids), set(community_ids)
+    users = {user_id: {"following": False, "followed_by": False} for user_id in user_ids}
+    communities = {community_id: {"following": False} for community_id in community_ids}
+    parts = []
+    if user_ids:
+        parts.append(select(literal("following").label("kind"), follow_model.followed_id.label("target_id")).where(
+            follow_model.follower_id == viewer_id, follow_model.followed_type == "user",
+            follow_model.followed_id.in_(user_ids)))
+        parts.append(select(literal("followed_by"), follow_model.follower_id).where(
+            follow_model.followed_id == viewer_id, follow_model.followed_type == "user",
+            follow_model.follower_id.in_(user_ids)))
+    if community_ids:
+        if membership_model is not None:
+            for status in communities.values():
+                status["member"] = False
+            parts.append(select(literal("member"), membership_model.community_id).where(
+                membership_model.user_id == viewer_id, membership_model.community_id.in_(community_ids)))
+        parts.append(select(literal("following_community"), follow_model.followed_id).where(
+            follow_model.follower_id == viewer_id, follow_model.followed_type == "community",
+            follow_model.followed_id.in_(community_ids)))
+    if parts:
+        for kind, target_id in session.execute(union_all(*parts) if len(parts) > 1 else parts[0]):
+            if kind == "member":
+                communities[target_id]["member"] = True
+            elif kind == "following_community":
+                communities[target_id]["following"] = True
+            else:
+                users[target_id][kind] = True
+    return {"users": users, "communities": communities}
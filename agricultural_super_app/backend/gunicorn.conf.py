@@ -0,0 +1,38 @@
+import os
+import shutil
+import tempfile
+
+# Loaded by gunicorn from the working directory. Workers write their Prometheus samples under
+# PROMETHEUS_MULTIPROC_DIR so /metrics on any worker reports all of them; it has to be set here,
+# before the workers import the app.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "agri-super-app-metrics"))
+
+
+def on_starting(server):
+    # Samples left by a previous master would otherwise be added to this one's.
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def post_fork(server, worker):
+    # Under gevent (the `stream` process) psycopg2 would block the whole worker while it waits on
+    # Postgres; psycogreen makes those waits yield to other greenlets.
+    if server.cfg.worker_class_str == "gevent":
+        from psycogreen.gevent import patch_psycopg
+
+        patch_psycopg()
+
+
+def post_worker_init(worker):
+    # Read and compress the frontend build before the worker accepts requests rather than on the
+    # first one, which would otherwise wait for it.
+    from app import frontend_assets
+
+    frontend_assets.load()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
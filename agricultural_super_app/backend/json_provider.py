@@ -0,0 +1,64 @@
+from datetime import date
+from itertools import islice
+
+from flask import current_app, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional; the stdlib encoder is used without it
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask's JSON provider, encoding with orjson when it is installed.
+
+    orjson encodes dicts, lists, datetimes and dataclasses natively in C. Dates and datetimes
+    come out in ISO 8601 either way (Flask's default would be an HTTP date), so responses are the
+    same whichever encoder runs. Values orjson refuses, such as integers wider than 64 bits, fall
+    back to the stdlib encoder. Reading JSON is unchanged.
+    """
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, date):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or set(kwargs) - {"indent", "separators", "sort_keys"}:
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_NON_STR_KEYS  # e.g. {user_id: ...} maps; the stdlib turns the keys into strings too
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option).decode("utf-8")
+        except orjson.JSONEncodeError:
+            return super().dumps(obj, **kwargs)
+
+
+def stream_json_array(items, batch_size=500):
+    """A response whose body is the JSON array of `items`, encoded `batch_size` items at a time.
+
+    `items` may be a generator over a query executed with yield_per, so neither the rows nor the
+    encoded body are ever held in memory whole. Execute that query inside the view: it must be
+    bound (e.g. to a read replica) before the view returns, while the rows are fetched as the
+    response is sent.
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        iterator = iter(items)
+        separator = ""
+        yield "["
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                break
+            yield separator + dumps(batch).strip()[1:-1]
+            separator = ","
+        yield "]\n"
+
+    return current_app.response_class(stream_with_context(generate()), mimetype=current_app.json.mimetype)
@@ -0,0 +1,304 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image, ImageOps
+
+try:
+    import fcntl
+except ImportError:  # Windows: resizes are only de-duplicated within one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Longest side, in pixels, of each pre-generated variant.
+VARIANT_SIZES = {"small": 160, "medium": 640, "large": 1280}
+
+_FORMAT_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif"}
+# Variants drop animation, so GIFs become PNGs.
+_VARIANT_EXTENSIONS = {"jpg": "jpg", "png": "png", "gif": "png"}
+_SAVE_FORMATS = {"jpg": "JPEG", "png": "PNG"}
+_ORIGINAL_NAME = re.compile(r"^([0-9a-f]{64})\.(jpg|png|gif)$")
+_VARIANT_NAME = re.compile(r"^([0-9a-f]{64})-(small|medium|large)\.(jpg|png)$")
+
+
+class InvalidImageError(ValueError):
+    """Raised when an upload is not a JPEG, PNG or GIF image."""
+
+
+def store_image(stream, folder):
+    """Save an uploaded image in `folder` as <sha256 of its bytes>.<ext> and return that filename.
+
+    Identical uploads map to the same file, which is written only once; uploads never
+    overwrite a different image that happened to share a client-side filename.
+    """
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=folder, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            for chunk in iter(lambda: stream.read(64 * 1024), b""):
+                digest.update(chunk)
+                temp_file.write(chunk)
+        try:
+            with Image.open(temp_path) as image:
+                image_format = image.format
+                image.verify()
+        except Exception:
+            raise InvalidImageError("Upload is not a valid image")
+        extension = _FORMAT_EXTENSIONS.get(image_format)
+        if extension is None:
+            raise InvalidImageError("Only JPEG, PNG and GIF images are supported")
+
+        filename = f"{digest.hexdigest()}.{extension}"
+        final_path = os.path.join(folder, filename)
+        if os.path.exists(final_path):
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, final_path)
+        return filename
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def variant_filename(filename, size):
+    match = _ORIGINAL_NAME.match(filename)
+    if not match:
+        return None
+    return f"{match.group(1)}-{size}.{_VARIANT_EXTENSIONS[match.group(2)]}"
+
+
+def variant_urls(url, prefix="/uploads/"):
+    """{"small": url, "medium": url, "large": url} for a content-addressed upload URL, else None.
+
+    Uploads saved before content addressing have no variants.
+    """
+    if not url or not url.startswith(prefix):
+        return None
+    filename = url[len(prefix):]
+    if not _ORIGINAL_NAME.match(filename):
+        return None
+    return {size: prefix + variant_filename(filename, size) for size in VARIANT_SIZES}
+
+
+def variant_source(folder, filename):
+    """The original a variant filename was generated from, if it exists in `folder`."""
+    match = _VARIANT_NAME.match(filename)
+    if not match:
+        return None
+    for extension, variant_extension in _VARIANT_EXTENSIONS.items():
+        candidate = f"{match.group(1)}.{extension}"
+        if variant_extension == match.group(3) and os.path.exists(os.path.join(folder, candidate)):
+            return candidate
+    return None
+
+
+def _save_atomically(image, path, image_format):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".variant-")
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            # No exif/pnginfo is passed, so camera and GPS metadata is not carried over.
+            if image_format == "JPEG":
+                image.save(temp_file, "JPEG", quality=82, optimize=True, progressive=True)
+            elif image_format == "WEBP":
+                image.save(temp_file, "WEBP", quality=80, method=4)
+            else:
+                image.save(temp_file, "PNG", optimize=True)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _prepare(image, image_format):
+    # Apply the EXIF orientation before the metadata is dropped.
+    image = ImageOps.exif_transpose(image)
+    if image_format == "JPEG":
+        return image.convert("RGB")
+    if image.mode not in ("RGB", "RGBA", "L", "LA"):
+        return image.convert("RGBA")
+    return image
+
+
+def generate_variants(folder, filename):
+    """Write the small/medium/large variants of an original that are still missing. Returns their filenames."""
+    targets = {size: variant_filename(filename, size) for size in VARIANT_SIZES}
+    missing = {size: name for size, name in targets.items() if not os.path.exists(os.path.join(folder, name))}
+    if not missing:
+        return []
+    image_format = _SAVE_FORMATS[_VARIANT_EXTENSIONS[_ORIGINAL_NAME.match(filename).group(2)]]
+    with Image.open(os.path.join(folder, filename)) as original:
+        image = _prepare(original, image_format)
+        for size, name in missing.items():
+            variant = image.copy()
+            variant.thumbnail((VARIANT_SIZES[size], VARIANT_SIZES[size]), Image.LANCZOS)
+            _save_atomically(variant, os.path.join(folder, name), image_format)
+    return list(missing.values())
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the web process has threads (gthread workers, broker listeners).
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _log_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Generating image variants failed: %s", future.exception())
+
+
+def schedule_variants(folder, filename, workers=2):
+    """Generate an upload's variants in a worker process. Returns the Future, or None when run inline (workers=0)."""
+    if workers <= 0:
+        generate_variants(folder, filename)
+        return None
+    global _pool
+    try:
+        future = _executor(workers).submit(generate_variants, folder, filename)
+    except BrokenProcessPool:
+        with _pool_lock:
+            _pool = None
+        future = _executor(workers).submit(generate_variants, folder, filename)
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def resize_image(source_path, target_path, width, image_format):
+    """Write `source_path` scaled down to `width` pixels wide (never up) as `image_format`. Returns the size in bytes."""
+    try:
+        with Image.open(source_path) as original:
+            image = _prepare(original, image_format)
+            if width < image.width:
+                image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            _save_atomically(image, target_path, image_format)
+    except (OSError, SyntaxError, ValueError) as e:
+        raise InvalidImageError(f"Cannot resize {os.path.basename(source_path)}: {e}")
+    return os.path.getsize(target_path)
+
+
+class ResizeCache:
+    """On-disk cache of resized images, bounded by total bytes and evicted least-recently-used first.
+
+    A hit refreshes the file's mtime, which is the recency used for eviction. Concurrent requests
+    for the same missing entry wait for a single resize: threads of one process share a lock, and
+    processes on one host share a lock file (one of a fixed set, so none need cleaning up).
+    """
+
+    STRIPES = 64
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.resizes = 0
+        self._thread_locks = [threading.Lock() for _ in range(self.STRIPES)]
+        self._size_lock = threading.Lock()
+        self._total_bytes = None
+
+    def _entry_name(self, source_path, width, image_format):
+        # Keyed on the source's mtime and size too, so replacing a file at the same name is picked up.
+        stat = os.stat(source_path)
+        key = f"{os.path.abspath(source_path)}:{stat.st_mtime_ns}:{stat.st_size}:{width}:{image_format}"
+        return f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:40]}.{image_format.lower()}"
+
+    @staticmethod
+    def _touch(path):
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _file_lock(self, stripe):
+        if fcntl is None:
+            return _NullLock()
+        lock_dir = os.path.join(self.directory, ".locks")
+        os.makedirs(lock_dir, exist_ok=True)
+        return _FileLock(os.path.join(lock_dir, f"{stripe}.lock"))
+
+    def get(self, source_path, width, image_format):
+        """Path of `source_path` resized to `width` in `image_format` ("JPEG", "PNG" or "WEBP"), resizing if needed."""
+        os.makedirs(self.directory, exist_ok=True)
+        name = self._entry_name(source_path, width, image_format)
+        path = os.path.join(self.directory, name)
+        if self._touch(path):
+            return path
+        stripe = zlib.crc32(name.encode("ascii")) % self.STRIPES
+        with self._thread_locks[stripe], self._file_lock(stripe):
+            if self._touch(path):
+                return path
+            size = resize_image(source_path, path, width, image_format)
+            self.resizes += 1
+        self._account(size, keep=path)
+        return path
+
+    def _entries(self):
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.is_file() and not entry.name.startswith("."):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _account(self, size, keep):
+        with self._size_lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(entry[1] for entry in self._entries())
+            else:
+                self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._total_bytes = self._evict(keep)
+
+    def _evict(self, keep=None):
+        # Other processes write to the same directory, so re-measure instead of trusting the running total.
+        entries = sorted(self._entries())
+        total = sum(entry[1] for entry in entries)
+        target = self.max_bytes * 0.9  # leave headroom so every new entry does not trigger a scan
+        for _, size, path in entries:
+            if total <= target:
+                break
+            if path == keep:  # the entry about to be served
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        return total
+
+
+class _FileLock:
+    def __init__(self, path):
+        self._path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self._path, "a")
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+class _NullLock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
@@ -0,0 +1,171 @@
+import hmac
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import Response, abort, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+logger = logging.getLogger(__name__)
+
+# 256B .. 16MiB in powers of four: JSON pages sit in the low buckets, images and bundles in the high ones.
+RESPONSE_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def multiprocess_dir():
+    """The directory shared by gunicorn workers for metric files, or None in a single process."""
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.environ.get("prometheus_multiproc_dir")
+
+
+class PrometheusMetrics:
+    """Request, response-size, cache, DB pool and password-hasher metrics served at /metrics.
+
+    Request metrics are labelled with the Flask endpoint name rather than the path, so
+    /api/posts/1 and /api/posts/2 share a series. Resource gauges (pool occupancy, hasher queue)
+    are read from the functions registered with `resources` every METRICS_REFRESH_SECONDS by a
+    background thread and again on each scrape; cumulative figures those functions report
+    (checkouts, hashes) are turned into counter increments.
+
+    Under gunicorn, PROMETHEUS_MULTIPROC_DIR must be set before this module is imported (see
+    gunicorn.conf.py): every worker then writes its samples to files there and /metrics sums them,
+    so a scrape answered by any worker covers them all. Gauges use "livesum", which drops workers
+    that have exited.
+    """
+
+    def __init__(self, app=None, registry=REGISTRY):
+        self.registry = registry
+        self._resources = []
+        self._last_totals = {}
+        self._refresh_lock = threading.Lock()
+        self._refresher_pid = None
+        self.requests = Counter("http_requests_total", "HTTP requests by Flask endpoint, method and status.",
+                                ["endpoint", "method", "status"], registry=registry)
+        self.latency = Histogram("http_request_duration_seconds", "Time from routing to the response being built.",
+                                 ["endpoint", "method"], registry=registry)
+        self.response_size = Histogram("http_response_size_bytes", "Response body sizes, where known up front.",
+                                       ["endpoint"], buckets=RESPONSE_SIZE_BUCKETS, registry=registry)
+        self.cache_lookups = Counter("response_cache_lookups_total", "Response cache lookups by endpoint and result.",
+                                     ["endpoint", "result"], registry=registry)
+        self.pool_connections = Gauge("db_pool_connections", "Database pool connections by state.",
+                                      ["database", "state"], multiprocess_mode="livesum", registry=registry)
+        self.pool_checkouts = Counter("db_pool_checkouts_total", "Connections checked out of the pool.",
+                                      ["database"], registry=registry)
+        self.pool_timeouts = Counter("db_pool_timeouts_total", "Checkouts that gave up waiting for a connection.",
+                                     ["database"], registry=registry)
+        self.password_hashes = Gauge("password_hasher_tasks", "bcrypt calls running on, or waiting for, a worker.",
+                                     ["state"], multiprocess_mode="livesum", registry=registry)
+        self.password_hashes_completed = Counter("password_hasher_completed_total", "bcrypt calls finished.",
+                                                 registry=registry)
+        self.password_hashes_rejected = Counter("password_hasher_rejected_total",
+                                                "bcrypt calls refused because the queue was full.", registry=registry)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("METRICS_REFRESH_SECONDS", 5)
+        app.config.setdefault("METRICS_TOKEN", "")
+        self.app = app
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.add_url_rule("/metrics", "metrics", self.view)
+
+    def resources(self, function):
+        """Register a function returning {"db_pools": {name: pool_stats(...)}, "password_hasher": stats()}."""
+        self._resources.append(function)
+        return function
+
+    def _start(self):
+        g.metrics_started = time.perf_counter()
+        if self._refresher_pid != os.getpid():  # a forked worker does not inherit the parent's thread
+            self._start_refresher()
+
+    def _finish(self, response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+        endpoint = request.endpoint or "unmatched"
+        self.requests.labels(endpoint, request.method, str(response.status_code)).inc()
+        self.latency.labels(endpoint, request.method).observe(time.perf_counter() - started)
+        if response.content_length is not None:
+            self.response_size.labels(endpoint).observe(response.content_length)
+        cache_result = response.headers.get("X-Cache")
+        if cache_result in ("HIT", "MISS"):
+            self.cache_lookups.labels(endpoint, cache_result.lower()).inc()
+        return response
+
+    def _start_refresher(self):
+        with self._refresh_lock:
+            if self._refresher_pid == os.getpid():
+                return
+            self._refresher_pid = os.getpid()
+        interval = self.app.config["METRICS_REFRESH_SECONDS"]
+        if interval <= 0:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    with self.app.app_context():
+                        self.refresh()
+                except Exception:
+                    logger.exception("Refreshing resource metrics failed")
+
+        threading.Thread(target=run, name="metrics-refresh", daemon=True).start()
+
+    def _increment_by_total(self, counter, key, total):
+        # Counters only go up; a total lower than last time means its source was recreated.
+        previous = self._last_totals.get(key, 0)
+        delta = total - previous if total >= previous else total
+        self._last_totals[key] = total
+        if delta > 0:
+            counter.inc(delta)
+
+    def refresh(self):
+        """Read the registered resource functions into the gauges and counters."""
+        with self._refresh_lock:
+            for function in self._resources:
+                snapshot = function()
+                for name, stats in snapshot.get("db_pools", {}).items():
+                    if "checked_out" in stats:
+                        self.pool_connections.labels(name, "checked_out").set(stats["checked_out"])
+                        self.pool_connections.labels(name, "checked_in").set(stats["checked_in"])
+                        self.pool_connections.labels(name, "overflow").set(stats["overflow"])
+                    if "checkouts" in stats:
+                        self._increment_by_total(self.pool_checkouts.labels(name), ("checkouts", name), stats["checkouts"])
+                        self._increment_by_total(self.pool_timeouts.labels(name), ("timeouts", name), stats["timeouts"])
+                hasher = snapshot.get("password_hasher")
+                if hasher is not None:
+                    self.password_hashes.labels("active").set(hasher["active"])
+                    self.password_hashes.labels("queued").set(hasher["queued"])
+                    self._increment_by_total(self.password_hashes_completed, ("hashes", "completed"), hasher["completed"])
+                    self._increment_by_total(self.password_hashes_rejected, ("hashes", "rejected"), hasher["rejected"])
+
+    def collect(self):
+        """The exposition text for every worker (multiprocess mode) or this process."""
+        self.refresh()
+        if multiprocess_dir() and self.registry is REGISTRY:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            return generate_latest(registry)
+        return generate_latest(self.registry)
+
+    def _check_token(self):
+        token = self.app.config["METRICS_TOKEN"]
+        if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            abort(401)
+
+    def protected(self, view):
+        """Require the METRICS_TOKEN bearer token, as /metrics does, on another internal view."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            self._check_token()
+            return view(*args, **kwargs)
+        return wrapper
+
+    def view(self):
+        self._check_token()
+        return Response(self.collect(), content_type=CONTENT_TYPE_LATEST)
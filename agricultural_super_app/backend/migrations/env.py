@@ -5,6 +5,8 @@ from flask import current_app
 
 from alembic import context
 
+from search import is_search_index_object
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -51,6 +53,22 @@ def get_metadata():
     return target_db.metadata
 
 
+# PostgreSQL-only trigram indexes from d4f1b6a8c930. The models do not declare them, since
+# db.create_all() on SQLite would turn them into plain indexes the migrations never create.
+MIGRATION_ONLY_INDEXES = {'ix_user_username_trgm', 'ix_community_name_trgm'}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Skip objects that only exist in the database, created by raw DDL in the migrations, so
+    # autogenerate does not emit drops for them.
+    if reflected and compare_to is None:
+        if is_search_index_object(name, type_):
+            return False
+        if type_ == 'index' and name in MIGRATION_ONLY_INDEXES:
+            return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +83,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +112,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
@@ -0,0 +1,37 @@
+"""Denormalized follower/following counters on user
+
+Revision ID: 0a8e5c3b7d21
+Revises: f2b9d7e1a6c4
+Create Date: 2026-10-18 17:41:09.530172
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a8e5c3b7d21'
+down_revision = 'f2b9d7e1a6c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('followers_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('following_users_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('following_communities_count', sa.Integer(), nullable=False, server_default='0'))
+
+    op.execute(
+        'UPDATE "user" SET '
+        "followers_count = (SELECT COUNT(*) FROM follows WHERE follows.followed_id = \"user\".id AND follows.followed_type = 'user'), "
+        "following_users_count = (SELECT COUNT(*) FROM follows WHERE follows.follower_id = \"user\".id AND follows.followed_type = 'user'), "
+        "following_communities_count = (SELECT COUNT(*) FROM follows WHERE follows.follower_id = \"user\".id AND follows.followed_type = 'community')"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('following_communities_count')
+        batch_op.drop_column('following_users_count')
+        batch_op.drop_column('followers_count')
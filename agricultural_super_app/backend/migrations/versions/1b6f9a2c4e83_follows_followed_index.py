@@ -0,0 +1,26 @@
+"""Index follows by followed user for followed-by lookups
+
+Revision ID: 1b6f9a2c4e83
+Revises: 0a8e5c3b7d21
+Create Date: 2026-10-18 18:20:52.806113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b6f9a2c4e83'
+down_revision = '0a8e5c3b7d21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('follows', schema=None) as batch_op:
+        batch_op.create_index('ix_follows_followed_follower', ['followed_id', 'follower_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('follows', schema=None) as batch_op:
+        batch_op.drop_index('ix_follows_followed_follower')
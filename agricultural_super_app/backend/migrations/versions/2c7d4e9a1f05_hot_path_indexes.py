@@ -0,0 +1,58 @@
+"""Composite indexes for listing, comment, chat and membership access paths
+
+Revision ID: 2c7d4e9a1f05
+Revises: 1b6f9a2c4e83
+Create Date: 2026-10-18 20:41:07.318514
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c7d4e9a1f05'
+down_revision = '1b6f9a2c4e83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.create_index('ix_post_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_post_user_created', ['user_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_post_community_created', ['community_id', 'created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.create_index('ix_comment_post_parent_created', ['post_id', 'parent_comment_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_comment_parent_created', ['parent_comment_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('community', schema=None) as batch_op:
+        batch_op.create_index('ix_community_created_at_id', ['created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('community_membership', schema=None) as batch_op:
+        batch_op.create_index('ix_community_membership_community', ['community_id', 'user_id'], unique=False)
+
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.create_index('ix_message_community_timestamp', ['community_id', 'timestamp', 'id'], unique=False)
+        batch_op.create_index('ix_message_sender_receiver', ['sender_id', 'receiver_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.drop_index('ix_message_sender_receiver')
+        batch_op.drop_index('ix_message_community_timestamp')
+
+    with op.batch_alter_table('community_membership', schema=None) as batch_op:
+        batch_op.drop_index('ix_community_membership_community')
+
+    with op.batch_alter_table('community', schema=None) as batch_op:
+        batch_op.drop_index('ix_community_created_at_id')
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_index('ix_comment_parent_created')
+        batch_op.drop_index('ix_comment_post_parent_created')
+
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_index('ix_post_community_created')
+        batch_op.drop_index('ix_post_user_created')
+        batch_op.drop_index('ix_post_created_at_id')
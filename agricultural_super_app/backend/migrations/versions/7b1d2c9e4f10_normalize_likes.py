@@ -0,0 +1,108 @@
+"""Normalize post and comment likes into their own tables
+
+Revision ID: 7b1d2c9e4f10
+Revises: 42ec3c83ef16
+Create Date: 2026-10-18 09:12:41.118204
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b1d2c9e4f10'
+down_revision = '42ec3c83ef16'
+branch_labels = None
+depends_on = None
+
+
+BATCH_SIZE = 1000
+
+
+def _execute_in_batches(connection, statement, parameters):
+    # executemany in chunks, so large tables are neither written row by row nor buffered whole.
+    for start in range(0, len(parameters), BATCH_SIZE):
+        connection.execute(statement, parameters[start:start + BATCH_SIZE])
+
+
+def _copy_json_likes(connection, source_table, like_table, target_column, existing_user_ids):
+    # Move each JSON id list into (user_id, target_id) rows and seed the counter from it. Ids of
+    # users that no longer exist are dropped; they would violate the like table's foreign key.
+    rows = connection.execute(sa.text(f'SELECT id, likes FROM {source_table}')).fetchall()
+    likes, counts = [], []
+    for target_id, raw_likes in rows:
+        try:
+            user_ids = {int(user_id) for user_id in json.loads(raw_likes or '[]')}
+        except (TypeError, ValueError):
+            user_ids = set()
+        user_ids &= existing_user_ids
+        likes.extend({'user_id': user_id, 'target_id': target_id} for user_id in sorted(user_ids))
+        if user_ids:
+            counts.append({'count': len(user_ids), 'target_id': target_id})
+    _execute_in_batches(connection, sa.text(
+        f'INSERT INTO {like_table} (user_id, {target_column}) VALUES (:user_id, :target_id)'), likes)
+    _execute_in_batches(connection, sa.text(
+        f'UPDATE {source_table} SET likes_count = :count WHERE id = :target_id'), counts)
+
+
+def _restore_json_likes(connection, source_table, like_table, target_column):
+    rows = connection.execute(sa.text(f'SELECT {target_column}, user_id FROM {like_table}')).fetchall()
+    likes = {}
+    for target_id, user_id in rows:
+        likes.setdefault(target_id, []).append(user_id)
+    _execute_in_batches(connection, sa.text(f'UPDATE {source_table} SET likes = :likes WHERE id = :target_id'), [
+        {'likes': json.dumps(sorted(user_ids)), 'target_id': target_id} for target_id, user_ids in likes.items()
+    ])
+
+
+def upgrade():
+    op.create_table('post_likes',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['post_id'], ['post.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'post_id')
+    )
+    op.create_table('comment_likes',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('comment_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['comment_id'], ['comment.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'comment_id')
+    )
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('likes_count', sa.Integer(), nullable=False, server_default='0'))
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('likes_count', sa.Integer(), nullable=False, server_default='0'))
+
+    connection = op.get_bind()
+    existing_user_ids = set(connection.execute(sa.text('SELECT id FROM "user"')).scalars())
+    _copy_json_likes(connection, 'post', 'post_likes', 'post_id', existing_user_ids)
+    _copy_json_likes(connection, 'comment', 'comment_likes', 'comment_id', existing_user_ids)
+
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_column('likes')
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_column('likes')
+
+
+def downgrade():
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('likes', sa.Text(), nullable=True, server_default='[]'))
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('likes', sa.Text(), nullable=True, server_default='[]'))
+
+    connection = op.get_bind()
+    _restore_json_likes(connection, 'post', 'post_likes', 'post_id')
+    _restore_json_likes(connection, 'comment', 'comment_likes', 'comment_id')
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_column('likes_count')
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_column('likes_count')
+    op.drop_table('comment_likes')
+    op.drop_table('post_likes')
@@ -0,0 +1,60 @@
+"""Full-text search index for posts
+
+Revision ID: c3e8a1f5d2b7
+Revises: 7b1d2c9e4f10
+Create Date: 2026-10-18 11:40:03.551870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8a1f5d2b7'
+down_revision = '7b1d2c9e4f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Generated column: PostgreSQL recomputes it on every INSERT/UPDATE of title or content.
+        op.execute(
+            "ALTER TABLE post ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(content, '')), 'B')) STORED"
+        )
+        op.create_index('ix_post_search_vector', 'post', ['search_vector'], postgresql_using='gin')
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE post_fts USING fts5("
+            "title, content, content='post', content_rowid='id', tokenize='porter unicode61')"
+        )
+        op.execute(
+            "CREATE TRIGGER post_fts_ai AFTER INSERT ON post BEGIN "
+            "INSERT INTO post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER post_fts_ad AFTER DELETE ON post BEGIN "
+            "INSERT INTO post_fts(post_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER post_fts_au AFTER UPDATE OF title, content ON post BEGIN "
+            "INSERT INTO post_fts(post_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+            "INSERT INTO post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END"
+        )
+        # Index the posts that already exist.
+        op.execute("INSERT INTO post_fts(post_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.drop_index('ix_post_search_vector', table_name='post')
+        op.drop_column('post', 'search_vector')
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS post_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS post_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS post_fts_ai")
+        op.execute("DROP TABLE IF EXISTS post_fts")
@@ -0,0 +1,35 @@
+"""Lookup indexes for user and community names
+
+Revision ID: d4f1b6a8c930
+Revises: c3e8a1f5d2b7
+Create Date: 2026-10-18 13:05:27.904112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f1b6a8c930'
+down_revision = 'c3e8a1f5d2b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Trigram GIN indexes serve both prefix and infix ILIKE lookups on names (PostgreSQL only;
+    # the SQLite development database keeps scanning these small tables).
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_user_username_trgm', 'user', ['username'],
+                    postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'})
+    op.create_index('ix_community_name_trgm', 'community', ['name'],
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_community_name_trgm', table_name='community')
+    op.drop_index('ix_user_username_trgm', table_name='user')
@@ -0,0 +1,35 @@
+"""Composite index for direct-message history by user pair
+
+Revision ID: e7a2c4d9b815
+Revises: d4f1b6a8c930
+Create Date: 2026-10-18 14:22:18.640355
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a2c4d9b815'
+down_revision = 'd4f1b6a8c930'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(
+            'CREATE INDEX ix_message_direct_pair ON message '
+            '(LEAST(sender_id, receiver_id), GREATEST(sender_id, receiver_id), timestamp)'
+        )
+    elif dialect == 'sqlite':
+        op.execute(
+            'CREATE INDEX ix_message_direct_pair ON message '
+            '(min(sender_id, receiver_id), max(sender_id, receiver_id), timestamp)'
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name in ('postgresql', 'sqlite'):
+        op.drop_index('ix_message_direct_pair', table_name='message')
@@ -0,0 +1,36 @@
+"""Fan-out-on-write timeline table for the home feed
+
+Revision ID: f2b9d7e1a6c4
+Revises: e7a2c4d9b815
+Create Date: 2026-10-18 16:05:37.214981
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b9d7e1a6c4'
+down_revision = 'e7a2c4d9b815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('timeline_entries',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['post.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'post_id')
+    )
+    with op.batch_alter_table('timeline_entries', schema=None) as batch_op:
+        batch_op.create_index('ix_timeline_entries_user_created', ['user_id', 'created_at', 'post_id'], unique=False)
+    # Existing timelines are filled with `flask rebuild-feeds` after upgrading.
+
+
+def downgrade():
+    with op.batch_alter_table('timeline_entries', schema=None) as batch_op:
+        batch_op.drop_index('ix_timeline_entries_user_created')
+    op.drop_table('timeline_entries')
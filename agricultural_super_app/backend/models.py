@@ -1,5 +1,8 @@
 from extensions import db
 from datetime import datetime
+from sqlalchemy import func, literal, select, union_all
+
+import follows
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -12,6 +15,12 @@ class User(db.Model):
     is_expert = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Denormalized follow counts, kept in step by adjust_follow_counts(). These models have no
+    # migrations (migrations/ tracks app.py's tables); existing `users` tables need the three
+    # columns added by hand, as NOT NULL DEFAULT 0.
+    followers_count = db.Column(db.Integer, nullable=False, default=0)
+    following_users_count = db.Column(db.Integer, nullable=False, default=0)
+    following_communities_count = db.Column(db.Integer, nullable=False, default=0)
 
     posts = db.relationship('Post', backref='author', lazy=True)
     comments = db.relationship('Comment', backref='comment_author', lazy=True)
@@ -103,6 +112,17 @@ class Follow(db.Model):
     def __repr__(self):
         return f"<Follower {self.follower_id} follows {self.followed_type}:{self.followed_id}>"
 
+def adjust_follow_counts(follower_id, followed_id, followed_type, delta):
+    follows.adjust_follow_counts(db.session, User, follower_id, followed_id, followed_type, delta)
+
+def relationship_map(viewer_id, user_ids=(), community_ids=()):
+    """Follow status of `viewer_id` towards many users and communities, fetched in one query.
+
+    Returns {'users': {id: {'following', 'followed_by'}}, 'communities': {id: {'following'}}};
+    pass it to the schemas as context['relationships'].
+    """
+    return follows.relationship_map(db.session, Follow, viewer_id, user_ids, community_ids)
+
 class Comment(db.Model):
     __tablename__ = 'comments'
     id = db.Column(db.Integer, primary_key=True)
@@ -137,4 +157,31 @@ class Message(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def __repr__(self):
-        return f"<Message {self.id} from {self.sender_id} to {self.receiver_id}>"
\ No newline at end of file
+        return f"<Message {self.id} from {self.sender_id} to {self.receiver_id}>"
+
+def list_counts(post_ids=(), community_ids=()):
+    """Comment and like counts for many posts and follower counts for many communities, in one query.
+
+    Returns {'posts': {id: {'comments', 'likes'}}, 'communities': {id: {'followers'}}};
+    pass it to the list schemas as context['counts'].
+    """
+    post_ids, community_ids = set(post_ids), set(community_ids)
+    posts = {post_id: {'comments': 0, 'likes': 0} for post_id in post_ids}
+    communities = {community_id: {'followers': 0} for community_id in community_ids}
+    parts = []
+    if post_ids:
+        parts.append(select(literal('comments').label('kind'), Comment.post_id.label('target_id'), func.count().label('total'))
+                     .where(Comment.post_id.in_(post_ids)).group_by(Comment.post_id))
+        parts.append(select(literal('likes'), Like.post_id, func.count())
+                     .where(Like.post_id.in_(post_ids)).group_by(Like.post_id))
+    if community_ids:
+        parts.append(select(literal('followers'), Follow.followed_id, func.count())
+                     .where(Follow.followed_type == 'community', Follow.followed_id.in_(community_ids))
+                     .group_by(Follow.followed_id))
+    if parts:
+        for kind, target_id, total in db.session.execute(union_all(*parts) if len(parts) > 1 else parts[0]):
+            if kind == 'followers':
+                communities[target_id]['followers'] = total
+            else:
+                posts[target_id][kind] = total
+    return {'posts': posts, 'communities': communities}
@@ -0,0 +1,153 @@
+import base64
+import heapq
+import json
+from datetime import datetime
+
+from flask import current_app, jsonify, request
+from sqlalchemy import and_, or_
+
+
+class PaginationError(ValueError):
+    """Raised when ?limit= or ?cursor= cannot be used to build a page."""
+
+
+def encode_cursor(values):
+    # Cursors are opaque to clients: a URL-safe base64 blob of the sort key of the last row.
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_value(column, value):
+    # Every value must have its column's type: a tampered cursor must not reach the WHERE clause,
+    # where PostgreSQL would reject e.g. a string compared with an integer id.
+    if value is None or column is None:
+        return value
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime:
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise PaginationError("Invalid pagination cursor")
+    if python_type is float:
+        python_type = (int, float)
+    if isinstance(value, bool) and python_type is not bool or not isinstance(value, python_type):
+        raise PaginationError("Invalid pagination cursor")
+    return value
+
+
+def decode_cursor(cursor, columns):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        raise PaginationError("Invalid pagination cursor")
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise PaginationError("Invalid pagination cursor")
+
+    return [_decode_value(column, value) for column, value in zip(columns, values)]
+
+
+def get_page_args():
+    """Read ?limit= and ?cursor= from the current request, clamped to the configured bounds."""
+    default_limit = current_app.config.get("PAGINATION_DEFAULT_LIMIT", 50)
+    max_limit = current_app.config.get("PAGINATION_MAX_LIMIT", 100)
+    limit = request.args.get("limit", default_limit)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise PaginationError("limit must be a positive integer")
+    if limit < 1:
+        raise PaginationError("limit must be a positive integer")
+    return min(limit, max_limit), request.args.get("cursor") or None
+
+
+def _after_cursor(columns, values, descending):
+    # Expands (a, b) < (x, y) into a < x OR (a = x AND b < y), which every backend can use with an index.
+    clauses = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+
+def paginate(query, columns, limit, cursor=None, descending=True):
+    """Return one keyset page of `query` ordered by `columns` and the cursor for the next page.
+
+    `columns` must end with a unique column (normally the primary key) so the ordering is total.
+    """
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        query = query.filter(_after_cursor(columns, values, descending))
+    ordering = [c.desc() if descending else c.asc() for c in columns]
+    rows = query.order_by(*ordering).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+    return rows, next_cursor
+
+
+def paginate_merged(sources, key, limit, cursor=None, descending=True):
+    """Return one keyset page across several queries that share a sort key, merged and de-duplicated.
+
+    `sources` is a list of (query, columns) pairs; each query is ordered by its own `columns`,
+    which must produce the same values as `key(row)` does for its rows. At most `limit` + 1 rows
+    are read from each source.
+    """
+    values = decode_cursor(cursor, sources[0][1]) if cursor else None
+    pages = []
+    for query, columns in sources:
+        if values is not None:
+            query = query.filter(_after_cursor(columns, values, descending))
+        ordering = [c.desc() if descending else c.asc() for c in columns]
+        pages.append(query.order_by(*ordering).limit(limit + 1).all())
+
+    rows, seen = [], set()
+    for row in heapq.merge(*pages, key=key, reverse=descending):
+        row_key = tuple(key(row))
+        if row_key not in seen:
+            seen.add(row_key)
+            rows.append(row)
+        if len(rows) > limit:
+            break
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(list(key(rows[-1])))
+    return rows, next_cursor
+
+
+def paginate_ranked(query, limit, cursor=None):
+    """Page through an already-ordered query whose sort key is not a stable column (e.g. a relevance score).
+
+    The cursor still looks opaque to clients but wraps a row offset.
+    """
+    offset = 0
+    if cursor:
+        values = decode_cursor(cursor, [None])
+        if not isinstance(values[0], int) or values[0] < 0:
+            raise PaginationError("Invalid pagination cursor")
+        offset = values[0]
+    rows = query.offset(offset).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([offset + limit])
+    return rows, next_cursor
+
+
+def paginated_response(items, next_cursor):
+    # The body stays a plain JSON array so existing clients keep working; the cursor travels in a header.
+    response = jsonify(items)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
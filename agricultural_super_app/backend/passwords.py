@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+# bcrypt only looks at the first 72 bytes; older bcrypt releases truncated silently, so
+# truncating here keeps hashes made by Flask-Bcrypt verifiable.
+MAX_PASSWORD_BYTES = 72
+
+
+class HasherBusy(RuntimeError):
+    """Raised when more hashes are waiting than the hasher is allowed to queue."""
+
+
+def _encode(password):
+    return password.encode("utf-8")[:MAX_PASSWORD_BYTES]
+
+
+def hash_rounds(hashed):
+    """The cost factor stored in a bcrypt hash ("$2b$12$..." -> 12), or None if it is not one."""
+    parts = hashed.split("$") if hashed else []
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def default_workers():
+    """The cores shared out between gunicorn workers (WEB_CONCURRENCY), each of which has its own pool."""
+    return max((os.cpu_count() or 1) // int(os.environ.get("WEB_CONCURRENCY", 1)), 1)
+
+
+class PasswordHasher:
+    """bcrypt on a bounded pool of threads.
+
+    bcrypt releases the GIL while it works, so `workers` threads use up to that many cores while
+    request threads wait. At most `max_pending` calls may wait for a free worker; beyond that
+    HasherBusy is raised straight away, so a burst of logins is shed instead of tying up every
+    request thread.
+    """
+
+    def __init__(self, rounds=12, workers=None, max_pending=4):
+        self.rounds = rounds
+        self.workers = workers or default_workers()
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+        self._peak_queued = 0
+        self._wait_seconds = 0.0
+
+    def _run(self, function, *args):
+        with self._lock:
+            if self._in_flight - self._active >= self.max_pending:
+                self._rejected += 1
+                raise HasherBusy("Too many password hashes queued")
+            self._in_flight += 1
+            self._peak_queued = max(self._peak_queued, self._in_flight - self._active)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+            executor = self._executor
+        submitted = time.perf_counter()
+
+        def task():
+            with self._lock:
+                self._active += 1
+                self._wait_seconds += time.perf_counter() - submitted
+            try:
+                return function(*args)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._in_flight -= 1
+                    self._completed += 1
+
+        try:
+            future = executor.submit(task)
+        except RuntimeError:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        return future.result()
+
+    def hash(self, password):
+        return self._run(lambda: bcrypt.hashpw(_encode(password), bcrypt.gensalt(self.rounds)).decode("utf-8"))
+
+    def verify(self, password, hashed):
+        if not password or hash_rounds(hashed) is None:
+            return False
+        try:
+            return self._run(bcrypt.checkpw, _encode(password), hashed.encode("utf-8"))
+        except ValueError:  # malformed hash
+            return False
+
+    def needs_rehash(self, hashed):
+        return hash_rounds(hashed) != self.rounds
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "rounds": self.rounds,
+                "active": self._active,
+                "queued": self._in_flight - self._active,
+                "peak_queued": self._peak_queued,
+                "max_pending": self.max_pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "average_wait_ms": round(self._wait_seconds * 1000 / self._completed, 3) if self._completed else 0.0,
+            }
+
+
+def benchmark(rounds, seconds=5.0, threads=None):
+    """Hash for about `seconds` on `threads` threads; returns (hashes per second, hashes per second per core)."""
+    threads = threads or os.cpu_count() or 1
+    deadline = time.perf_counter() + seconds
+    counts = [0] * threads
+
+    def work(index):
+        salt = bcrypt.gensalt(rounds)
+        while time.perf_counter() < deadline:
+            bcrypt.hashpw(b"correct horse battery staple", salt)
+            counts[index] += 1
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    rate = sum(counts) / (time.perf_counter() - started)
+    return rate, rate / min(threads, os.cpu_count() or 1)
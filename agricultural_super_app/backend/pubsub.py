@@ -0,0 +1,191 @@
+import json
+import logging
+import queue
+import select
+import threading
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One connected client's view of a topic: a bounded queue of published messages."""
+
+    def __init__(self, hub, topic, max_pending):
+        self._hub = hub
+        self.topic = topic
+        self._queue = queue.Queue(maxsize=max_pending)
+
+    def deliver(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            # A client that stopped reading must not hold up everyone else on the topic.
+            logger.warning("Dropping message for slow subscriber on %s", self.topic)
+
+    def get(self, timeout=None):
+        """Next message, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._hub.unsubscribe(self)
+
+
+class InMemoryBroker:
+    """Per-process pub/sub hub. Only reaches clients connected to the same worker process."""
+
+    def __init__(self, max_pending=100):
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+        self._topics = {}
+
+    def subscribe(self, topic):
+        subscription = Subscription(self, topic, self._max_pending)
+        with self._lock:
+            self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._topics.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[subscription.topic]
+
+    def publish(self, topic, message):
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._topics.values())
+
+
+class _RelayBroker:
+    """Fans messages out between worker processes through an external channel.
+
+    `publish` only sends to the external channel; a background listener thread in every
+    process (including the publisher's) receives it and hands it to the local hub.
+    """
+
+    def __init__(self, max_pending=100):
+        self._local = InMemoryBroker(max_pending=max_pending)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self, topic):
+        self._ensure_listener()
+        return self._local.subscribe(topic)
+
+    def unsubscribe(self, subscription):
+        self._local.unsubscribe(subscription)
+
+    def subscriber_count(self):
+        return self._local.subscriber_count()
+
+    def _ensure_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen_forever, name=type(self).__name__, daemon=True)
+                self._listener.start()
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("%s listener failed; reconnecting", type(self).__name__)
+                threading.Event().wait(1)
+
+    def _dispatch(self, raw):
+        try:
+            envelope = json.loads(raw)
+            self._local.publish(envelope["topic"], envelope["message"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed broker payload: %r", raw)
+
+
+class RedisBroker(_RelayBroker):
+    """Relays through a Redis pub/sub channel. Requires the optional `redis` package."""
+
+    def __init__(self, url, channel="chat_events", max_pending=100):
+        super().__init__(max_pending=max_pending)
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CHAT_BROKER_URL points at Redis but the 'redis' package is not installed")
+        self._client = redis.Redis.from_url(url)
+        self._channel = channel
+
+    def publish(self, topic, message):
+        self._client.publish(self._channel, json.dumps({"topic": topic, "message": message}))
+
+    def _listen(self):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self._channel)
+        try:
+            for item in pubsub.listen():
+                self._dispatch(item["data"])
+        finally:
+            pubsub.close()
+
+
+class PostgresBroker(_RelayBroker):
+    """Relays through PostgreSQL LISTEN/NOTIFY, so no extra service is needed.
+
+    NOTIFY payloads are limited to 8000 bytes, which comfortably fits a chat message.
+    """
+
+    def __init__(self, url, channel="chat_events", max_pending=100, poll_interval=5.0):
+        super().__init__(max_pending=max_pending)
+        self._url = url
+        self._channel = channel
+        self._poll_interval = poll_interval
+        self._publish_lock = threading.Lock()
+        self._publish_connection = None
+
+    def _connect(self):
+        import psycopg2
+        connection = psycopg2.connect(self._url)
+        connection.autocommit = True
+        return connection
+
+    def publish(self, topic, message):
+        payload = json.dumps({"topic": topic, "message": message})
+        with self._publish_lock:
+            if self._publish_connection is None or self._publish_connection.closed:
+                self._publish_connection = self._connect()
+            with self._publish_connection.cursor() as cursor:
+                cursor.execute("SELECT pg_notify(%s, %s)", (self._channel, payload))
+
+    def _listen(self):
+        connection = self._connect()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self._channel}"')
+            while True:
+                if select.select([connection], [], [], self._poll_interval) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    self._dispatch(connection.notifies.pop(0).payload)
+        finally:
+            connection.close()
+
+
+def create_broker(url=None, max_pending=100):
+    """Build a broker from CHAT_BROKER_URL: memory:// (default), redis://..., or postgresql://..."""
+    scheme = urlparse(url).scheme if url else "memory"
+    if scheme in ("", "memory"):
+        return InMemoryBroker(max_pending=max_pending)
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisBroker(url, max_pending=max_pending)
+    if scheme in ("postgres", "postgresql"):
+        return PostgresBroker(url.replace("postgres://", "postgresql://", 1), max_pending=max_pending)
+    raise ValueError(f"Unsupported CHAT_BROKER_URL scheme: {scheme}")
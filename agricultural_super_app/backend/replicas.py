@@ -0,0 +1,102 @@
+import itertools
+import logging
+import threading
+import time
+
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql.dml import UpdateBase
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaSet:
+    """Read-replica engines handed out round-robin, skipping replicas that fail health checks.
+
+    A replica is pinged at most every `check_interval` seconds when it is about to be used; one
+    that fails the ping, or loses a connection mid-query, is skipped for `retry_after` seconds.
+    """
+
+    def __init__(self, engines, check_interval=10, retry_after=30):
+        self.engines = list(engines)
+        self.check_interval = check_interval
+        self.retry_after = retry_after
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._checked_at = [float("-inf")] * len(self.engines)
+        self._down_until = [0.0] * len(self.engines)
+        self.reads = [0] * len(self.engines)
+        for index, engine in enumerate(self.engines):
+            event.listen(engine, "handle_error", self._disconnect_listener(index))
+
+    def __bool__(self):
+        return bool(self.engines)
+
+    def _disconnect_listener(self, index):
+        def on_error(context):
+            if context.is_disconnect:
+                self.mark_down(index)
+        return on_error
+
+    def mark_down(self, index):
+        logger.warning("Read replica %s is unavailable; using others for %ss",
+                       self.engines[index].url.render_as_string(hide_password=True), self.retry_after)
+        with self._lock:
+            self._down_until[index] = time.monotonic() + self.retry_after
+
+    def _healthy(self, index):
+        now = time.monotonic()
+        with self._lock:
+            if self._down_until[index] > now:
+                return False
+            due = now - self._checked_at[index] >= self.check_interval
+            if due:
+                self._checked_at[index] = now  # one thread pings; the others keep using the replica
+        if due:
+            try:
+                with self.engines[index].connect() as connection:
+                    connection.execute(text("SELECT 1"))
+            except SQLAlchemyError:
+                self.mark_down(index)
+                return False
+        return True
+
+    def choose(self):
+        """The next healthy replica engine, or None when every replica is down."""
+        for _ in range(len(self.engines)):
+            index = next(self._counter) % len(self.engines)
+            if self._healthy(index):
+                with self._lock:
+                    self.reads[index] += 1
+                return self.engines[index]
+        return None
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {"url": engine.url.render_as_string(hide_password=True), "healthy": self._down_until[index] <= now,
+                 "reads": self.reads[index]}
+                for index, engine in enumerate(self.engines)
+            ]
+
+    def dispose(self):
+        for engine in self.engines:
+            engine.dispose()
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends reads to `g.read_replica` when a route has set one.
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not isinstance(clause, UpdateBase) and has_app_context():
+            replica = g.get("read_replica")
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
@@ -0,0 +1,131 @@
+import heapq
+import itertools
+import logging
+import random
+import time
+
+from flask import current_app, g, has_app_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_sequence = itertools.count()  # tie-breaker so heap entries never compare statements
+
+
+class _Timing:
+    __slots__ = ("started", "statements", "db_seconds", "serialize_seconds", "slowest")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.slowest = []  # min-heap of (seconds, seq, statement, parameters), capped in size
+
+
+def _current():
+    return g.get("request_timing") if has_app_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current() is not None and context is not None:
+        context.request_timing_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = _current()
+    started = getattr(context, "request_timing_started", None)
+    if timing is None or started is None:
+        return
+    seconds = time.perf_counter() - started
+    timing.statements += 1
+    timing.db_seconds += seconds
+    entry = (seconds, next(_sequence), statement, parameters)
+    if len(timing.slowest) < current_app.config["REQUEST_TIMING_SLOW_STATEMENTS"]:
+        heapq.heappush(timing.slowest, entry)
+    elif timing.slowest and seconds > timing.slowest[0][0]:
+        heapq.heapreplace(timing.slowest, entry)
+
+
+def add_serialization_time(seconds):
+    timing = _current()
+    if timing is not None:
+        timing.serialize_seconds += seconds
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, with time spent encoding responses counted as serialization."""
+
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            add_serialization_time(time.perf_counter() - started)
+
+
+class RequestTimer:
+    """Per-request SQL count, DB time, JSON serialization time and handler time.
+
+    A sampled request (REQUEST_TIMING_SAMPLE_RATE) gets a Server-Timing header and an info log
+    record whose fields (sql_count, db_ms, serialize_ms, handler_ms, total_ms) are attached as
+    record attributes for structured formatters. Requests slower than REQUEST_TIMING_SLOW_MS also
+    log their REQUEST_TIMING_SLOW_STATEMENTS slowest statements with parameters. Unsampled
+    requests cost one random() call; statement timing is only recorded for sampled ones.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("REQUEST_TIMING_SAMPLE_RATE", 1.0)
+        app.config.setdefault("REQUEST_TIMING_SLOW_MS", 500)
+        app.config.setdefault("REQUEST_TIMING_SLOW_STATEMENTS", 5)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        # On the Engine class, so replica engines are counted as well.
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    @staticmethod
+    def _start():
+        if random.random() < current_app.config["REQUEST_TIMING_SAMPLE_RATE"]:
+            g.request_timing = _Timing()
+
+    @staticmethod
+    def _finish(response):
+        timing = g.pop("request_timing", None)
+        if timing is None:
+            return response
+        total = time.perf_counter() - timing.started
+        handler = max(total - timing.db_seconds - timing.serialize_seconds, 0.0)
+        response.headers.add("Server-Timing", ", ".join([
+            f'db;dur={timing.db_seconds * 1000:.2f};desc="{timing.statements} queries"',
+            f"serialize;dur={timing.serialize_seconds * 1000:.2f}",
+            f"handler;dur={handler * 1000:.2f}",
+            f"total;dur={total * 1000:.2f}",
+        ]))
+        fields = {
+            "http_method": request.method, "path": request.path, "status": response.status_code,
+            "sql_count": timing.statements, "db_ms": round(timing.db_seconds * 1000, 2),
+            "serialize_ms": round(timing.serialize_seconds * 1000, 2), "handler_ms": round(handler * 1000, 2),
+            "total_ms": round(total * 1000, 2),
+        }
+        logger.info("%(http_method)s %(path)s %(status)s: %(sql_count)s queries, %(total_ms)sms", fields, extra=fields)
+        if total * 1000 >= current_app.config["REQUEST_TIMING_SLOW_MS"]:
+            slowest = sorted(timing.slowest, reverse=True)
+            logger.warning(
+                "Slow request %s %s (%.1fms, %s queries); slowest statements:\n%s",
+                request.method, request.path, total * 1000, timing.statements,
+                "\n".join(f"  {seconds * 1000:.2f}ms {statement} {parameters!r}"
+                          for seconds, _, statement, parameters in slowest),
+                extra={**fields, "slow_statements": [
+                    {"ms": round(seconds * 1000, 2), "statement": statement, "parameters": repr(parameters)}
+                    for seconds, _, statement, parameters in slowest
+                ]},
+            )
+        return response
@@ -1,11 +1,14 @@
+import click
 from flask import request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, current_user # Import current_user
 from extensions import db
-from models import User, Post, Community, Follow, Comment, Like, Message
+from sqlalchemy.orm import joinedload
+from models import User, Post, Community, Follow, Comment, Like, Message, adjust_follow_counts, list_counts, relationship_map
 from schemas import (
     UserSchema, users_schema, # Use UserSchema directly for context
     PostSchema, posts_schema, # Use PostSchema directly for context
     CommunitySchema, communities_schema, # Use CommunitySchema directly for context
+    UserListSchema, PostListSchema, CommunityListSchema, benchmark_dump,
     comment_schema, comments_schema,
     like_schema, likes_schema,
     message_schema, messages_schema,
@@ -20,6 +23,21 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def relationship_context(user_ids=(), community_ids=()):
+    # Schema context with the viewer's follow status for a whole page, fetched in one query
+    context = {'current_user': current_user}
+    viewer_id = get_jwt_identity()
+    if viewer_id:
+        context['relationships'] = relationship_map(viewer_id, user_ids, community_ids)
+    return context
+
+def list_context(user_ids=(), community_ids=(), post_ids=()):
+    # relationship_context plus comment/like/follower counts for the page, for the list schemas
+    context = relationship_context(user_ids, community_ids)
+    if post_ids or community_ids:
+        context['counts'] = list_counts(post_ids, community_ids)
+    return context
+
 def register_routes(app):
     register_auth_routes(app)
 
@@ -28,8 +46,8 @@ def register_routes(app):
     @jwt_required(optional=True) # Allow access even if not logged in
     def get_users():
         users = User.query.all()
-        # Pass current_user to the schema context
-        users_schema_with_context = UserSchema(many=True, context={'current_user': current_user})
+        # List schema: declared columns only, with the viewer's follow status for every listed user from one query
+        users_schema_with_context = UserListSchema(many=True, context=list_context(user_ids=[u.id for u in users]))
         return jsonify(users_schema_with_context.dump(users)), 200
 
     @app.route('/api/users/<int:user_id>', methods=['GET'])
@@ -44,9 +62,10 @@ def register_routes(app):
     @app.route('/api/posts', methods=['GET'])
     @jwt_required(optional=True) # Allow access even if not logged in
     def get_posts():
-        posts = Post.query.order_by(Post.created_at.desc()).all()
-        # Pass current_user to the schema context (for author's is_following)
-        posts_schema_with_context = PostSchema(many=True, context={'current_user': current_user})
+        posts = Post.query.options(joinedload(Post.author)).order_by(Post.created_at.desc()).all()
+        # List schema: authors come from the join, counts and the viewer's follow status from one query each
+        posts_schema_with_context = PostListSchema(many=True, context=list_context(
+            user_ids=[p.user_id for p in posts], post_ids=[p.id for p in posts]))
         return jsonify(posts_schema_with_context.dump(posts)), 200
 
     @app.route('/api/posts', methods=['POST'])
@@ -142,8 +161,8 @@ def register_routes(app):
     @jwt_required(optional=True) # Allow access even if not logged in
     def get_communities():
         communities = Community.query.all()
-        # Pass current_user to the schema context
-        communities_schema_with_context = CommunitySchema(many=True, context={'current_user': current_user})
+        # List schema: follower counts and the viewer's follow status for every listed community from one query each
+        communities_schema_with_context = CommunityListSchema(many=True, context=list_context(community_ids=[c.id for c in communities]))
         return jsonify(communities_schema_with_context.dump(communities)), 200
 
     @app.route('/api/communities', methods=['POST'])
@@ -195,6 +214,7 @@ def register_routes(app):
         new_follow = Follow(follower_id=current_user_id, followed_id=user_id, followed_type='user')
         try:
             db.session.add(new_follow)
+            adjust_follow_counts(current_user_id, user_id, 'user', 1)
             db.session.commit()
             return jsonify({"message": "User followed successfully"}), 201
         except Exception as e:
@@ -217,6 +237,7 @@ def register_routes(app):
         
         try:
             db.session.delete(follow)
+            adjust_follow_counts(current_user_id, user_id, 'user', -1)
             db.session.commit()
             return jsonify({"message": "User unfollowed successfully"}), 200
         except Exception as e:
@@ -245,6 +266,7 @@ def register_routes(app):
         new_follow = Follow(follower_id=current_user_id, followed_id=community_id, followed_type='community')
         try:
             db.session.add(new_follow)
+            adjust_follow_counts(current_user_id, community_id, 'community', 1)
             db.session.commit()
             return jsonify({"message": "Community followed successfully"}), 201
         except Exception as e:
@@ -267,6 +289,7 @@ def register_routes(app):
         
         try:
             db.session.delete(follow)
+            adjust_follow_counts(current_user_id, community_id, 'community', -1)
             db.session.commit()
             return jsonify({"message": "Community unfollowed successfully"}), 200
         except Exception as e:
@@ -399,4 +422,53 @@ def register_routes(app):
             return jsonify({"message": "Message marked as read", "message": message_schema.dump(message)}), 200
         except Exception as e:
             db.session.rollback()
-            return jsonify({"message": "Error marking message as read", "error": str(e)}), 500
\ No newline at end of file
+            return jsonify({"message": "Error marking message as read", "error": str(e)}), 500
+
+    @app.cli.command('benchmark-schemas')
+    @click.option('--seconds', type=float, default=2.0, help='How long to dump each list for.')
+    @click.option('--viewer', type=int, default=None, help='User id whose follow status is included.')
+    def benchmark_schemas_command(seconds, viewer):
+        """Compare list throughput of the full schemas and the list schemas on the current database."""
+        def relationships(user_ids=(), community_ids=()):
+            return {'relationships': relationship_map(viewer, user_ids, community_ids)} if viewer else {}
+
+        # Each run starts from an empty session, like a request, so lazy loads are not reused between runs.
+        def full_users():
+            db.session.expunge_all()
+            users = User.query.all()
+            return UserSchema(many=True, context=relationships([u.id for u in users])).dump(users)
+
+        def list_users():
+            db.session.expunge_all()
+            users = User.query.all()
+            return UserListSchema(many=True, context=relationships([u.id for u in users])).dump(users)
+
+        def full_posts():
+            db.session.expunge_all()
+            posts = Post.query.order_by(Post.created_at.desc()).all()
+            return PostSchema(many=True, context=relationships([p.user_id for p in posts])).dump(posts)
+
+        def list_posts():
+            db.session.expunge_all()
+            posts = Post.query.options(joinedload(Post.author)).order_by(Post.created_at.desc()).all()
+            context = relationships([p.user_id for p in posts])
+            context['counts'] = list_counts(post_ids=[p.id for p in posts])
+            return PostListSchema(many=True, context=context).dump(posts)
+
+        def full_communities():
+            db.session.expunge_all()
+            communities = Community.query.all()
+            return CommunitySchema(many=True, context=relationships(community_ids=[c.id for c in communities])).dump(communities)
+
+        def list_communities():
+            db.session.expunge_all()
+            communities = Community.query.all()
+            context = relationships(community_ids=[c.id for c in communities])
+            context['counts'] = list_counts(community_ids=[c.id for c in communities])
+            return CommunityListSchema(many=True, context=context).dump(communities)
+
+        for name, full, lean in (('users', full_users, list_users), ('posts', full_posts, list_posts),
+                                 ('communities', full_communities, list_communities)):
+            before, after = benchmark_dump(full, seconds), benchmark_dump(lean, seconds)
+            click.echo(f"{name}: {before:.0f} objects/s with the full schema, {after:.0f} objects/s with the list schema"
+                       f" ({after / before if before else 0:.1f}x)")
@@ -1,3 +1,5 @@
+import time
+
 from extensions import ma
 from models import User, Post, Community, Comment, Like, Message, Follow # Import all models
 from flask_jwt_extended import current_user # Import current_user for schema context
@@ -14,28 +16,18 @@ class UserSchema(ma.SQLAlchemyAutoSchema):
         include_relationships = True
         exclude = ('password_hash',) # Exclude sensitive fields
 
-    # Add calculated fields for follower/following counts
-    followers_count = ma.Method("get_followers_count")
-    following_users_count = ma.Method("get_following_users_count")
-    following_communities_count = ma.Method("get_following_communities_count")
+    # followers_count, following_users_count and following_communities_count are plain columns
+    # on User, so the auto schema serializes them without a query per user.
 
     # Add a field to indicate if the current user is following this user
     # This field relies on `current_user` being passed in the schema's context
     is_following = ma.Method("get_is_following")
 
-    def get_followers_count(self, obj):
-        # Count only users who follow this user (followed_type = 'user')
-        return obj.followed_by_users_associations.count()
-
-    def get_following_users_count(self, obj):
-        # Count users this user is following (followed_type = 'user')
-        return obj.following_users_associations.count()
-
-    def get_following_communities_count(self, obj):
-        # Count communities this user is following (followed_type = 'community')
-        return obj.following_communities_associations.count()
-
     def get_is_following(self, obj):
+        # A precomputed map from models.relationship_map() avoids one query per user
+        relationships = self.context.get('relationships')
+        if relationships is not None:
+            return relationships['users'].get(obj.id, {}).get('following', False)
         # `self.context` should contain {'current_user': current_user_object}
         current_user_obj = self.context.get('current_user')
         if not current_user_obj or current_user_obj.is_anonymous:
@@ -76,6 +68,10 @@ class CommunitySchema(ma.SQLAlchemyAutoSchema):
         return obj.followers_communities_associations.count()
 
     def get_is_followed(self, obj):
+        # A precomputed map from models.relationship_map() avoids one query per community
+        relationships = self.context.get('relationships')
+        if relationships is not None:
+            return relationships['communities'].get(obj.id, {}).get('following', False)
         # `self.context` should contain {'current_user': current_user_object}
         current_user_obj = self.context.get('current_user')
         if not current_user_obj or current_user_obj.is_anonymous:
@@ -123,6 +119,83 @@ class FollowSchema(ma.SQLAlchemyAutoSchema):
     # For simplicity, we'll keep it basic for now, or you can add conditional loading based on followed_type.
 
 
+# --- List schemas ---
+# The schemas above use include_relationships, so dumping a user lists the ids of all their posts,
+# comments, likes and messages (a lazy load per relationship per object). The list schemas declare
+# the columns a list needs and read per-object extras from a context prefetched for the whole page:
+# context['relationships'] from models.relationship_map() and context['counts'] from
+# models.list_counts(). They never touch a relationship except a Nested author, which the route
+# should joinedload.
+
+class UserListSchema(ma.SQLAlchemySchema):
+    class Meta:
+        model = User
+
+    id = ma.auto_field()
+    username = ma.auto_field()
+    profile_picture = ma.auto_field()
+    bio = ma.auto_field()
+    is_expert = ma.auto_field()
+    created_at = ma.auto_field()
+    followers_count = ma.auto_field()
+    following_users_count = ma.auto_field()
+    following_communities_count = ma.auto_field()
+    is_following = ma.Method("get_is_following")
+
+    def get_is_following(self, obj):
+        relationships = self.context.get('relationships')
+        return relationships is not None and relationships['users'].get(obj.id, {}).get('following', False)
+
+class PostListSchema(ma.SQLAlchemySchema):
+    class Meta:
+        model = Post
+
+    id = ma.auto_field()
+    title = ma.auto_field()
+    content = ma.auto_field()
+    image_url = ma.auto_field()
+    user_id = ma.auto_field()
+    created_at = ma.auto_field()
+    updated_at = ma.auto_field()
+    author = ma.Nested(UserListSchema, only=('id', 'username', 'profile_picture', 'followers_count', 'is_following'))
+    comments_count = ma.Method("get_comments_count")
+    likes_count = ma.Method("get_likes_count")
+
+    def get_comments_count(self, obj):
+        return self.context.get('counts', {}).get('posts', {}).get(obj.id, {}).get('comments', 0)
+
+    def get_likes_count(self, obj):
+        return self.context.get('counts', {}).get('posts', {}).get(obj.id, {}).get('likes', 0)
+
+class CommunityListSchema(ma.SQLAlchemySchema):
+    class Meta:
+        model = Community
+
+    id = ma.auto_field()
+    name = ma.auto_field()
+    description = ma.auto_field()
+    admin_id = ma.auto_field()
+    created_at = ma.auto_field()
+    followers_count = ma.Method("get_followers_count")
+    is_followed = ma.Method("get_is_followed")
+
+    def get_followers_count(self, obj):
+        return self.context.get('counts', {}).get('communities', {}).get(obj.id, {}).get('followers', 0)
+
+    def get_is_followed(self, obj):
+        relationships = self.context.get('relationships')
+        return relationships is not None and relationships['communities'].get(obj.id, {}).get('following', False)
+
+def benchmark_dump(dump, seconds=2.0):
+    """Call `dump` (which loads and dumps a list, returning it) for about `seconds`; returns objects per second."""
+    dumped = 0
+    started = time.perf_counter()
+    while True:
+        dumped += len(dump())
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            return dumped / elapsed
+
 # Instantiate schemas for single and multiple objects
 # IMPORTANT: When using schemas that rely on current_user context, you MUST
 # pass the context when instantiating them within your routes.
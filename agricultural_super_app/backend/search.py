@@ -0,0 +1,130 @@
+import re
+
+from sqlalchemy import column, func, literal_column, or_, table, text
+
+# Full-text search over post titles and content.
+# PostgreSQL: a generated `search_vector` tsvector column with a GIN index, ranked with ts_rank_cd.
+# SQLite: an external-content FTS5 table (`post_fts`) kept in sync by triggers, ranked with bm25.
+# Both are maintained by the database itself, so every INSERT/UPDATE/DELETE on `post` stays searchable.
+
+TEXT_SEARCH_CONFIG = "english"
+
+_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+POSTGRES_DDL = [
+    f"ALTER TABLE post ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(content, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_post_search_vector ON post USING GIN (search_vector)",
+]
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5("
+    "title, content, content='post', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_ai AFTER INSERT ON post BEGIN "
+    "INSERT INTO post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_ad AFTER DELETE ON post BEGIN "
+    "INSERT INTO post_fts(post_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_au AFTER UPDATE OF title, content ON post BEGIN "
+    "INSERT INTO post_fts(post_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+]
+
+SQLITE_TEARDOWN_DDL = [
+    "DROP TRIGGER IF EXISTS post_fts_au",
+    "DROP TRIGGER IF EXISTS post_fts_ad",
+    "DROP TRIGGER IF EXISTS post_fts_ai",
+    "DROP TABLE IF EXISTS post_fts",
+]
+
+post_fts = table("post_fts", column("rowid"), column("rank"))
+
+
+def is_search_index_object(name, type_):
+    """Whether `name` is one of the objects above, which only raw DDL creates.
+
+    Autogenerate cannot compare them with the models, and would otherwise drop them; see
+    migrations/env.py. FTS5 also creates post_fts_data, post_fts_idx, post_fts_docsize and
+    post_fts_config behind `post_fts`.
+    """
+    if type_ == "table":
+        return name == "post_fts" or name.startswith("post_fts_")
+    if type_ == "column":
+        return name == "search_vector"
+    if type_ == "index":
+        return name == "ix_post_search_vector"
+    return False
+
+
+def create_post_search_index(target, connection, **kw):
+    """`after_create` hook for the post table so db.create_all() builds the search index too."""
+    statements = {"postgresql": POSTGRES_DDL, "sqlite": SQLITE_DDL}.get(connection.dialect.name, [])
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def drop_post_search_index(target, connection, **kw):
+    """`before_drop` hook; SQLite will not drop `post` while FTS triggers still reference it."""
+    if connection.dialect.name == "sqlite":
+        for statement in SQLITE_TEARDOWN_DDL:
+            connection.execute(text(statement))
+
+
+def parse_search_query(raw_query):
+    """Split user input into search terms.
+
+    Each term is (words, is_prefix): a quoted "exact phrase" becomes a multi-word term, and a
+    trailing * (e.g. irrig*) marks a prefix term. Punctuation is discarded.
+    """
+    terms = []
+    for phrase, word in _TOKEN_RE.findall(raw_query):
+        if phrase:
+            words = tuple(_WORD_RE.findall(phrase))
+            if words:
+                terms.append((words, False))
+        else:
+            words = tuple(_WORD_RE.findall(word))
+            if words:
+                terms.append((words, word.endswith("*") and len(words) == 1))
+    return terms
+
+
+def to_tsquery_string(terms):
+    parts = []
+    for words, is_prefix in terms:
+        if is_prefix:
+            parts.append(f"{words[0]}:*")
+        else:
+            parts.append("(" + " <-> ".join(words) + ")")
+    return " & ".join(parts)
+
+
+def to_fts5_query(terms):
+    parts = []
+    for words, is_prefix in terms:
+        quoted = '"' + " ".join(words) + '"'
+        parts.append(quoted + "*" if is_prefix else quoted)
+    return " ".join(parts)
+
+
+def apply_post_search(query, post_model, terms, dialect_name):
+    """Filter `query` to posts matching `terms` and order it by relevance, best first."""
+    if dialect_name == "postgresql":
+        tsquery = func.to_tsquery(TEXT_SEARCH_CONFIG, to_tsquery_string(terms))
+        search_vector = literal_column("post.search_vector")
+        rank = func.ts_rank_cd(search_vector, tsquery)
+        return query.filter(search_vector.op("@@")(tsquery)).order_by(rank.desc(), post_model.id.desc())
+    if dialect_name == "sqlite":
+        # FTS5's rank is bm25(), where smaller is more relevant.
+        return (
+            query.join(post_fts, post_fts.c.rowid == post_model.id)
+            .filter(text("post_fts MATCH :fts_query").bindparams(fts_query=to_fts5_query(terms)))
+            .order_by(post_fts.c.rank.asc(), post_model.id.desc())
+        )
+    # Other backends have no text index: fall back to substring matching, newest first.
+    conditions = []
+    for words, _ in terms:
+        needle = f"%{' '.join(words)}%"
+        conditions.append(or_(post_model.title.ilike(needle), post_model.content.ilike(needle)))
+    return query.filter(*conditions).order_by(post_model.created_at.desc(), post_model.id.desc())
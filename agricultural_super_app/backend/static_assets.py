@@ -0,0 +1,133 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from datetime import datetime, timezone
+
+from flask import Response, request, send_file
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip variants are still served
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/manifest+json",
+                      "application/xml", "image/svg+xml")
+MIN_COMPRESS_SIZE = 1024
+# Quality 11 costs seconds per megabyte of JS; 5 keeps most of the gain and lets a worker build the
+# manifest quickly when the build shipped no .br sidecars.
+BROTLI_QUALITY = 5
+# Source maps are for developer tools, not users, and are the largest files in a build.
+SKIPPED_SUFFIXES = (".br", ".gz", ".map")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+class _Asset:
+    __slots__ = ("path", "mimetype", "etag", "last_modified", "body", "encodings")
+
+    def __init__(self, path, mimetype, etag, last_modified, body=None, encodings=None):
+        self.path = path
+        self.mimetype = mimetype
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body = body  # raw bytes for text assets kept in memory; None means stream from disk
+        self.encodings = encodings or {}  # {"br": bytes, "gzip": bytes}
+
+
+class StaticManifest:
+    """In-memory index of the frontend build directory, built once per process by `load`.
+
+    Text assets (HTML, JS, CSS, JSON, SVG) are held in memory together with Brotli and gzip
+    variants; other files are streamed from disk. Files under `immutable_prefix` carry a content
+    hash in their name (the Create React App layout), so browsers may cache them forever;
+    everything else is revalidated with its ETag. Source maps are not served.
+
+    Call `load` at worker start (see gunicorn.conf.py) so the first request does not pay for
+    reading and compressing the build; without that it runs on first use.
+    """
+
+    def __init__(self, root, immutable_prefix="static/"):
+        self.root = root
+        self.immutable_prefix = immutable_prefix
+        self._assets = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Build the manifest now unless it already has been, and return it."""
+        if self._assets is None:
+            with self._lock:
+                if self._assets is None:
+                    self._assets = self._build()
+        return self._assets
+
+    def _build(self):
+        assets = {}
+        if os.path.isdir(self.root):
+            for directory, _, filenames in os.walk(self.root):
+                for filename in filenames:
+                    if filename.endswith(SKIPPED_SUFFIXES):
+                        continue
+                    path = os.path.join(directory, filename)
+                    relative = os.path.relpath(path, self.root).replace(os.sep, "/")
+                    assets[relative] = self._index(path)
+        return assets
+
+    @staticmethod
+    def _index(path):
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        stat = os.stat(path)
+        last_modified = datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc)
+        if not mimetype.startswith(COMPRESSIBLE_TYPES):
+            etag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+            return _Asset(path, mimetype, etag, last_modified)
+
+        with open(path, "rb") as f:
+            body = f.read()
+        encodings = {}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            # Prefer sidecar files produced by the build, otherwise compress once here.
+            compressors = (
+                ("br", ".br", (lambda data: brotli.compress(data, quality=BROTLI_QUALITY)) if brotli else None),
+                ("gzip", ".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0)),
+            )
+            for encoding, suffix, compress in compressors:
+                if os.path.exists(path + suffix):
+                    with open(path + suffix, "rb") as f:
+                        encodings[encoding] = f.read()
+                elif compress is not None:
+                    encodings[encoding] = compress(body)
+            encodings = {encoding: data for encoding, data in encodings.items() if len(data) < len(body)}
+        return _Asset(path, mimetype, hashlib.sha256(body).hexdigest()[:32], last_modified, body, encodings)
+
+    @property
+    def assets(self):
+        return self.load()
+
+    def response(self, relative_path):
+        """A response for `relative_path` under the build directory, or None if the build has no such file."""
+        asset = self.assets.get(relative_path)
+        if asset is None:
+            return None
+        cache_control = IMMUTABLE if relative_path.startswith(self.immutable_prefix) else REVALIDATE
+
+        if asset.body is None:
+            response = send_file(asset.path, mimetype=asset.mimetype, etag=asset.etag, last_modified=asset.last_modified)
+        else:
+            body, content_encoding = asset.body, None
+            for encoding in ("br", "gzip"):
+                if encoding in asset.encodings and request.accept_encodings[encoding]:
+                    body, content_encoding = asset.encodings[encoding], encoding
+                    break
+            response = Response(body, mimetype=asset.mimetype)
+            if content_encoding:
+                response.headers["Content-Encoding"] = content_encoding
+            if asset.encodings:
+                response.vary.add("Accept-Encoding")
+            # Each encoding is a different representation, so it needs its own ETag.
+            response.set_etag(f"{asset.etag}-{content_encoding}" if content_encoding else asset.etag)
+            response.last_modified = asset.last_modified
+            response.make_conditional(request)
+        response.headers["Cache-Control"] = cache_control
+        return response
@@ -0,0 +1,88 @@
+import bisect
+import threading
+import time
+
+
+class PrefixIndex:
+    """Case-insensitive, in-memory sorted index answering prefix lookups with a binary search.
+
+    `loader` returns (id, name, avatar) rows; it is called lazily the first time the index is
+    queried after being invalidated, or once `ttl` seconds have passed (this also picks up writes
+    made by other worker processes, which cannot invalidate this process's copy). Writes made in
+    this process are applied one row at a time with `upsert` and `remove` instead.
+    """
+
+    def __init__(self, loader, ttl=60):
+        self._loader = loader
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot = ([], [])  # (sorted casefolded names, matching (id, name, avatar) entries)
+        self._keys = {}  # id -> casefolded name, to find a row's place when it changes
+        self._loaded_at = None
+        self._stale = True
+
+    def invalidate(self):
+        self._stale = True
+
+    def _needs_refresh(self):
+        return self._stale or self._loaded_at is None or time.monotonic() - self._loaded_at >= self._ttl
+
+    def _refresh(self):
+        with self._lock:
+            if not self._needs_refresh():
+                return
+            # Clear the flag first so a write that lands mid-rebuild triggers another one.
+            self._stale = False
+            rows = sorted((name.casefold(), row_id, name, avatar) for row_id, name, avatar in self._loader() if name)
+            self._snapshot = ([row[0] for row in rows], [row[1:] for row in rows])
+            self._keys = {row[1]: row[0] for row in rows}
+            self._loaded_at = time.monotonic()
+
+    @staticmethod
+    def _position(keys, entries, key, row_id):
+        # Rows are ordered by (name, id); names shared by several rows are rare, so scan past them.
+        position = bisect.bisect_left(keys, key)
+        while position < len(keys) and keys[position] == key and entries[position][0] < row_id:
+            position += 1
+        return position
+
+    def _without(self, keys, entries, row_id):
+        key = self._keys.pop(row_id, None)
+        if key is None:
+            return keys, entries
+        position = self._position(keys, entries, key, row_id)
+        return keys[:position] + keys[position + 1:], entries[:position] + entries[position + 1:]
+
+    def upsert(self, row_id, name, avatar=None):
+        """Add row `row_id`, or replace its name and avatar, without reloading the index."""
+        with self._lock:
+            if self._stale or self._loaded_at is None:
+                return  # the next lookup reloads everything anyway
+            keys, entries = self._without(*self._snapshot, row_id)
+            if name:
+                key = name.casefold()
+                position = self._position(keys, entries, key, row_id)
+                keys = keys[:position] + [key] + keys[position:]
+                entries = entries[:position] + [(row_id, name, avatar)] + entries[position:]
+                self._keys[row_id] = key
+            # Lookups read the snapshot without the lock, so it is replaced rather than changed in place.
+            self._snapshot = (keys, entries)
+
+    def remove(self, row_id):
+        """Drop row `row_id` from the index without reloading it."""
+        with self._lock:
+            if self._stale or self._loaded_at is None:
+                return
+            self._snapshot = self._without(*self._snapshot, row_id)
+
+    def lookup(self, prefix, limit):
+        if self._needs_refresh():
+            self._refresh()
+        keys, entries = self._snapshot
+        prefix = prefix.casefold()
+        matches = []
+        position = bisect.bisect_left(keys, prefix)
+        while position < len(keys) and len(matches) < limit and keys[position].startswith(prefix):
+            matches.append(entries[position])
+            position += 1
+        return matches
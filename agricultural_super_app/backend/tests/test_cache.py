@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from flask_jwt_extended import create_access_token
+
+from app import app, db, User, Post, response_cache
+from cache import MemoryBackend, SQLiteBackend
+
+
+class SQLiteBackendTestCase(unittest.TestCase):
+    def test_entries_and_versions_are_shared_between_instances(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.db")
+            first, second = SQLiteBackend(path), SQLiteBackend(path)
+            first.set("k", "v", 60)
+            self.assertEqual(second.get("k"), "v")
+            first.set("expired", "v", -1)
+            self.assertIsNone(second.get("expired"))
+            second.bump_versions(["posts"])
+            self.assertEqual(first.get_versions(["posts", "marketplace"]), [1, 0])
+
+
+class MemoryBackendTestCase(unittest.TestCase):
+    def test_versions_are_forgotten_once_older_entries_have_expired(self):
+        backend = MemoryBackend()
+        with mock.patch("cache.time.monotonic", return_value=1000.0):
+            backend.set("k", "v", 60)
+            backend.bump_versions(["post:1", "post:2"])
+        with mock.patch("cache.time.monotonic", return_value=1030.0):
+            backend.bump_versions(["post:2"])
+        with mock.patch("cache.time.monotonic", return_value=1070.0):
+            backend.bump_versions(["post:3"])
+            self.assertEqual(backend.get_versions(["post:1", "post:2", "post:3"]), [0, 2, 1])
+        with mock.patch("cache.time.monotonic", return_value=1100.0):
+            backend.bump_versions(["post:3"])
+            self.assertEqual(list(backend._versions), ["post:3"])
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        response_cache.reset_stats()
+        with app.app_context():
+            db.create_all()
+            user = User(username="farmer", email="farmer@example.com", password_hash="x")
+            db.session.add(user)
+            db.session.commit()
+            db.session.add(Post(title="Maize", content="Planting season", user_id=user.id))
+            db.session.commit()
+            self.headers = {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}"}
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_second_request_is_a_hit(self):
+        first = self.client.get("/api/posts")
+        second = self.client.get("/api/posts")
+        self.assertEqual(first.headers["X-Cache"], "MISS")
+        self.assertEqual(second.headers["X-Cache"], "HIT")
+        self.assertEqual(first.json, second.json)
+        self.assertEqual(self.client.get("/api/posts?limit=1").headers["X-Cache"], "MISS")
+
+    def test_writes_invalidate_dependent_entries(self):
+        self.client.get("/api/posts")
+        self.client.get("/api/posts/1")
+        self.client.post("/api/posts", json={"title": "Beans", "content": "Spacing"}, headers=self.headers)
+        listing = self.client.get("/api/posts")
+        self.assertEqual(listing.headers["X-Cache"], "MISS")
+        self.assertEqual(len(listing.json), 2)
+        self.assertEqual(self.client.get("/api/posts/1").headers["X-Cache"], "HIT")
+
+        self.client.post("/api/posts/1/like", headers=self.headers)
+        detail = self.client.get("/api/posts/1")
+        self.assertEqual(detail.headers["X-Cache"], "MISS")
+        self.assertEqual(detail.json["likes_count"], 1)
+
+    def test_username_change_invalidates_listings(self):
+        self.client.get("/api/posts")
+        self.client.put("/api/profile", json={"username": "grower"}, headers=self.headers)
+        listing = self.client.get("/api/posts")
+        self.assertEqual(listing.headers["X-Cache"], "MISS")
+        self.assertEqual(listing.json[0]["author_username"], "grower")
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        self.client.get("/api/posts")
+        response = self.client.get("/api/posts", headers=self.headers)
+        self.assertNotIn("X-Cache", response.headers)
+        self.assertFalse(response.json[0]["liked_by_me"])
+
+    def test_stats(self):
+        self.client.get("/api/posts")
+        self.client.get("/api/posts")
+        stats = self.client.get("/api/cache/stats").json
+        self.assertEqual(stats["endpoints"]["get_all_posts"], {"hits": 1, "misses": 1})
+        self.assertEqual(stats["entries"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
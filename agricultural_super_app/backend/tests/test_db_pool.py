@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import NullPool
+
+from app import app
+from db_pool import InstrumentedQueuePool, engine_options, pool_stats
+
+
+class EngineOptionsTestCase(unittest.TestCase):
+    def test_postgres_gets_a_sized_pinged_pool(self):
+        options = engine_options("postgresql://u:p@db/app", pool_size=3, max_overflow=2, pool_recycle=240, query_cache_size=100)
+        self.assertIs(options["poolclass"], InstrumentedQueuePool)
+        self.assertEqual((options["pool_size"], options["max_overflow"], options["pool_recycle"]), (3, 2, 240))
+        self.assertTrue(options["pool_pre_ping"])
+        self.assertEqual(options["query_cache_size"], 100)
+
+    def test_pgbouncer_mode_leaves_pooling_to_pgbouncer(self):
+        options = engine_options("postgresql://u:p@bouncer/app", pgbouncer=True)
+        self.assertIs(options["poolclass"], NullPool)
+        self.assertNotIn("pool_size", options)
+        psycopg3 = engine_options("postgresql+psycopg://u:p@bouncer/app", pgbouncer=True)
+        self.assertEqual(psycopg3["connect_args"], {"prepare_threshold": None})
+
+    def test_in_memory_sqlite_keeps_its_shared_connection(self):
+        self.assertEqual(set(engine_options("sqlite://")), {"query_cache_size"})
+
+
+class PoolStatsTestCase(unittest.TestCase):
+    def test_checkouts_waits_and_timeouts_are_recorded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            url = f"sqlite:///{os.path.join(directory, 'pool.db')}"
+            engine = create_engine(url, **engine_options(url, pool_size=1, max_overflow=0, pool_timeout=0.1))
+            held = engine.connect()
+            held.execute(text("SELECT 1"))
+            stats = pool_stats(engine)
+            self.assertEqual((stats["checked_out"], stats["checked_in"], stats["overflow"]), (1, 0, 0))
+            with self.assertRaises(exc.TimeoutError):
+                engine.connect()
+            held.close()
+            stats = pool_stats(engine)
+            self.assertEqual((stats["checkouts"], stats["timeouts"], stats["checked_out"]), (2, 1, 0))
+            self.assertGreaterEqual(stats["max_wait_ms"], 100)
+            engine.dispose()
+
+    def test_endpoint(self):
+        stats = app.test_client().get("/api/db/pool/stats").json
+        self.assertIn("pool", stats)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import unittest
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+import app as app_module
+from app import app, db, User, Community, CommunityMembership, Follow
+from passwords import PasswordHasher
+
+
+class IdempotentWritesTestCase(unittest.TestCase):
+    """Duplicate submissions are decided by unique constraints in the INSERT itself, not a prior SELECT."""
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.password_hasher = app_module.password_hasher
+        app_module.password_hasher = PasswordHasher(rounds=4)
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            for name in ("farmer", "grower"):
+                db.session.add(User(username=name, email=f"{name}@example.com", password_hash="x"))
+            db.session.commit()
+            self.headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+
+    def tearDown(self):
+        app_module.password_hasher = self.password_hasher
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def statements(self, method, url, **kwargs):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement.split(None, 1)[0].upper())
+
+        with app.app_context():
+            event.listen(db.engine, "before_cursor_execute", record)
+            try:
+                response = getattr(self.client, method)(url, **kwargs)
+            finally:
+                event.remove(db.engine, "before_cursor_execute", record)
+        return response, statements
+
+    def test_register_duplicates(self):
+        body = {"username": "herder", "email": "herder@example.com", "password": "pw"}
+        response, statements = self.statements("post", "/api/register", json=body)
+        self.assertEqual(response.status_code, 201)
+        # An indexed existence check, so duplicates are refused before bcrypt, then the insert.
+        self.assertEqual(statements, ["SELECT", "INSERT"])
+        response, statements = self.statements("post", "/api/register", json=body)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(statements, ["SELECT"])
+        self.assertEqual(self.client.post("/api/register", json={**body, "username": "other"}).status_code, 409)
+        with app.app_context():
+            self.assertEqual(User.query.filter_by(email="herder@example.com").count(), 1)
+        # Users created by the INSERT statement still reach the typeahead index.
+        self.assertEqual(self.client.get("/api/search/suggest?q=her&type=users").json["users"][0]["username"], "herder")
+
+    def test_create_community_duplicates(self):
+        response = self.client.post("/api/communities", json={"name": "Dairy"}, headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json["name"], response.json["member_count"]), ("Dairy", 1))
+        self.assertEqual(self.client.post("/api/communities", json={"name": "Dairy"}, headers=self.headers).status_code, 409)
+
+    def test_join_twice(self):
+        with app.app_context():
+            db.session.add(Community(name="Dairy", owner_id=2))
+            db.session.commit()
+        response, statements = self.statements("post", "/api/communities/1/join", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(statements[0], "INSERT")
+        self.assertEqual(self.client.post("/api/communities/1/join", headers=self.headers).status_code, 409)
+        self.assertEqual(self.client.post("/api/communities/9/join", headers=self.headers).status_code, 404)
+        with app.app_context():
+            self.assertEqual(CommunityMembership.query.count(), 1)
+        self.assertEqual(self.client.post("/api/communities/1/leave", headers=self.headers).status_code, 200)
+        self.assertEqual(self.client.post("/api/communities/1/leave", headers=self.headers).status_code, 409)
+
+    def test_follow_twice_counts_once(self):
+        response, statements = self.statements("post", "/api/users/2/follow", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(statements[0], "INSERT")
+        self.assertEqual(self.client.post("/api/users/2/follow", headers=self.headers).status_code, 409)
+        self.assertEqual(self.client.post("/api/users/9/follow", headers=self.headers).status_code, 404)
+        with app.app_context():
+            self.assertEqual(Follow.query.count(), 1)
+            self.assertEqual(db.session.get(User, 2).followers_count, 1)
+        self.assertEqual(self.client.delete("/api/users/2/unfollow", headers=self.headers).status_code, 200)
+        self.assertEqual(self.client.delete("/api/users/2/unfollow", headers=self.headers).status_code, 409)
+        self.assertEqual(self.client.delete("/api/users/9/unfollow", headers=self.headers).status_code, 404)
+        with app.app_context():
+            self.assertEqual(db.session.get(User, 2).followers_count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
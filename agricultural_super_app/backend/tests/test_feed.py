@@ -0,0 +1,124 @@
+import os
+import unittest
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import app, db, User, Community, CommunityMembership, Follow, TimelineEntry
+
+
+class FeedTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        app.config["FEED_FANOUT_THRESHOLD"] = 1000
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            for name in ("reader", "friend", "stranger", "neighbour"):
+                db.session.add(User(username=name, email=f"{name}@example.com", password_hash="x"))
+            db.session.commit()
+            db.session.add(Community(name="Dairy", owner_id=3))
+            db.session.commit()
+            db.session.add_all([CommunityMembership(user_id=3, community_id=1), CommunityMembership(user_id=1, community_id=1)])
+            db.session.commit()
+            self.headers = {user_id: {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+                            for user_id in (1, 2, 3, 4)}
+        self.client.post("/api/users/2/follow", headers=self.headers[1])
+
+    def tearDown(self):
+        app.config["FEED_FANOUT_THRESHOLD"] = 1000
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def post(self, author_id, title, community_id=None):
+        response = self.client.post("/api/posts", json={"title": title, "content": "...", "community_id": community_id},
+                                    headers=self.headers[author_id])
+        self.assertEqual(response.status_code, 201)
+
+    def feed(self, user_id=1, **params):
+        return self.client.get("/api/feed", query_string=params, headers=self.headers[user_id])
+
+    def test_feed_contains_follows_memberships_and_own_posts(self):
+        self.post(2, "From a friend")
+        self.post(4, "From a stranger")
+        self.post(3, "In the community", community_id=1)
+        self.post(1, "My own")
+        response = self.feed()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p["title"] for p in response.json], ["My own", "In the community", "From a friend"])
+        self.assertEqual(self.client.get("/api/feed").status_code, 401)
+
+    def test_follow_and_unfollow_update_timeline(self):
+        self.post(4, "Older stranger post")
+        self.client.post("/api/users/4/follow", headers=self.headers[1])
+        self.assertEqual([p["title"] for p in self.feed().json], ["Older stranger post"])
+        self.client.delete("/api/users/4/unfollow", headers=self.headers[1])
+        self.assertEqual(self.feed().json, [])
+
+    def test_popular_authors_are_merged_on_read(self):
+        app.config["FEED_FANOUT_THRESHOLD"] = 1
+        self.post(2, "Popular one")
+        self.post(4, "Stranger")
+        self.post(2, "Popular two")
+        with app.app_context():
+            self.assertEqual(TimelineEntry.query.filter_by(user_id=1).count(), 0)
+        self.assertEqual([p["title"] for p in self.feed().json], ["Popular two", "Popular one"])
+
+    def test_pagination_across_sources(self):
+        app.config["FEED_FANOUT_THRESHOLD"] = 1
+        self.post(2, "a")
+        self.post(1, "b")
+        self.post(2, "c")
+        self.post(1, "d")
+        first = self.feed(limit=3)
+        self.assertEqual([p["title"] for p in first.json], ["d", "c", "b"])
+        second = self.feed(limit=3, cursor=first.headers["X-Next-Cursor"])
+        self.assertEqual([p["title"] for p in second.json], ["a"])
+        self.assertNotIn("X-Next-Cursor", second.headers)
+
+    def test_posts_reachable_another_way_stay(self):
+        self.post(2, "Friend in the community", community_id=1)
+        self.post(3, "Neighbour in the community", community_id=1)
+        self.post(2, "Friend elsewhere")
+        self.client.post("/api/communities/1/leave", headers=self.headers[1])
+        self.assertEqual([p["title"] for p in self.feed().json], ["Friend elsewhere", "Friend in the community"])
+        self.client.post("/api/communities/1/join", headers=self.headers[1])
+        self.client.delete("/api/users/2/unfollow", headers=self.headers[1])
+        self.assertEqual([p["title"] for p in self.feed().json], ["Neighbour in the community", "Friend in the community"])
+
+    def test_follow_does_not_scan_memberships(self):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with app.app_context():
+            event.listen(db.engine, "before_cursor_execute", record)
+            try:
+                self.client.post("/api/users/4/follow", headers=self.headers[1])
+                self.client.post("/api/communities/1/leave", headers=self.headers[1])
+            finally:
+                event.remove(db.engine, "before_cursor_execute", record)
+        # Only the timeline rows of the followed author / left community are touched, never the whole timeline.
+        self.assertFalse([s for s in statements if "GROUP BY" in s and "community_id IN" not in s.replace("\n", " ")])
+        self.assertFalse([s for s in statements if s.lstrip().startswith("DELETE FROM timeline_entries")
+                          and "post_id IN" not in s.replace("\n", " ")])
+
+    def test_rebuild_command(self):
+        self.post(2, "Friend post")
+        with app.app_context():
+            # A follow written behind the API's back, plus a lost timeline.
+            db.session.add(Follow(follower_id=1, followed_id=4, followed_type="user"))
+            TimelineEntry.query.filter_by(user_id=1).delete()
+            db.session.commit()
+        self.post(4, "Stranger post")
+        result = app.test_cli_runner().invoke(args=["rebuild-feeds", "--user-id", "1"])
+        self.assertIn("Rebuilt 1 timeline(s)", result.output)
+        self.assertEqual([p["title"] for p in self.feed().json], ["Stranger post", "Friend post"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import os
+import unittest
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import app, db, User, Follow, Community, CommunityMembership
+
+
+class FollowCountersTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            for name in ("alice", "bob", "carol"):
+                db.session.add(User(username=name, email=f"{name}@example.com", password_hash="x"))
+            db.session.commit()
+            self.headers = {user_id: {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+                            for user_id in (1, 2, 3)}
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def counts(self, user_id):
+        user = self.client.get(f"/api/users/{user_id}").json
+        return user["followers_count"], user["following_users_count"], user["following_communities_count"]
+
+    def test_follow_and_unfollow_update_counters(self):
+        self.client.post("/api/users/1/follow", headers=self.headers[2])
+        self.client.post("/api/users/1/follow", headers=self.headers[3])
+        self.assertEqual(self.client.post("/api/users/1/follow", headers=self.headers[3]).status_code, 409)
+        self.assertEqual(self.counts(1), (2, 0, 0))
+        self.assertEqual(self.counts(2), (0, 1, 0))
+
+        self.client.delete("/api/users/1/unfollow", headers=self.headers[3])
+        self.assertEqual(self.client.delete("/api/users/1/unfollow", headers=self.headers[3]).status_code, 409)
+        self.assertEqual(self.counts(1), (1, 0, 0))
+        self.assertEqual(self.counts(3), (0, 0, 0))
+
+    def test_profile_view_does_not_count_follows(self):
+        self.client.post("/api/users/1/follow", headers=self.headers[2])
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            response = self.client.get("/api/users/1", headers=self.headers[2])
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        self.assertTrue(response.json["is_followed_by_current_user"])
+        self.assertEqual(len(statements), 2)  # the user, and whether the viewer follows them
+        self.assertFalse(any("count(" in statement.lower() for statement in statements))
+
+    def test_reconcile_command_repairs_drift(self):
+        with app.app_context():
+            db.session.add(Follow(follower_id=2, followed_id=1, followed_type="user"))
+            db.session.get(User, 3).followers_count = 7
+            db.session.commit()
+        result = app.test_cli_runner().invoke(args=["reconcile-follow-counts"])
+        self.assertIn("Repaired follow counts for 3 user(s)", result.output)
+        self.assertEqual(self.counts(1), (1, 0, 0))
+        self.assertEqual(self.counts(2), (0, 1, 0))
+        self.assertEqual(self.counts(3), (0, 0, 0))
+
+
+class RelationshipsTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            for name in ("alice", "bob", "carol", "dave"):
+                db.session.add(User(username=name, email=f"{name}@example.com", password_hash="x"))
+            db.session.commit()
+            db.session.add_all([Community(name="Dairy", owner_id=2), Community(name="Poultry", owner_id=2)])
+            db.session.add_all([
+                Follow(follower_id=1, followed_id=2, followed_type="user"),
+                Follow(follower_id=3, followed_id=1, followed_type="user"),
+                Follow(follower_id=1, followed_id=4, followed_type="user"),
+                Follow(follower_id=4, followed_id=1, followed_type="user"),
+            ])
+            db.session.commit()
+            db.session.add(CommunityMembership(user_id=1, community_id=2))
+            db.session.commit()
+            self.headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_batch_status_in_one_query(self):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            response = self.client.post("/api/relationships", json={"user_ids": [2, 3, 4, 99], "community_ids": [1, 2]},
+                                        headers=self.headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(response.json["users"], {
+            "2": {"following": True, "followed_by": False},
+            "3": {"following": False, "followed_by": True},
+            "4": {"following": True, "followed_by": True},
+            "99": {"following": False, "followed_by": False},
+        })
+        self.assertEqual(response.json["communities"], {
+            "1": {"member": False, "following": False},
+            "2": {"member": True, "following": False},
+        })
+
+    def test_invalid_requests(self):
+        post = lambda body: self.client.post("/api/relationships", json=body, headers=self.headers)
+        self.assertEqual(post({"user_ids": ["2"]}).status_code, 400)
+        self.assertEqual(post({"community_ids": 3}).status_code, 400)
+        self.assertEqual(post({"user_ids": list(range(app.config["RELATIONSHIPS_MAX_IDS"] + 1))}).status_code, 400)
+        self.assertEqual(post({}).json, {"users": {}, "communities": {}})
+        self.assertEqual(self.client.post("/api/relationships", json={}).status_code, 401)
+
+
+if __name__ == "__main__":
+    unittest.main()
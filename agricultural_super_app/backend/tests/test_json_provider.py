@@ -0,0 +1,91 @@
+import json
+import os
+import unittest
+from dataclasses import dataclass
+from datetime import datetime
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import json_provider
+from app import app, db, User, Follow, Community, CommunityMembership
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+class OrjsonProviderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.orjson = json_provider.orjson
+
+    def tearDown(self):
+        json_provider.orjson = self.orjson
+
+    def encode(self, value):
+        with app.app_context():
+            return app.json.dumps(value)
+
+    def test_matches_the_stdlib_encoder(self):
+        value = {"b": [1, 2.5, None, True], "a": "été", "when": datetime(2026, 10, 18, 9, 30, 0, 123456),
+                 "point": Point(1, 2)}
+        fast = json.loads(self.encode(value))
+        json_provider.orjson = None
+        self.assertEqual(fast, json.loads(self.encode(value)))
+        self.assertEqual(fast["when"], "2026-10-18T09:30:00.123456")
+        self.assertEqual(fast["point"], {"x": 1, "y": 2})
+
+    def test_int_keys(self):
+        self.assertEqual(json.loads(self.encode({2: "b", 1: "a"})), {"1": "a", "2": "b"})
+
+    def test_values_orjson_refuses_fall_back(self):
+        self.assertEqual(json.loads(self.encode({"big": 2 ** 70})), {"big": 2 ** 70})
+
+
+class StreamedListTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.batch_size = app.config["JSON_STREAM_BATCH_SIZE"]
+        app.config["JSON_STREAM_BATCH_SIZE"] = 2
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([User(username=f"user{i}", email=f"user{i}@example.com", password_hash="x") for i in range(1, 7)])
+            db.session.commit()
+            db.session.add_all([Follow(follower_id=i, followed_id=1) for i in range(2, 7)])
+            db.session.add(Follow(follower_id=1, followed_id=2))
+            db.session.add_all([Community(name=f"Community {i}", description="...", owner_id=2) for i in range(3)])
+            db.session.commit()
+            db.session.add_all([CommunityMembership(user_id=1, community_id=i) for i in (1, 3)])
+            db.session.commit()
+
+    def tearDown(self):
+        app.config["JSON_STREAM_BATCH_SIZE"] = self.batch_size
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def get_streamed(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        chunks = list(response.response)
+        response.close()
+        return chunks, json.loads(b"".join(chunk if isinstance(chunk, bytes) else chunk.encode() for chunk in chunks))
+
+    def test_followers_are_written_in_batches(self):
+        chunks, followers = self.get_streamed("/api/users/1/followers")
+        self.assertEqual(sorted(f["username"] for f in followers), [f"user{i}" for i in range(2, 7)])
+        self.assertEqual(set(followers[0]), {"id", "username"})
+        self.assertEqual(len(chunks), 5)  # "[", three batches of at most two, "]"
+
+    def test_following_and_an_empty_list(self):
+        self.assertEqual(self.get_streamed("/api/users/1/following")[1], [{"id": 2, "username": "user2"}])
+        self.assertEqual(self.get_streamed("/api/users/2/joined_communities")[1], [])
+        self.assertEqual(self.client.get("/api/users/99/followers").status_code, 404)
+
+    def test_joined_communities(self):
+        communities = self.get_streamed("/api/users/1/joined_communities")[1]
+        self.assertEqual(sorted(c["name"] for c in communities), ["Community 0", "Community 2"])
+        self.assertEqual(set(communities[0]), {"id", "name", "description", "owner_id"})
@@ -0,0 +1,89 @@
+import os
+import unittest
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from datetime import timedelta
+
+from flask_jwt_extended import create_access_token
+
+from app import app, db, User, Post, Comment, PostLike
+
+
+class LikesTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            user = User(username="farmer", email="farmer@example.com")
+            user.set_password("password")
+            db.session.add(user)
+            db.session.commit()
+            post = Post(title="Maize yields", content="Notes", user_id=user.id)
+            db.session.add(post)
+            db.session.commit()
+            comment = Comment(post_id=post.id, user_id=user.id, text="Great notes")
+            db.session.add(comment)
+            db.session.commit()
+            self.post_id, self.comment_id = post.id, comment.id
+
+        login = self.client.post("/api/login", json={"username": "farmer", "password": "password"})
+        self.headers = {"Authorization": f"Bearer {login.json['access_token']}"}
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_like_and_unlike_post(self):
+        response = self.client.post(f"/api/posts/{self.post_id}/like", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["likes_count"], 1)
+
+        response = self.client.post(f"/api/posts/{self.post_id}/like", headers=self.headers)
+        self.assertEqual(response.status_code, 409)
+
+        response = self.client.get(f"/api/posts/{self.post_id}", headers=self.headers)
+        self.assertEqual(response.json["likes_count"], 1)
+        self.assertTrue(response.json["liked_by_me"])
+        self.assertNotIn("likes", response.json)
+
+        response = self.client.get(f"/api/posts/{self.post_id}")
+        self.assertFalse(response.json["liked_by_me"])
+
+        response = self.client.delete(f"/api/posts/{self.post_id}/like", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["likes_count"], 0)
+
+        response = self.client.delete(f"/api/posts/{self.post_id}/like", headers=self.headers)
+        self.assertEqual(response.status_code, 409)
+        with app.app_context():
+            self.assertEqual(PostLike.query.count(), 0)
+
+    def test_like_comment(self):
+        response = self.client.post(f"/api/comments/{self.comment_id}/like", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["likes_count"], 1)
+
+        response = self.client.get(f"/api/posts/{self.post_id}/comments", headers=self.headers)
+        self.assertEqual(response.json[0]["likes_count"], 1)
+        self.assertTrue(response.json[0]["liked_by_me"])
+
+
+    def test_public_reads_ignore_stale_tokens(self):
+        self.client.post(f"/api/posts/{self.post_id}/like", headers=self.headers)
+        with app.app_context():
+            expired = create_access_token(identity="1", expires_delta=timedelta(seconds=-1))
+        for authorization in (f"Bearer {expired}", "Bearer not-a-token"):
+            headers = {"Authorization": authorization}
+            for url in ("/api/posts", f"/api/posts/{self.post_id}", f"/api/posts/{self.post_id}/comments",
+                        f"/api/comments/{self.comment_id}/replies", "/api/users/1/posts", "/api/search/posts?q=maize"):
+                with self.subTest(url=url, authorization=authorization[:12]):
+                    self.assertEqual(self.client.get(url, headers=headers).status_code, 200)
+            # Served anonymously: the like above is not attributed to the stale token's user.
+            self.assertFalse(self.client.get(f"/api/posts/{self.post_id}", headers=headers).json["liked_by_me"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,226 @@
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from flask_jwt_extended import create_access_token
+from PIL import Image
+
+import app as app_module
+from app import app, db, User
+from media import InvalidImageError, ResizeCache, generate_variants, schedule_variants, store_image, variant_filename
+
+
+def jpeg_bytes(size=(2000, 1000), color="green", exif=None):
+    buffer = io.BytesIO()
+    image = Image.new("RGB", size, color)
+    if exif is not None:
+        image.save(buffer, "JPEG", exif=exif)
+    else:
+        image.save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class MediaTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.folder = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_identical_bytes_are_stored_once(self):
+        data = jpeg_bytes()
+        first = store_image(io.BytesIO(data), self.folder)
+        second = store_image(io.BytesIO(data), self.folder)
+        other = store_image(io.BytesIO(jpeg_bytes(color="red")), self.folder)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertRegex(first, r"^[0-9a-f]{64}\.jpg$")
+        self.assertEqual(sorted(os.listdir(self.folder)), sorted([first, other]))
+
+    def test_non_images_are_rejected(self):
+        with self.assertRaises(InvalidImageError):
+            store_image(io.BytesIO(b"not an image"), self.folder)
+        self.assertEqual(os.listdir(self.folder), [])
+
+    def test_variants_are_resized_and_stripped(self):
+        exif = Image.Exif()
+        exif[0x010F] = "FarmCam"  # Make
+        filename = store_image(io.BytesIO(jpeg_bytes(exif=exif.tobytes())), self.folder)
+        self.assertEqual(len(generate_variants(self.folder, filename)), 3)
+        self.assertEqual(generate_variants(self.folder, filename), [])
+        with Image.open(os.path.join(self.folder, variant_filename(filename, "small"))) as small:
+            self.assertEqual(small.size, (160, 80))
+            self.assertNotIn(0x010F, small.getexif())
+        with Image.open(os.path.join(self.folder, variant_filename(filename, "large"))) as large:
+            self.assertEqual(large.size, (1280, 640))
+
+    def test_variants_are_generated_in_a_worker_process(self):
+        filename = store_image(io.BytesIO(jpeg_bytes()), self.folder)
+        future = schedule_variants(self.folder, filename, workers=1)
+        self.assertEqual(len(future.result(timeout=60)), 3)
+        self.assertTrue(os.path.exists(os.path.join(self.folder, variant_filename(filename, "medium"))))
+
+
+class ResizeCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.temp_dir.name, "photo.jpg")
+        with open(self.source, "wb") as f:
+            f.write(jpeg_bytes(size=(1000, 500)))
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_resizes_once_and_reuses_the_file(self):
+        cache = ResizeCache(self.cache_dir, max_bytes=10 * 1024 * 1024)
+        path = cache.get(self.source, 320, "WEBP")
+        self.assertEqual(cache.get(self.source, 320, "WEBP"), path)
+        self.assertEqual(cache.resizes, 1)
+        with Image.open(path) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (320, 160)))
+
+    def test_concurrent_requests_share_one_resize(self):
+        cache = ResizeCache(self.cache_dir, max_bytes=10 * 1024 * 1024)
+        paths = []
+        threads = [threading.Thread(target=lambda: paths.append(cache.get(self.source, 640, "JPEG"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(paths)), 1)
+        self.assertEqual(cache.resizes, 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ResizeCache(self.cache_dir, max_bytes=10 * 1024 * 1024)
+        first = cache.get(self.source, 80, "PNG")
+        second = cache.get(self.source, 160, "PNG")
+        past = time.time() - 60
+        os.utime(first, (past, past))
+        os.utime(second, (past - 60, past - 60))
+        cache.get(self.source, 80, "PNG")  # a hit makes `first` more recent than `second`
+
+        # Leave room for `first` and the new entry, but not for `second` as well.
+        third_size = os.path.getsize(ResizeCache(os.path.join(self.temp_dir.name, "other"), 10 ** 9).get(self.source, 320, "PNG"))
+        cache.max_bytes = int((os.path.getsize(first) + third_size) / 0.9) + 1
+        third = cache.get(self.source, 320, "PNG")
+        self.assertTrue(os.path.exists(third))
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+
+
+class UploadRoutesTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.upload_folder, app.config["UPLOAD_FOLDER"] = app.config["UPLOAD_FOLDER"], self.temp_dir.name
+        self.workers, app.config["IMAGE_WORKERS"] = app.config["IMAGE_WORKERS"], 0
+        self.sendfile = app.config["MEDIA_SENDFILE"]
+        self.resize_cache = app_module.resize_cache
+        app_module.resize_cache = ResizeCache(os.path.join(self.temp_dir.name, "cache"), 10 * 1024 * 1024)
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(username="farmer", email="farmer@example.com", password_hash="x"))
+            db.session.commit()
+            self.headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+
+    def tearDown(self):
+        app.config["UPLOAD_FOLDER"], app.config["IMAGE_WORKERS"] = self.upload_folder, self.workers
+        app.config["MEDIA_SENDFILE"] = self.sendfile
+        app_module.resize_cache = self.resize_cache
+        self.temp_dir.cleanup()
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def create_post(self, data, name="IMG_0001.jpg"):
+        return self.client.post("/api/posts", headers=self.headers, content_type="multipart/form-data",
+                                data={"title": "Harvest", "content": "Photos", "image": (io.BytesIO(data), name)})
+
+    def test_same_client_filename_does_not_overwrite(self):
+        first = self.create_post(jpeg_bytes(color="green")).json
+        second = self.create_post(jpeg_bytes(color="yellow")).json
+        self.assertNotEqual(first["image_url"], second["image_url"])
+        self.assertEqual(set(first["image_variants"]), {"small", "medium", "large"})
+        small = self.client.get(first["image_variants"]["small"])
+        with Image.open(io.BytesIO(small.data)) as image:
+            self.assertEqual(image.size, (160, 80))
+        small.close()
+
+    def test_missing_variant_falls_back_to_original(self):
+        post = self.create_post(jpeg_bytes()).json
+        os.remove(os.path.join(self.temp_dir.name, post["image_variants"]["medium"].rsplit("/", 1)[1]))
+        response = self.client.get(post["image_variants"]["medium"])
+        self.assertEqual(response.status_code, 200)
+        with Image.open(io.BytesIO(response.data)) as image:
+            self.assertEqual(image.size, (2000, 1000))
+        response.close()
+
+    def test_resize_on_demand_negotiates_webp(self):
+        url = self.create_post(jpeg_bytes()).json["image_url"]
+        webp = self.client.get(f"{url}?w=300", headers={"Accept": "image/avif,image/webp,*/*"})
+        self.assertEqual(webp.mimetype, "image/webp")
+        self.assertIn("Accept", webp.vary)
+        self.assertTrue(webp.cache_control.immutable)
+        with Image.open(io.BytesIO(webp.data)) as image:
+            self.assertEqual(image.size, (320, 160))  # rounded up to a configured width
+        webp.close()
+
+        jpeg = self.client.get(f"{url}?w=300", headers={"Accept": "*/*"})
+        self.assertEqual(jpeg.mimetype, "image/jpeg")
+        jpeg.close()
+        png = self.client.get(f"{url}?w=80&fmt=png", headers={"Accept": "image/webp"})
+        self.assertEqual(png.mimetype, "image/png")
+        png.close()
+
+    def test_resize_rejects_bad_arguments(self):
+        url = self.create_post(jpeg_bytes()).json["image_url"]
+        self.assertEqual(self.client.get(f"{url}?w=abc").status_code, 400)
+        self.assertEqual(self.client.get(f"{url}?fmt=tiff").status_code, 400)
+        self.assertEqual(self.client.get("/uploads/missing.jpg?w=80").status_code, 404)
+
+    def test_conditional_and_range_requests(self):
+        data = jpeg_bytes()
+        url = self.create_post(data).json["image_url"]
+        full = self.client.get(url)
+        self.assertEqual(full.headers["Accept-Ranges"], "bytes")
+        full.close()
+
+        partial = self.client.get(url, headers={"Range": "bytes=100-199"})
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial.headers["Content-Range"], f"bytes 100-199/{len(data)}")
+        self.assertEqual(partial.data, data[100:200])
+        partial.close()
+
+        self.assertEqual(self.client.get(url, headers={"If-None-Match": full.headers["ETag"]}).status_code, 304)
+        self.assertEqual(self.client.get(url, headers={"If-Modified-Since": full.headers["Last-Modified"]}).status_code, 304)
+
+    def test_transfer_can_be_handed_to_the_proxy(self):
+        url = self.create_post(jpeg_bytes()).json["image_url"]
+        app.config["MEDIA_SENDFILE"] = "x-accel-redirect"
+        response = self.client.get(url)
+        self.assertEqual(response.headers["X-Accel-Redirect"], "/_media/uploads/" + url.rsplit("/", 1)[1])
+        self.assertEqual((response.mimetype, response.data), ("image/jpeg", b""))
+        resized = self.client.get(f"{url}?w=80", headers={"Accept": "image/webp"})
+        self.assertTrue(resized.headers["X-Accel-Redirect"].startswith("/_media/image_cache/"))
+        self.assertEqual(resized.mimetype, "image/webp")
+        self.assertEqual(self.client.get("/uploads/missing.jpg").status_code, 404)
+
+        app.config["MEDIA_SENDFILE"] = "x-sendfile"
+        response = self.client.get(url)
+        self.assertEqual(response.headers["X-Sendfile"], os.path.join(self.temp_dir.name, url.rsplit("/", 1)[1]))
+        self.assertEqual(response.data, b"")
+
+    def test_invalid_image_is_rejected(self):
+        self.assertEqual(self.create_post(b"GIF89a but not really", name="fake.gif").status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import json
+import os
+import threading
+import unittest
+from unittest import mock
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import app as app_module
+from app import app, db, User, Message, Community, chat_broker
+from pubsub import InMemoryBroker
+
+
+class DirectMessagesTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            for name in ("amina", "baraka", "chebet"):
+                user = User(username=name, email=f"{name}@example.com")
+                user.set_password("password")
+                db.session.add(user)
+            db.session.commit()
+            self.amina, self.baraka, self.chebet = [u.id for u in User.query.order_by(User.id)]
+            for i in range(5):
+                sender, receiver = (self.baraka, self.amina) if i % 2 else (self.amina, self.baraka)
+                db.session.add(Message(sender_id=sender, receiver_id=receiver, text=f"dm {i}"))
+            # A message between two other users must never leak into the conversation.
+            db.session.add(Message(sender_id=self.chebet, receiver_id=self.baraka, text="other"))
+            db.session.commit()
+        login = self.client.post("/api/login", json={"username": "amina", "password": "password"})
+        self.headers = {"Authorization": f"Bearer {login.json['access_token']}"}
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_history_pages_backwards_in_chronological_order(self):
+        response = self.client.get(f"/api/messages/direct/{self.baraka}?limit=3", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m["text"] for m in response.json], ["dm 2", "dm 3", "dm 4"])
+
+        cursor = response.headers["X-Next-Cursor"]
+        response = self.client.get(f"/api/messages/direct/{self.baraka}?limit=3&cursor={cursor}", headers=self.headers)
+        self.assertEqual([m["text"] for m in response.json], ["dm 0", "dm 1"])
+        self.assertNotIn("X-Next-Cursor", response.headers)
+
+    def test_opening_conversation_marks_received_messages_read(self):
+        response = self.client.get(f"/api/messages/direct/{self.baraka}", headers=self.headers)
+        received = [m for m in response.json if m["receiver_id"] == self.amina]
+        self.assertTrue(received and all(m["is_read"] for m in received))
+        with app.app_context():
+            self.assertFalse(Message.query.filter_by(sender_id=self.amina).first().is_read)
+            self.assertFalse(Message.query.filter_by(sender_id=self.chebet).first().is_read)
+
+
+class InMemoryBrokerTestCase(unittest.TestCase):
+    def test_publish_reaches_only_topic_subscribers(self):
+        broker = InMemoryBroker()
+        first, second, other = broker.subscribe("a"), broker.subscribe("a"), broker.subscribe("b")
+        broker.publish("a", {"id": 1})
+        self.assertEqual(first.get(timeout=0), {"id": 1})
+        self.assertEqual(second.get(timeout=0), {"id": 1})
+        self.assertIsNone(other.get(timeout=0))
+        first.close()
+        second.close()
+        other.close()
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    def test_slow_subscriber_drops_instead_of_blocking(self):
+        broker = InMemoryBroker(max_pending=1)
+        subscription = broker.subscribe("a")
+        broker.publish("a", {"id": 1})
+        broker.publish("a", {"id": 2})
+        self.assertEqual(subscription.get(timeout=0), {"id": 1})
+        self.assertIsNone(subscription.get(timeout=0))
+
+
+class MessageStreamTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        app.config["CHAT_STREAM_HEARTBEAT"] = 1
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            for name in ("amina", "baraka"):
+                user = User(username=name, email=f"{name}@example.com")
+                user.set_password("password")
+                db.session.add(user)
+            db.session.commit()
+            self.amina, self.baraka = [u.id for u in User.query.order_by(User.id)]
+            community = Community(name="Dairy", owner_id=self.amina)
+            db.session.add(community)
+            db.session.commit()
+            self.community_id = community.id
+        self.tokens = {}
+        for name in ("amina", "baraka"):
+            login = self.client.post("/api/login", json={"username": name, "password": "password"})
+            self.tokens[name] = login.json["access_token"]
+
+    def tearDown(self):
+        app.config["CHAT_STREAM_HEARTBEAT"] = 15
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_stream_receives_new_direct_message(self):
+        response = self.client.get(f"/api/messages/stream?direct={self.amina}&jwt={self.tokens['baraka']}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/event-stream")
+        events = iter(response.response)
+        self.assertEqual(next(events), b": connected\n\n")
+
+        self.client.post("/api/messages", json={"receiver_id": self.baraka, "text": "Maize is ready"},
+                         headers={"Authorization": f"Bearer {self.tokens['amina']}"})
+        event_id, data = next(events).decode().strip().split("\n")
+        message = json.loads(data[len("data: "):])
+        self.assertEqual(event_id, f"id: {message['id']}")
+        self.assertEqual(message["text"], "Maize is ready")
+        response.close()
+        self.assertEqual(chat_broker.subscriber_count(), 0)
+
+    def test_stream_requires_exactly_one_target(self):
+        response = self.client.get(f"/api/messages/stream?jwt={self.tokens['amina']}")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            f"/api/messages/stream?direct={self.baraka}&community={self.community_id}&jwt={self.tokens['amina']}"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_stream_limit_per_worker(self):
+        slots = app_module.chat_stream_slots
+        app_module.chat_stream_slots = threading.BoundedSemaphore(1)
+        try:
+            first = self.client.get(f"/api/messages/stream?direct={self.amina}&jwt={self.tokens['baraka']}")
+            self.assertEqual(first.status_code, 200)
+            second = self.client.get(f"/api/messages/stream?direct={self.baraka}&jwt={self.tokens['amina']}")
+            self.assertEqual(second.status_code, 503)
+            self.assertEqual(second.headers["Retry-After"], "5")
+            first.close()
+            third = self.client.get(f"/api/messages/stream?direct={self.baraka}&jwt={self.tokens['amina']}")
+            self.assertEqual(third.status_code, 200)
+            third.close()
+        finally:
+            app_module.chat_stream_slots = slots
+
+    def test_failed_subscription_releases_its_slot(self):
+        slots = app_module.chat_stream_slots
+        app_module.chat_stream_slots = threading.BoundedSemaphore(1)
+        try:
+            with mock.patch.object(chat_broker, "subscribe", side_effect=ConnectionError("broker down")):
+                with self.assertRaises(ConnectionError):
+                    self.client.get(f"/api/messages/stream?direct={self.amina}&jwt={self.tokens['baraka']}")
+            self.assertTrue(app_module.chat_stream_slots.acquire(blocking=False))
+        finally:
+            app_module.chat_stream_slots = slots
+
+    def test_query_string_token_only_accepted_by_the_stream(self):
+        self.assertEqual(self.client.get(f"/api/profile?jwt={self.tokens['amina']}").status_code, 401)
+        self.assertEqual(self.client.get("/api/profile", headers={"Authorization": f"Bearer {self.tokens['amina']}"}).status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from prometheus_client import REGISTRY
+
+from app import app, db, metrics, password_hasher
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.token = app.config["METRICS_TOKEN"]
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        app.config["METRICS_TOKEN"] = self.token
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_requests_are_counted_by_endpoint(self):
+        labels = {"endpoint": "get_all_posts", "method": "GET"}
+        before = sample("http_requests_total", status="200", **labels)
+        observed = sample("http_request_duration_seconds_count", **labels)
+        self.client.get("/api/posts?page=1")
+        self.client.get("/api/posts?page=2")
+        self.assertEqual(sample("http_requests_total", status="200", **labels), before + 2)
+        self.assertEqual(sample("http_request_duration_seconds_count", **labels), observed + 2)
+        self.assertGreater(sample("http_response_size_bytes_sum", endpoint="get_all_posts"), 0)
+
+    def test_response_cache_lookups(self):
+        hits = sample("response_cache_lookups_total", endpoint="get_all_communities", result="hit")
+        misses = sample("response_cache_lookups_total", endpoint="get_all_communities", result="miss")
+        self.client.get("/api/communities?metrics=1")
+        self.client.get("/api/communities?metrics=1")
+        self.assertEqual(sample("response_cache_lookups_total", endpoint="get_all_communities", result="miss"), misses + 1)
+        self.assertEqual(sample("response_cache_lookups_total", endpoint="get_all_communities", result="hit"), hits + 1)
+
+    def test_password_hasher_totals_become_counter_increments(self):
+        rounds = password_hasher.rounds
+        password_hasher.rounds = 4
+        try:
+            with app.app_context():
+                metrics.refresh()
+                completed = sample("password_hasher_completed_total")
+                password_hasher.hash("secret")
+                password_hasher.hash("secret")
+                metrics.refresh()
+                metrics.refresh()
+        finally:
+            password_hasher.rounds = rounds
+        self.assertEqual(sample("password_hasher_completed_total"), completed + 2)
+        self.assertEqual(sample("password_hasher_tasks", state="queued"), 0)
+
+    def test_exposition(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        self.assertIn(b"# TYPE http_requests_total counter", response.data)
+        self.assertIn(b"password_hasher_tasks", response.data)
+
+    def test_token(self):
+        app.config["METRICS_TOKEN"] = "scrape-me"
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", headers={"Authorization": "Bearer scrape-me"}).status_code, 200)
+
+    def test_token_guards_internal_stats(self):
+        app.config["METRICS_TOKEN"] = "scrape-me"
+        for url in ("/api/cache/stats", "/api/db/pool/stats", "/api/auth/hasher/stats"):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 401)
+                self.assertEqual(self.client.get(url, headers={"Authorization": "Bearer scrape-me"}).status_code, 200)
+
+
+class MultiprocessMetricsTestCase(unittest.TestCase):
+    """Each subprocess stands in for a gunicorn worker sharing one PROMETHEUS_MULTIPROC_DIR."""
+
+    def run_worker(self, directory, code):
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directory, DATABASE_URL="sqlite://", METRICS_REFRESH_SECONDS="0")
+        script = "from app import app, db\nwith app.app_context():\n    db.create_all()\nclient = app.test_client()\n"
+        result = subprocess.run([sys.executable, "-c", script + textwrap.dedent(code)], cwd=BACKEND_DIR, env=env,
+                                capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout
+
+    def test_scrape_sums_every_worker(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.run_worker(directory, "for _ in range(3): client.get('/api/posts')")
+            self.run_worker(directory, "for _ in range(2): client.get('/api/posts')")
+            exposition = self.run_worker(directory, "print(client.get('/metrics').get_data(as_text=True))")
+        self.assertIn('http_requests_total{endpoint="get_all_posts",method="GET",status="200"} 5.0', exposition)
@@ -0,0 +1,67 @@
+import os
+import unittest
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from datetime import datetime
+
+from app import app, db, User, Post
+from pagination import encode_cursor
+
+
+class PaginationTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            user = User(username="farmer", email="farmer@example.com")
+            user.set_password("password")
+            db.session.add(user)
+            db.session.commit()
+            for i in range(5):
+                db.session.add(Post(title=f"Post {i}", content="Harvest notes", user_id=user.id))
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_posts_are_paged_newest_first(self):
+        response = self.client.get("/api/posts?limit=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p["title"] for p in response.json], ["Post 4", "Post 3"])
+        cursor = response.headers["X-Next-Cursor"]
+
+        response = self.client.get(f"/api/posts?limit=2&cursor={cursor}")
+        self.assertEqual([p["title"] for p in response.json], ["Post 2", "Post 1"])
+        cursor = response.headers["X-Next-Cursor"]
+
+        response = self.client.get(f"/api/posts?limit=2&cursor={cursor}")
+        self.assertEqual([p["title"] for p in response.json], ["Post 0"])
+        self.assertNotIn("X-Next-Cursor", response.headers)
+
+    def test_limit_is_clamped_to_maximum(self):
+        app.config["PAGINATION_MAX_LIMIT"] = 3
+        try:
+            response = self.client.get("/api/posts?limit=1000")
+            self.assertEqual(len(response.json), 3)
+        finally:
+            app.config["PAGINATION_MAX_LIMIT"] = 100
+
+    def test_invalid_cursor_and_limit(self):
+        self.assertEqual(self.client.get("/api/posts?cursor=not-a-cursor").status_code, 400)
+        self.assertEqual(self.client.get("/api/posts?limit=0").status_code, 400)
+        self.assertEqual(self.client.get("/api/users?limit=abc").status_code, 400)
+
+    def test_tampered_cursor_values_are_rejected(self):
+        now = datetime(2026, 10, 18, 9, 30)
+        for values in ([now, "1 OR 1=1"], [now, {"id": 1}], [now, True], [now, 1.5], ["yesterday", 1]):
+            with self.subTest(values=values):
+                self.assertEqual(self.client.get(f"/api/posts?cursor={encode_cursor(values)}").status_code, 400)
+        self.assertEqual(self.client.get(f"/api/posts?cursor={encode_cursor([now, 3])}").status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import threading
+import unittest
+import unittest.mock
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import bcrypt
+
+import app as app_module
+from app import app, db, User
+from passwords import HasherBusy, PasswordHasher, hash_rounds
+
+
+class PasswordHasherTestCase(unittest.TestCase):
+    def test_hash_and_verify(self):
+        hasher = PasswordHasher(rounds=4, workers=2)
+        hashed = hasher.hash("maize-2026")
+        self.assertEqual(hash_rounds(hashed), 4)
+        self.assertTrue(hasher.verify("maize-2026", hashed))
+        self.assertFalse(hasher.verify("sorghum", hashed))
+        self.assertFalse(hasher.verify("maize-2026", "x"))
+        self.assertEqual(hasher.stats()["completed"], 3)
+
+    def test_flask_bcrypt_hashes_still_verify(self):
+        # Flask-Bcrypt hashed with $2b$ and older bcrypt releases truncated at 72 bytes.
+        password = "long " * 20
+        legacy = bcrypt.hashpw(password.encode("utf-8")[:72], bcrypt.gensalt(4)).decode("utf-8")
+        self.assertTrue(PasswordHasher(rounds=4).verify(password, legacy))
+
+    def test_default_pool_shares_cores_between_workers(self):
+        with unittest.mock.patch.dict(os.environ, {"WEB_CONCURRENCY": "2"}), \
+                unittest.mock.patch("os.cpu_count", return_value=8):
+            self.assertEqual(PasswordHasher().workers, 4)
+        with unittest.mock.patch.dict(os.environ, {"WEB_CONCURRENCY": "16"}), \
+                unittest.mock.patch("os.cpu_count", return_value=8):
+            self.assertEqual(PasswordHasher().workers, 1)
+
+    def test_excess_callers_are_rejected(self):
+        hasher = PasswordHasher(rounds=4, workers=1, max_pending=1)
+        release, started = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait(10)
+
+        threads = [threading.Thread(target=hasher._run, args=(block,))]
+        threads[0].start()
+        started.wait(10)
+        threads.append(threading.Thread(target=hasher._run, args=(block,)))  # waits for the worker
+        threads[1].start()
+        while hasher.stats()["queued"] < 1:
+            pass
+        with self.assertRaises(HasherBusy):
+            hasher.hash("one too many")
+        release.set()
+        for thread in threads:
+            thread.join()
+        stats = hasher.stats()
+        self.assertEqual((stats["rejected"], stats["peak_queued"], stats["queued"]), (1, 1, 0))
+
+
+class LoginTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.password_hasher = app_module.password_hasher
+        app_module.password_hasher = PasswordHasher(rounds=5, workers=2)
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            # Hashed before the cost factor was raised to 5.
+            legacy = bcrypt.hashpw(b"wheat-field", bcrypt.gensalt(4)).decode("utf-8")
+            db.session.add(User(username="farmer", email="farmer@example.com", password_hash=legacy))
+            db.session.commit()
+
+    def tearDown(self):
+        app_module.password_hasher = self.password_hasher
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def login(self, password):
+        return self.client.post("/api/login", json={"username": "farmer", "password": password})
+
+    def stored_rounds(self):
+        with app.app_context():
+            return hash_rounds(User.query.filter_by(username="farmer").one().password_hash)
+
+    def test_login_rehashes_with_the_configured_cost(self):
+        self.assertEqual(self.login("wrong").status_code, 401)
+        self.assertEqual(self.stored_rounds(), 4)
+        self.assertEqual(self.login("wheat-field").status_code, 200)
+        self.assertEqual(self.stored_rounds(), 5)
+        self.assertEqual(self.login("wheat-field").status_code, 200)
+
+    def test_saturated_hasher_returns_503(self):
+        app_module.password_hasher.max_pending = 0
+        response = self.login("wheat-field")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "1")
+        self.assertEqual(self.client.get("/api/auth/hasher/stats").json["rejected"], 1)
+
+    def test_register(self):
+        response = self.client.post("/api/register", json={"username": "grower", "email": "g@example.com", "password": "pw"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.post("/api/login", json={"username": "grower", "password": "pw"}).status_code, 200)
+
+    def test_duplicate_registration_is_refused_before_hashing(self):
+        completed = app_module.password_hasher.stats()["completed"]
+        for body in ({"username": "farmer", "email": "new@example.com", "password": "pw"},
+                     {"username": "new", "email": "farmer@example.com", "password": "pw"}):
+            self.assertEqual(self.client.post("/api/register", json=body).status_code, 409)
+        self.assertEqual(app_module.password_hasher.stats()["completed"], completed)
+
+    def test_benchmark_command(self):
+        result = app.test_cli_runner().invoke(args=["benchmark-password-hashing", "--seconds", "0.2", "--rounds", "4"])
+        self.assertRegex(result.output, r"bcrypt cost 4: [\d.]+ hashes/s on \d+ core\(s\), [\d.]+ hashes/s per core")
+
+
+if __name__ == "__main__":
+    unittest.main()
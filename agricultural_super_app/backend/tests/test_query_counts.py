@@ -0,0 +1,114 @@
+import os
+import unittest
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import event
+
+from app import app, db, User, Post, Comment, MarketplaceItem, Community, CommunityMembership, Message
+
+
+class QueryCountTestCase(unittest.TestCase):
+    """List routes must issue the same number of statements however many rows they return."""
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            owner = User(username="owner", email="owner@example.com")
+            owner.set_password("password")
+            db.session.add(owner)
+            db.session.commit()
+            community = Community(name="Maize Growers", owner_id=owner.id)
+            db.session.add(community)
+            db.session.commit()
+            self.owner_id, self.community_id = owner.id, community.id
+        login = self.client.post("/api/login", json={"username": "owner", "password": "password"})
+        self.headers = {"Authorization": f"Bearer {login.json['access_token']}"}
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def seed(self, count):
+        with app.app_context():
+            start = User.query.count()
+            for i in range(start, start + count):
+                author = User(username=f"author{i}", email=f"author{i}@example.com", password_hash="x")
+                db.session.add(author)
+                db.session.flush()
+                post = Post(title=f"Post {i}", content="Notes", user_id=author.id, community_id=self.community_id)
+                db.session.add(post)
+                db.session.flush()
+                db.session.add(Comment(post_id=post.id, user_id=author.id, text="Nice"))
+                db.session.add(MarketplaceItem(name=f"Seed {i}", price=1.0, user_id=author.id))
+                db.session.add(CommunityMembership(user_id=author.id, community_id=self.community_id))
+                db.session.add(Message(sender_id=author.id, community_id=self.community_id, text="Hello"))
+            db.session.commit()
+
+    def count_statements(self, url):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            response = self.client.get(url, headers=self.headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        self.assertEqual(response.status_code, 200)
+        return len(statements)
+
+    def assert_constant(self, url):
+        self.seed(2)
+        small = self.count_statements(url)
+        self.seed(8)
+        self.assertEqual(self.count_statements(url), small)
+
+    def test_posts(self):
+        self.assert_constant("/api/posts")
+
+    def test_community_posts(self):
+        self.assert_constant(f"/api/communities/{self.community_id}/posts")
+
+    def test_communities(self):
+        self.assert_constant("/api/communities")
+
+    def test_community_counts_are_aggregated_in_sql(self):
+        self.seed(3)
+        self.assertEqual(self.count_statements(f"/api/communities/{self.community_id}"), 1)
+        response = self.client.get(f"/api/communities/{self.community_id}")
+        self.assertEqual(response.json["member_count"], 3)
+        self.assertEqual(response.json["post_count"], 3)
+        self.assertEqual(response.json["owner_username"], "owner")
+
+    def test_marketplace_items(self):
+        self.assert_constant("/api/marketplace/items")
+
+    def test_comments(self):
+        self.seed(1)
+        with app.app_context():
+            post_id = Post.query.first().id
+            author_ids = [u.id for u in User.query.filter(User.id != self.owner_id)]
+            for author_id in author_ids:
+                db.session.add(Comment(post_id=post_id, user_id=author_id, text="One"))
+            db.session.commit()
+        small = self.count_statements(f"/api/posts/{post_id}/comments")
+        self.seed(5)
+        with app.app_context():
+            for u in User.query.filter(User.id != self.owner_id):
+                db.session.add(Comment(post_id=post_id, user_id=u.id, text="More"))
+            db.session.commit()
+        self.assertEqual(self.count_statements(f"/api/posts/{post_id}/comments"), small)
+
+    def test_community_messages(self):
+        self.assert_constant(f"/api/messages/community/{self.community_id}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import re
+import unittest
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import (app, db, User, Post, Comment, PostLike, MarketplaceItem, Community, CommunityMembership, Follow,
+                 Message)
+
+# Substring search on usernames and community names is served by trigram indexes on PostgreSQL only.
+ROUTES = [
+    "/api/users", "/api/users/2", "/api/users/2/posts", "/api/users/2/joined_communities",
+    "/api/users/2/followers", "/api/users/1/following", "/api/users/2/is_following",
+    "/api/posts", "/api/posts/1", "/api/posts/1/comments", "/api/comments/1/replies", "/api/feed",
+    "/api/marketplace/items", "/api/marketplace/items/1",
+    "/api/communities", "/api/communities/1", "/api/communities/1/posts",
+    "/api/messages/direct/2", "/api/messages/community/1", "/api/search/posts?q=maize",
+]
+
+
+class QueryPlanTestCase(unittest.TestCase):
+    """Every statement a route runs must be answered from an index, not a full table scan."""
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            users = [User(username=f"user{i}", email=f"user{i}@example.com", password_hash="x") for i in range(1, 6)]
+            db.session.add_all(users)
+            db.session.flush()
+            community = Community(name="Maize Growers", owner_id=2)
+            db.session.add(community)
+            db.session.flush()
+            for user in users:
+                db.session.add(CommunityMembership(user_id=user.id, community_id=community.id))
+                db.session.add(Follow(follower_id=1, followed_id=user.id, followed_type="user") if user.id != 1 else
+                               Follow(follower_id=1, followed_id=community.id, followed_type="community"))
+                post = Post(title="Maize planting", content="Rows", user_id=user.id, community_id=community.id)
+                db.session.add(post)
+                db.session.flush()
+                comment = Comment(post_id=post.id, user_id=user.id, text="Nice")
+                db.session.add(comment)
+                db.session.flush()
+                db.session.add(Comment(post_id=post.id, user_id=1, text="Thanks", parent_comment_id=comment.id))
+                db.session.add(PostLike(user_id=1, post_id=post.id))
+                db.session.add(MarketplaceItem(name="Seed", price=1.0, user_id=user.id))
+                db.session.add(Message(sender_id=user.id, community_id=community.id, text="Hello"))
+                db.session.add(Message(sender_id=user.id, receiver_id=1, text="Hi"))
+            db.session.commit()
+            self.headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def route_statements(self, url):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if re.match(r"\s*(SELECT|UPDATE|DELETE)\b", statement, re.IGNORECASE):
+                statements.append((statement, parameters))
+
+        with app.app_context():
+            event.listen(db.engine, "before_cursor_execute", record)
+            try:
+                response = self.client.get(url, headers=self.headers)
+            finally:
+                event.remove(db.engine, "before_cursor_execute", record)
+        self.assertEqual(response.status_code, 200, url)
+        return statements
+
+    def full_scans(self, connection, statement, parameters):
+        if connection.dialect.name == "postgresql":
+            connection.exec_driver_sql("SET enable_seqscan = off")
+            plan = [row[0] for row in connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)]
+            return [line.strip() for line in plan if "Seq Scan" in line]
+        plan = [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+        ranked_search = any("VIRTUAL TABLE" in line for line in plan)
+        problems = []
+        for line in plan:
+            scan = re.match(r"SCAN (\w+)$", line)
+            # A keyset walk in primary key (rowid) order reads only one page of rows.
+            if scan and not re.search(rf'ORDER BY "?{scan.group(1)}"?\.id\b', statement):
+                problems.append(line)
+            # Sorting or grouping a whole table; full-text matches are few and are sorted by rank.
+            elif line.startswith("USE TEMP B-TREE") and not ranked_search:
+                problems.append(line)
+            elif "AUTOMATIC" in line:
+                problems.append(line)
+        return problems
+
+    def test_route_queries_use_indexes(self):
+        for url in ROUTES:
+            with self.subTest(url=url):
+                statements = self.route_statements(url)
+                with app.app_context(), db.engine.connect() as connection:
+                    for statement, parameters in statements:
+                        self.assertEqual(self.full_scans(connection, statement, parameters), [], statement)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import create_engine, insert
+
+import app as app_module
+from app import app, db, User, Post
+from cache import MemoryBackend
+from replicas import ReplicaSet
+
+
+class ReplicaRoutingTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.replica_engines = [self.replica_engine(f"replica{i}.db") for i in range(2)]
+        self.replica_set, self.primary_pins = app_module.replica_set, app_module.primary_pins
+        app_module.replica_set = ReplicaSet(self.replica_engines)
+        app_module.primary_pins = MemoryBackend()
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            self.seed(db.engine, "On the primary")
+            self.headers = {user_id: {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+                            for user_id in (1, 2)}
+
+    def tearDown(self):
+        app_module.replica_set.dispose()
+        app_module.replica_set, app_module.primary_pins = self.replica_set, self.primary_pins
+        self.temp_dir.cleanup()
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def replica_engine(self, name):
+        engine = create_engine(f"sqlite:///{os.path.join(self.temp_dir.name, name)}")
+        db.metadata.create_all(engine)
+        self.seed(engine, f"On {name}")
+        return engine
+
+    @staticmethod
+    def seed(engine, title):
+        with engine.begin() as connection:
+            for name in ("farmer", "grower"):
+                connection.execute(insert(User).values(username=name, email=f"{name}@example.com", password_hash="x", bio=title))
+            connection.execute(insert(Post).values(title=title, content="...", user_id=2))
+
+    def titles(self, user_id):
+        return [post["title"] for post in self.client.get("/api/posts", headers=self.headers[user_id]).json]
+
+    def test_reads_rotate_across_replicas(self):
+        self.assertEqual(self.titles(1), ["On replica0.db"])
+        self.assertEqual(self.titles(1), ["On replica1.db"])
+        self.assertEqual([replica["reads"] for replica in app_module.replica_set.stats()], [1, 1])
+        # Routes that are not marked @read_replica stay on the primary.
+        self.assertEqual(self.client.get("/api/profile", headers=self.headers[2]).json["bio"], "On the primary")
+
+    def test_writers_read_their_own_writes(self):
+        response = self.client.post("/api/posts", json={"title": "Fresh", "content": "..."}, headers=self.headers[1])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.titles(1), ["Fresh", "On the primary"])
+        self.assertEqual(self.titles(2), ["On replica0.db"])
+        # Only the writer is pinned; anonymous readers keep using the replicas.
+        self.assertEqual([post["title"] for post in self.client.get("/api/users/2/posts").json], ["On replica1.db"])
+
+    def test_replica_reads_do_not_refill_invalidated_cache_entries(self):
+        hold_seconds = app_module.response_cache.write_hold_seconds
+        app_module.response_cache.write_hold_seconds = 60
+        app_module.response_cache.clear()
+        try:
+            self.client.post("/api/posts", json={"title": "Fresh", "content": "..."}, headers=self.headers[1])
+            # "posts" was just invalidated, and the replicas may not have the new post yet.
+            self.assertEqual(self.client.get("/api/posts").headers["X-Cache"], "MISS")
+            self.assertEqual(self.client.get("/api/posts").headers["X-Cache"], "MISS")
+            # Responses depending only on untouched tags are still cached.
+            self.assertEqual(self.client.get("/api/communities").headers["X-Cache"], "MISS")
+            self.assertEqual(self.client.get("/api/communities").headers["X-Cache"], "HIT")
+        finally:
+            app_module.response_cache.write_hold_seconds = hold_seconds
+            app_module.response_cache.clear()
+
+    def test_unhealthy_replicas_are_skipped(self):
+        broken = create_engine(f"sqlite:///{os.path.join(self.temp_dir.name, 'missing', 'replica.db')}")
+        app_module.replica_set = ReplicaSet([broken, self.replica_engines[0]])
+        self.assertEqual(self.titles(1), ["On replica0.db"])
+        self.assertEqual(self.titles(1), ["On replica0.db"])
+        self.assertEqual([replica["healthy"] for replica in app_module.replica_set.stats()], [False, True])
+
+        app_module.replica_set = ReplicaSet([broken])
+        self.assertEqual(self.titles(1), ["On the primary"])
+        stats = self.client.get("/api/db/pool/stats").json
+        self.assertFalse(stats["replicas"][0]["healthy"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import re
+import unittest
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import app, db, User, Post
+
+
+class RequestTimingTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.config = {key: app.config[key] for key in ("REQUEST_TIMING_SAMPLE_RATE", "REQUEST_TIMING_SLOW_MS")}
+        app.config["REQUEST_TIMING_SAMPLE_RATE"] = 1.0
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(username="farmer", email="farmer@example.com", password_hash="x"))
+            db.session.commit()
+            db.session.add_all([Post(title=f"Post {i}", content="...", user_id=1) for i in range(3)])
+            db.session.commit()
+            # Authenticated, so the response cache does not answer for the database.
+            self.headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+
+    def tearDown(self):
+        app.config.update(self.config)
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def server_timing(self, response):
+        return {match[0]: match for match in re.findall(r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?', response.headers["Server-Timing"])}
+
+    def test_server_timing_header(self):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with app.app_context():
+            event.listen(db.engine, "before_cursor_execute", record)
+            try:
+                response = self.client.get("/api/posts", headers=self.headers)
+            finally:
+                event.remove(db.engine, "before_cursor_execute", record)
+        timing = self.server_timing(response)
+        self.assertEqual(set(timing), {"db", "serialize", "handler", "total"})
+        self.assertEqual(timing["db"][2], f"{len(statements)} queries")
+        self.assertGreater(float(timing["total"][1]), 0)
+
+    def test_unsampled_requests_are_untouched(self):
+        app.config["REQUEST_TIMING_SAMPLE_RATE"] = 0.0
+        self.assertNotIn("Server-Timing", self.client.get("/api/posts", headers=self.headers).headers)
+
+    def test_log_fields_and_slow_statements(self):
+        app.config["REQUEST_TIMING_SLOW_MS"] = 0
+        with self.assertLogs("request_timing", level="INFO") as logs:
+            self.client.get("/api/users/1/posts", headers=self.headers)
+        info, warning = logs.records
+        self.assertEqual((info.path, info.status), ("/api/users/1/posts", 200))
+        self.assertGreater(info.sql_count, 0)
+        self.assertEqual(warning.levelname, "WARNING")
+        self.assertTrue(any("FROM post" in entry["statement"] for entry in warning.slow_statements))
+        self.assertIn("FROM post", warning.getMessage())
+
+
+if __name__ == "__main__":
+    unittest.main()
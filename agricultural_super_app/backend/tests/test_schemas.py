@@ -0,0 +1,132 @@
+import unittest
+
+from flask import Flask
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from extensions import db, jwt, ma
+from models import User, Post, Community, Follow, Comment, Like, list_counts, relationship_map
+from routes import register_routes
+from schemas import UserListSchema, PostListSchema, CommunityListSchema
+
+
+def create_test_app():
+    # The modular stack has no app factory; wire its extensions and routes the way one would.
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://", JWT_SECRET_KEY="test-secret", TESTING=True)
+    db.init_app(app)
+    jwt.init_app(app)
+    ma.init_app(app)
+    register_routes(app)
+    return app
+
+
+class ListSchemaTestCase(unittest.TestCase):
+    """The list schemas read counts and follow status from a context fetched once per page."""
+
+    def setUp(self):
+        self.app = create_test_app()
+        self.client = self.app.test_client()
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        self.viewer = User(username="wanjiru", email="wanjiru@example.com", password_hash="x")
+        self.author = User(username="otieno", email="otieno@example.com", password_hash="x", followers_count=1)
+        db.session.add_all([self.viewer, self.author])
+        db.session.commit()
+        self.community = Community(name="Maize Growers", admin_id=self.author.id)
+        self.post = Post(title="Planting", content="Rains are here", user_id=self.author.id)
+        db.session.add_all([self.community, self.post])
+        db.session.commit()
+        db.session.add_all([
+            Follow(follower_id=self.viewer.id, followed_id=self.author.id, followed_type="user"),
+            Follow(follower_id=self.viewer.id, followed_id=self.community.id, followed_type="community"),
+            Comment(content="Thanks", user_id=self.viewer.id, post_id=self.post.id),
+            Like(user_id=self.viewer.id, post_id=self.post.id),
+            Like(user_id=self.author.id, post_id=self.post.id),
+        ])
+        db.session.commit()
+        self.headers = {"Authorization": f"Bearer {create_access_token(identity=str(self.viewer.id))}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def test_dump_reads_counts_and_follow_status_from_the_context(self):
+        context = {
+            "relationships": relationship_map(self.viewer.id, [self.author.id], [self.community.id]),
+            "counts": list_counts([self.post.id], [self.community.id]),
+        }
+        user = UserListSchema(context=context).dump(self.author)
+        self.assertEqual((user["followers_count"], user["is_following"]), (1, True))
+        self.assertNotIn("posts", user)
+
+        post = PostListSchema(context=context).dump(self.post)
+        self.assertEqual((post["comments_count"], post["likes_count"]), (1, 2))
+        self.assertEqual(post["author"], {"id": self.author.id, "username": "otieno", "profile_picture": None,
+                                          "followers_count": 1, "is_following": True})
+
+        community = CommunityListSchema(context=context).dump(self.community)
+        self.assertEqual((community["followers_count"], community["is_followed"]), (1, True))
+
+    def test_dump_without_context_defaults(self):
+        self.assertFalse(UserListSchema().dump(self.author)["is_following"])
+        post = PostListSchema().dump(self.post)
+        self.assertEqual((post["comments_count"], post["likes_count"]), (0, 0))
+        self.assertEqual(CommunityListSchema().dump(self.community)["followers_count"], 0)
+
+    def test_list_counts_is_one_query(self):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        post_id, community_id = self.post.id, self.community.id
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            counts = list_counts([post_id, 999], [community_id])
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(counts["posts"], {post_id: {"comments": 1, "likes": 2}, 999: {"comments": 0, "likes": 0}})
+        self.assertEqual(counts["communities"], {community_id: {"followers": 1}})
+
+    def count_statements(self, url):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        db.session.remove()
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            response = self.client.get(url, headers=self.headers)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+        self.assertEqual(response.status_code, 200)
+        return len(statements)
+
+    def seed(self, count):
+        start = User.query.count()
+        for i in range(start, start + count):
+            author = User(username=f"author{i}", email=f"author{i}@example.com", password_hash="x")
+            db.session.add(author)
+            db.session.flush()
+            db.session.add(Community(name=f"Community {i}", admin_id=author.id))
+            post = Post(title=f"Post {i}", content="Notes", user_id=author.id)
+            db.session.add(post)
+            db.session.flush()
+            db.session.add(Like(user_id=author.id, post_id=post.id))
+        db.session.commit()
+
+    def test_list_routes_issue_a_constant_number_of_statements(self):
+        for url in ("/api/users", "/api/posts", "/api/communities"):
+            with self.subTest(url=url):
+                small = self.count_statements(url)
+                self.seed(5)
+                self.assertEqual(self.count_statements(url), small)
+
+
+if __name__ == "__main__":
+    unittest.main()
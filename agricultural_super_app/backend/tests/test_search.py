@@ -0,0 +1,83 @@
+import os
+import unittest
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import app, db, User, Post
+from sqlalchemy import inspect
+
+from search import is_search_index_object, parse_search_query, to_fts5_query, to_tsquery_string
+
+
+class SearchQueryParsingTestCase(unittest.TestCase):
+    def test_phrases_and_prefixes(self):
+        terms = parse_search_query('"drip irrigation" maiz* soil!')
+        self.assertEqual(terms, [(("drip", "irrigation"), False), (("maiz",), True), (("soil",), False)])
+        self.assertEqual(to_fts5_query(terms), '"drip irrigation" "maiz"* "soil"')
+        self.assertEqual(to_tsquery_string(terms), "(drip <-> irrigation) & maiz:* & (soil)")
+
+    def test_punctuation_only_yields_no_terms(self):
+        self.assertEqual(parse_search_query("&&& ||| !!"), [])
+
+
+class PostSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            user = User(username="farmer", email="farmer@example.com", password_hash="x")
+            db.session.add(user)
+            db.session.commit()
+            db.session.add_all([
+                Post(title="Drip irrigation for maize", content="Irrigation schedules for maize fields", user_id=user.id),
+                Post(title="Goat feed", content="Mixing feed with some maize bran", user_id=user.id),
+                Post(title="Irrigating tomatoes", content="Tomatoes need drip lines", user_id=user.id),
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def search(self, q, **params):
+        return self.client.get("/api/search/posts", query_string={"q": q, **params})
+
+    def test_autogenerate_skips_only_the_search_tables(self):
+        with app.app_context():
+            unmodelled = set(inspect(db.engine).get_table_names()) - set(db.metadata.tables)
+        self.assertIn("post_fts", unmodelled)
+        self.assertTrue(all(is_search_index_object(name, "table") for name in unmodelled))
+        self.assertFalse(is_search_index_object("post", "table"))
+
+    def test_results_are_ranked_by_relevance(self):
+        response = self.search("maize")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p["title"] for p in response.json], ["Drip irrigation for maize", "Goat feed"])
+
+    def test_phrase_and_prefix_queries(self):
+        self.assertEqual([p["title"] for p in self.search('"drip lines"').json], ["Irrigating tomatoes"])
+        self.assertEqual(len(self.search("irrig*").json), 2)
+
+    def test_index_follows_updates(self):
+        with app.app_context():
+            post = Post.query.filter_by(title="Goat feed").first()
+            post.title = "Sorghum silage"
+            db.session.commit()
+        self.assertEqual([p["title"] for p in self.search("sorghum").json], ["Sorghum silage"])
+        self.assertEqual(self.search("goat").json, [])
+
+    def test_pagination(self):
+        first = self.search("maize", limit=1)
+        self.assertEqual(len(first.json), 1)
+        second = self.search("maize", limit=1, cursor=first.headers["X-Next-Cursor"])
+        self.assertEqual([p["title"] for p in second.json], ["Goat feed"])
+        self.assertNotIn("X-Next-Cursor", second.headers)
+
+    def test_empty_query_is_rejected(self):
+        self.assertEqual(self.search("***").status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
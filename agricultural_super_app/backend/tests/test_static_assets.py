@@ -0,0 +1,85 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import brotli
+
+import app as app_module
+from app import app
+from static_assets import StaticManifest
+
+BUNDLE = ("console.log('maize');\n" * 500).encode("utf-8")
+INDEX = b"<!doctype html><html><body><div id=root></div></body></html>"
+
+
+class StaticAssetsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = self.temp_dir.name
+        os.makedirs(os.path.join(root, "static", "js"))
+        files = {"index.html": INDEX, "static/js/main.1a2b3c.js": BUNDLE, "static/js/main.1a2b3c.js.map": b"{}",
+                 "favicon.ico": b"\x00\x00\x01\x00"}
+        for name, data in files.items():
+            with open(os.path.join(root, name), "wb") as f:
+                f.write(data)
+        self.frontend_assets = app_module.frontend_assets
+        app_module.frontend_assets = StaticManifest(root)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        app_module.frontend_assets = self.frontend_assets
+        self.temp_dir.cleanup()
+
+    def get(self, path, **headers):
+        response = self.client.get(path, headers=headers)
+        response.get_data()  # buffer streamed files before the handle is closed
+        response.close()
+        return response
+
+    def test_hashed_bundles_are_immutable_and_precompressed(self):
+        br = self.get("/static/js/main.1a2b3c.js", **{"Accept-Encoding": "gzip, deflate, br"})
+        self.assertEqual(br.headers["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(br.data), BUNDLE)
+        self.assertEqual(br.headers["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertIn("Accept-Encoding", br.vary)
+
+        gz = self.get("/static/js/main.1a2b3c.js", **{"Accept-Encoding": "gzip"})
+        self.assertEqual(gz.headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(gz.data), BUNDLE)
+        self.assertNotEqual(gz.headers["ETag"], br.headers["ETag"])
+
+        identity = self.get("/static/js/main.1a2b3c.js", **{"Accept-Encoding": "identity"})
+        self.assertNotIn("Content-Encoding", identity.headers)
+        self.assertEqual(identity.data, BUNDLE)
+
+    def test_index_is_revalidated_with_etag(self):
+        response = self.get("/")
+        self.assertEqual(response.data, INDEX)
+        self.assertEqual(response.headers["Cache-Control"], "no-cache")
+        again = self.get("/", **{"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(again.status_code, 304)
+
+    def test_client_side_routes_fall_back_to_index(self):
+        self.assertEqual(self.get("/posts/12").data, INDEX)
+        self.assertEqual(self.get("/static/js/missing.js").data, INDEX)
+
+    def test_binary_files_are_streamed_from_disk(self):
+        response = self.get("/favicon.ico", **{"Accept-Encoding": "gzip, br"})
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(response.data, b"\x00\x00\x01\x00")
+        self.assertEqual(self.get("/favicon.ico", **{"If-None-Match": response.headers["ETag"]}).status_code, 304)
+
+    def test_source_maps_are_not_served(self):
+        self.assertNotIn("static/js/main.1a2b3c.js.map", app_module.frontend_assets.load())
+        self.assertEqual(self.get("/static/js/main.1a2b3c.js.map").data, INDEX)
+
+    def test_missing_build_is_a_404(self):
+        app_module.frontend_assets = StaticManifest(os.path.join(self.temp_dir.name, "nope"))
+        self.assertEqual(self.get("/").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import unittest
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import app, db, User, Community, user_suggestions, community_suggestions
+from flask_jwt_extended import create_access_token
+
+from suggest import PrefixIndex
+
+
+class PrefixIndexTestCase(unittest.TestCase):
+    def test_lookup_is_case_insensitive_and_sorted(self):
+        rows = [(1, "Wanjiru", None), (2, "wambui", "/a.png"), (3, "Otieno", None), (4, "Wairimu", None)]
+        index = PrefixIndex(lambda: rows)
+        self.assertEqual([entry[1] for entry in index.lookup("WA", 10)], ["Wairimu", "wambui", "Wanjiru"])
+        self.assertEqual([entry[0] for entry in index.lookup("wa", 2)], [4, 2])
+        self.assertEqual(index.lookup("x", 10), [])
+
+    def test_invalidate_reloads(self):
+        rows = [(1, "maize", None)]
+        index = PrefixIndex(lambda: list(rows))
+        self.assertEqual(len(index.lookup("m", 10)), 1)
+        rows.append((2, "millet", None))
+        self.assertEqual(len(index.lookup("m", 10)), 1)
+        index.invalidate()
+        self.assertEqual(len(index.lookup("m", 10)), 2)
+
+    def test_upsert_and_remove_patch_the_loaded_index(self):
+        loads = []
+        index = PrefixIndex(lambda: loads.append(1) or [(1, "maize", None), (3, "Millet", None)])
+        index.lookup("m", 10)
+        index.upsert(2, "Mango", "/m.png")
+        index.upsert(3, "sorghum")
+        index.remove(1)
+        self.assertEqual(index.lookup("m", 10), [(2, "Mango", "/m.png")])
+        self.assertEqual(index.lookup("s", 10), [(3, "sorghum", None)])
+        self.assertEqual(len(loads), 1)
+
+
+class SuggestEndpointTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            farmer = User(username="Kamau", email="kamau@example.com", password_hash="x", profile_picture_url="/uploads/k.png")
+            db.session.add(farmer)
+            db.session.commit()
+            db.session.add(Community(name="Kakamega Dairy", owner_id=farmer.id))
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        user_suggestions.invalidate()
+        community_suggestions.invalidate()
+
+    def test_suggest_users_and_communities(self):
+        response = self.client.get("/api/search/suggest?q=ka")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["users"], [{"id": 1, "username": "Kamau", "profile_picture_url": "/uploads/k.png"}])
+        self.assertEqual(response.json["communities"], [{"id": 1, "name": "Kakamega Dairy"}])
+
+    def test_new_rows_are_suggested_after_commit(self):
+        self.assertEqual(self.client.get("/api/search/suggest?q=kar&type=users").json["users"], [])
+        self.client.post("/api/register", json={"username": "Karanja", "email": "k@example.com", "password": "pw"})
+        self.assertFalse(user_suggestions._needs_refresh())
+        users = self.client.get("/api/search/suggest?q=kar&type=users").json["users"]
+        self.assertEqual([u["username"] for u in users], ["Karanja"])
+
+        self.client.get("/api/search/suggest?q=kar&type=communities")
+        with app.app_context():
+            token = create_access_token(identity="1")
+        self.client.post("/api/communities", json={"name": "Karatina Growers"}, headers={"Authorization": f"Bearer {token}"})
+        self.assertFalse(community_suggestions._needs_refresh())
+        communities = self.client.get("/api/search/suggest?q=kar&type=communities").json["communities"]
+        self.assertEqual([c["name"] for c in communities], ["Karatina Growers"])
+
+    def test_renames_and_deletes_are_applied_without_reloading(self):
+        self.client.get("/api/search/suggest?q=ka")
+        with app.app_context():
+            user = db.session.get(User, 1)
+            user.password_hash = "rehashed"
+            db.session.commit()
+            self.assertFalse(user_suggestions._needs_refresh())
+            user.username = "Kariuki"
+            db.session.add(User(username="Kamande", email="kamande@example.com", password_hash="x"))
+            db.session.delete(db.session.get(Community, 1))
+            db.session.commit()
+        self.assertFalse(user_suggestions._needs_refresh())
+        self.assertFalse(community_suggestions._needs_refresh())
+        response = self.client.get("/api/search/suggest?q=ka")
+        self.assertEqual([u["username"] for u in response.json["users"]], ["Kamande", "Kariuki"])
+        self.assertEqual(response.json["communities"], [])
+
+    def test_invalid_arguments(self):
+        self.assertEqual(self.client.get("/api/search/suggest").status_code, 400)
+        self.assertEqual(self.client.get("/api/search/suggest?q=k&type=posts").status_code, 400)
+        self.assertEqual(self.client.get("/api/search/suggest?q=k&limit=0").status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
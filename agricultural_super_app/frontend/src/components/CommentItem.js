@@ -28,14 +28,10 @@ function CommentItem({
     useAddCommentToPostMutation();
 
   // Check if current user has liked this comment
-  const hasLiked =
-    currentUser &&
-    comment.likes &&
-    Array.isArray(comment.likes) &&
-    comment.likes.includes(currentUser.id);
+  const hasLiked = Boolean(currentUser && comment.liked_by_me);
 
-  // Calculate likes count
-  const likesCount = comment.likes ? comment.likes.length : 0;
+  // Likes count is maintained by the backend
+  const likesCount = comment.likes_count || 0;
 
   // Find direct replies to this comment
   const childrenComments = Object.values(commentsMap)
@@ -49,7 +49,7 @@ function UserListFilter({ title, users = [] }) {
             >
               {user.profile_picture_url ? (
                 <img
-                  src={user.profile_picture_url}
+                  src={user.profile_picture_variants?.small || user.profile_picture_url}
                   alt={`${user.username}'s profile`}
                   className="w-10 h-10 rounded-full object-cover mr-3"
                 />
@@ -95,7 +95,7 @@ function UserSearch() {
             >
               {user.profile_picture_url ? (
                 <img
-                  src={user.profile_picture_url}
+                  src={user.profile_picture_variants?.small || user.profile_picture_url}
                   alt={`${user.username}'s profile`}
                   className="user-avatar"
                 />
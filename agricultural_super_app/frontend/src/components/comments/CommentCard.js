@@ -31,11 +31,7 @@ function CommentCard({ comment }) {
   };
 
   // Check if the current user has liked this comment
-  const isLikedByUser =
-    currentUser &&
-    comment.likes && // Ensure comment.likes exists
-    Array.isArray(comment.likes) && // Ensure it's an array
-    comment.likes.includes(currentUser.id); // Check if user's ID is in the likes list
+  const isLikedByUser = Boolean(currentUser && comment.liked_by_me);
 
   return (
     <div className="comment-card">
@@ -48,7 +44,7 @@ function CommentCard({ comment }) {
           on {new Date(comment.created_at).toLocaleDateString()}
         </span>
         <span className="comment-likes">
-          Likes: {comment.likes ? comment.likes.length : 0}
+          Likes: {comment.likes_count || 0}
         </span>
         {currentUser && ( // Only show like/unlike button if user is logged in
           <button
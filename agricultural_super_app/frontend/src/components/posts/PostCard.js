@@ -32,13 +32,8 @@ function PostCard({ post }) {
     }
   };
 
-  // Check if the current user has liked this post (assuming post.likes is an array of user objects or IDs)
-  // Your backend Post.to_dict() returns a list of user IDs for likes, so this is correct for that.
-  const isLikedByUser =
-    currentUser &&
-    post.likes &&
-    Array.isArray(post.likes) &&
-    post.likes.includes(currentUser.id);
+  // The backend returns a likes_count and a liked_by_me flag for the requesting user.
+  const isLikedByUser = Boolean(currentUser && post.liked_by_me);
 
   const authorDisplayName = post.author_username || "Anonymous";
 
@@ -54,7 +49,7 @@ function PostCard({ post }) {
       </p>
       <div className="post-meta-flex">
         <span>Author: {authorDisplayName}</span>
-        <span>Likes: {post.likes ? post.likes.length : 0}</span>
+        <span>Likes: {post.likes_count || 0}</span>
         {currentUser && (
           <button
             onClick={isLikedByUser ? handleUnlike : handleLike}
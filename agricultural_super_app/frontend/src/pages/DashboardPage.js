@@ -3,7 +3,7 @@ import React from "react";
 import { Link, useNavigate } from "react-router-dom"; // Hooks for navigation
 import { useSelector } from "react-redux"; // Hook to get data from Redux store (for current user)
 import {
-  useGetPostsQuery, // RTK Query hook to fetch all posts
+  useGetFeedQuery, // RTK Query hook to fetch the current user's home feed
   useGetCommunitiesQuery, // RTK Query hook to fetch all communities
 } from "../redux/api/apiSlice"; // Make sure these are defined in your apiSlice
 
@@ -14,12 +14,12 @@ function DashboardPage() {
   const { currentUser } = useSelector((state) => state.auth);
 
   // --- IMPORTANT: RTK Query hooks must always be called unconditionally at the top level of the component. ---
-  // Fetch all posts using RTK Query
+  // Fetch the home feed (followed users and joined communities) using RTK Query
   const {
     data: posts,
     isLoading: postsLoading,
     error: postsError,
-  } = useGetPostsQuery();
+  } = useGetFeedQuery(undefined, { skip: !currentUser });
   // Fetch all communities using RTK Query
   const {
     data: communities,
@@ -96,7 +96,7 @@ function DashboardPage() {
         <div className="card">
           {" "}
           {/* Card for Latest Posts */}
-          <h2>Latest Posts</h2>
+          <h2>Your Feed</h2>
           {posts && Array.isArray(posts) && posts.length > 0 ? (
             <ul className="dashboard-list">
               {/* Display up to 5 latest posts */}
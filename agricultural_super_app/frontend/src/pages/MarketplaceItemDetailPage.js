@@ -49,7 +49,7 @@ function MarketplaceItemDetailPage() {
       <div className="card item-detail-card">
         {item.image_url && (
           <div className="item-detail-image">
-            <img src={item.image_url} alt={item.name} />
+            <img src={item.image_variants?.large || item.image_url} alt={item.name} />
           </div>
         )}
         <h1>{item.name}</h1>
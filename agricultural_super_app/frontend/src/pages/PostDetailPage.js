@@ -95,12 +95,7 @@ function PostDetailPage() {
       return;
     }
     try {
-      const isLikedByUser =
-        post.likes &&
-        Array.isArray(post.likes) &&
-        post.likes.includes(currentUser.id);
-
-      if (isLikedByUser) {
+      if (post.liked_by_me) {
         await unlikePost({ postId });
       } else {
         await likePost({ postId });
@@ -169,12 +164,8 @@ function PostDetailPage() {
     }
   };
 
-  const postHasLiked =
-    currentUser &&
-    post.likes &&
-    Array.isArray(post.likes) &&
-    post.likes.includes(currentUser.id);
-  const postLikesCount = post.likes ? post.likes.length : 0;
+  const postHasLiked = Boolean(currentUser && post.liked_by_me);
+  const postLikesCount = post.likes_count || 0;
 
   const authorExists = post && post.author;
   const communityExists = post && post.community && post.community.id;
@@ -258,7 +249,7 @@ function PostDetailPage() {
         {post.image_url && (
           <div className="post-detail-image-container">
             <img
-              src={post.image_url}
+              src={post.image_variants?.large || post.image_url}
               alt={post.title}
               className="post-detail-image"
               onError={(e) => {
@@ -115,7 +115,7 @@ function SearchResultsPage() {
               >
                 {user.profile_picture_url ? (
                   <img
-                    src={user.profile_picture_url}
+                    src={user.profile_picture_variants?.small || user.profile_picture_url}
                     alt={`${user.username}'s profile`}
                     className="w-16 h-16 rounded-full object-cover mr-4"
                   />
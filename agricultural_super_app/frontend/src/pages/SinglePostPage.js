@@ -111,7 +111,7 @@ function SinglePostPage() {
       <h2>{post.title}</h2>
       {post.image_url && (
         <img
-          src={post.image_url}
+          src={post.image_variants?.large || post.image_url}
           alt={post.title}
           className="single-post-image"
         />
@@ -106,7 +106,7 @@ function UserDetailPage() {
         <div className="profile-picture-container mb-4 text-center">
           {user.profile_picture_url ? (
             <img
-              src={user.profile_picture_url}
+              src={user.profile_picture_variants?.small || user.profile_picture_url}
               alt={`${user.username}'s profile`}
               className="profile-picture w-32 h-32 rounded-full object-cover mx-auto border-2 border-green-500"
             />
@@ -4,6 +4,40 @@ import { createApi, fetchBaseQuery } from "@reduxjs/toolkit/query/react";
 // For local development: "http://localhost:5000" (if using .env for /api prefix)
 // For Render deployment: Your deployed backend URL (e.g., "https://your-app-name.onrender.com")
 const API_BASE_URL = "https://agricultural-super-app-0725.onrender.com"; // This is correct for the base domain
+// Chat streams are served by the backend's separate `stream` process (see the Procfile) when it has its own URL.
+const STREAM_BASE_URL = process.env.REACT_APP_STREAM_BASE_URL || API_BASE_URL;
+
+// Adds a message to a cached conversation unless it is already there
+// (the sender gets it both from the POST response and from the stream).
+const appendMessage = (draft, message) => {
+  if (Array.isArray(draft) && !draft.some((m) => m.id === message.id)) {
+    draft.push(message);
+  }
+};
+
+// Keeps a cached conversation live over Server-Sent Events while it is in use.
+// EventSource cannot send headers, so the token goes in the query string.
+const streamMessages = async (
+  target,
+  { updateCachedData, cacheDataLoaded, cacheEntryRemoved }
+) => {
+  const token = localStorage.getItem("token");
+  if (!token || typeof EventSource === "undefined") return;
+  const source = new EventSource(
+    `${STREAM_BASE_URL}/api/messages/stream?${target}&jwt=${encodeURIComponent(token)}`
+  );
+  try {
+    await cacheDataLoaded;
+    source.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      updateCachedData((draft) => appendMessage(draft, message));
+    };
+  } catch {
+    // The initial fetch failed; the cache entry will be removed.
+  }
+  await cacheEntryRemoved;
+  source.close();
+};
 
 export const apiSlice = createApi({
   reducerPath: "api",
@@ -91,6 +125,10 @@ export const apiSlice = createApi({
       query: () => "/api/posts", // Added /api
       providesTags: ["Post"],
     }),
+    getFeed: builder.query({
+      query: () => "/api/feed", // Posts from followed users and joined communities
+      providesTags: ["Post"],
+    }),
     createPost: builder.mutation({
       query: (postData) => ({
         url: "/api/posts", // Added /api
@@ -350,20 +388,29 @@ export const apiSlice = createApi({
         method: "POST",
         body: messageData,
       }),
-      invalidatesTags: (result, error, arg) => {
-        const tags = [{ type: "Message", id: "LIST" }];
-        if (arg.receiver_id) {
-          tags.push({ type: "Message", id: `DIRECT_${arg.receiver_id}` });
-          tags.push({ type: "Message", id: `DIRECT_${result.sender_id}` });
-        }
-        if (arg.community_id) {
-          tags.push({ type: "Message", id: `COMMUNITY_${arg.community_id}` });
+      // The open conversation is updated in place (and by the message stream)
+      // instead of refetching its whole history.
+      invalidatesTags: [{ type: "Message", id: "LIST" }],
+      async onQueryStarted(arg, { dispatch, queryFulfilled }) {
+        try {
+          const { data: message } = await queryFulfilled;
+          const [endpoint, key] = arg.receiver_id
+            ? ["getDirectMessages", arg.receiver_id]
+            : ["getCommunityMessages", arg.community_id];
+          dispatch(
+            apiSlice.util.updateQueryData(endpoint, key, (draft) =>
+              appendMessage(draft, message)
+            )
+          );
+        } catch {
+          // Sending failed; nothing to add.
         }
-        return tags;
       },
     }),
     getDirectMessages: builder.query({
       query: (otherUserId) => `/api/messages/direct/${otherUserId}`, // Added /api
+      onCacheEntryAdded: (otherUserId, lifecycle) =>
+        streamMessages(`direct=${otherUserId}`, lifecycle),
       providesTags: (result, error, otherUserId) =>
         result
           ? [
@@ -374,6 +421,8 @@ export const apiSlice = createApi({
     }),
     getCommunityMessages: builder.query({
       query: (communityId) => `/api/messages/community/${communityId}`, // Added /api
+      onCacheEntryAdded: (communityId, lifecycle) =>
+        streamMessages(`community=${communityId}`, lifecycle),
       providesTags: (result, error, communityId) =>
         result
           ? [
@@ -396,6 +445,7 @@ export const {
   useUpdateProfileMutation,
   useGetUserPostsQuery,
   useGetPostsQuery,
+  useGetFeedQuery,
   useCreatePostMutation,
   useGetPostDetailQuery,
   useLikePostMutation,
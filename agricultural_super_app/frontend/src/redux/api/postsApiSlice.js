@@ -42,17 +42,19 @@ export const postApiSlice = apiSlice.injectEndpoints({
         const patchResult = dispatch(
           postApiSlice.util.updateQueryData("getPosts", undefined, (draft) => {
             const post = draft.find((p) => p.id === postId);
-            // If post exists and user hasn't liked it yet, add userId to likes array.
-            if (post && !post.likes.includes(userId)) {
-              post.likes.push(userId);
+            // If post exists and user hasn't liked it yet, bump the count.
+            if (post && !post.liked_by_me) {
+              post.liked_by_me = true;
+              post.likes_count += 1;
             }
           })
         );
         // Optimistically update the 'getPost' query's cache (single post detail).
         const patchResultSingle = dispatch(
           postApiSlice.util.updateQueryData("getPost", postId, (draft) => {
-            if (draft && draft.likes && !draft.likes.includes(userId)) {
-              draft.likes.push(userId);
+            if (draft && !draft.liked_by_me) {
+              draft.liked_by_me = true;
+              draft.likes_count += 1;
             }
           })
         );
@@ -82,17 +84,19 @@ export const postApiSlice = apiSlice.injectEndpoints({
         const patchResult = dispatch(
           postApiSlice.util.updateQueryData("getPosts", undefined, (draft) => {
             const post = draft.find((p) => p.id === postId);
-            if (post && post.likes) {
-              // Filter out the userId to simulate unliking.
-              post.likes = post.likes.filter((id) => id !== userId);
+            if (post && post.liked_by_me) {
+              // Drop the count to simulate unliking.
+              post.liked_by_me = false;
+              post.likes_count -= 1;
             }
           })
         );
         // Optimistically update the 'getPost' query's cache.
         const patchResultSingle = dispatch(
           postApiSlice.util.updateQueryData("getPost", postId, (draft) => {
-            if (draft && draft.likes) {
-              draft.likes = draft.likes.filter((id) => id !== userId);
+            if (draft && draft.liked_by_me) {
+              draft.liked_by_me = false;
+              draft.likes_count -= 1;
             }
           })
         );
@@ -154,7 +158,8 @@ export const postApiSlice = apiSlice.injectEndpoints({
                 text: text,
                 created_at: new Date().toISOString(),
                 author_username: username,
-                likes: [],
+                likes_count: 0,
+                liked_by_me: false,
                 parent_comment_id: parentCommentId, // Include parent ID for optimistic rendering
               };
               draft.push(newComment); // Add the new comment to the draft state
@@ -189,8 +194,9 @@ export const postApiSlice = apiSlice.injectEndpoints({
             postId,
             (draft) => {
               const comment = draft.find((c) => c.id === commentId);
-              if (comment && !comment.likes.includes(userId)) {
-                comment.likes.push(userId);
+              if (comment && !comment.liked_by_me) {
+                comment.liked_by_me = true;
+                comment.likes_count += 1;
               }
             }
           )
@@ -227,8 +233,9 @@ export const postApiSlice = apiSlice.injectEndpoints({
             postId,
             (draft) => {
               const comment = draft.find((c) => c.id === commentId);
-              if (comment && comment.likes) {
-                comment.likes = comment.likes.filter((id) => id !== userId);
+              if (comment && comment.liked_by_me) {
+                comment.liked_by_me = false;
+                comment.likes_count -= 1;
               }
             }
           )